@@ -8,6 +8,8 @@ from .api import MemoryAPI
 from .consolidator import MemoryConsolidator
 from .backup import MemoryBackupManager
 from .integration import AgentMemoryInterface, MemoryDrivenAgent
+from .sharding import ShardedMemoryAPI, ShardRouter
+from .async_api import AsyncMemoryAPI, AsyncAgentMemoryInterface
 
 __version__ = "1.0.0"
 __author__ = "LexOS Development Team"
@@ -17,5 +19,9 @@ __all__ = [
     "MemoryConsolidator", 
     "MemoryBackupManager",
     "AgentMemoryInterface",
-    "MemoryDrivenAgent"
+    "MemoryDrivenAgent",
+    "ShardedMemoryAPI",
+    "ShardRouter",
+    "AsyncMemoryAPI",
+    "AsyncAgentMemoryInterface"
 ]
@@ -0,0 +1,178 @@
+
+"""
+Buffered Access Tracking for the LexOS Memory System
+Coalesces memory access updates in memory and writes them in periodic batches
+"""
+
+import atexit
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Tuple
+
+from memory.pool import ConnectionPool
+from memory.timestamps import epoch_ms
+
+logger = logging.getLogger(__name__)
+
+ACCESS_TABLES = {
+    'episodic': 'episodic_memory',
+    'semantic': 'semantic_memory',
+    'procedural': 'procedural_memory',
+    'emotional': 'emotional_memory'
+}
+
+class AccessTracker:
+    """In-memory buffer of access counts keyed by (memory_type, memory_id)
+
+    Repeated reads of the same memory merge into one pending entry holding the
+    summed increment and the latest access time. A background thread flushes the
+    buffer with one ``executemany`` per table every ``flush_interval`` seconds,
+    or sooner once ``max_pending`` entries are waiting. If the flusher falls
+    behind, callers flush inline at twice that size, so an unclean shutdown
+    loses at most ``2 * max_pending`` entries or one interval of updates.
+    """
+
+    def __init__(self, pool: ConnectionPool, flush_interval: float = 2.0, max_pending: int = 1000):
+        self.pool = pool
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[Tuple[str, int], List[Any]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._stats = {
+            'recorded': 0,
+            'coalesced': 0,
+            'flushes': 0,
+            'rows_flushed': 0,
+            'failed_flushes': 0,
+            'dropped': 0
+        }
+
+    def record(self, memory_type: str, memory_id: int, accessed_at: str = None):
+        """Buffer one access of a memory"""
+        self.record_many([(memory_type, memory_id)], accessed_at)
+
+    def record_many(self, accesses: Iterable[Tuple[str, int]], accessed_at: str = None):
+        """Buffer accesses of several memories sharing one access time"""
+        accessed_at = accessed_at or datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+        with self._lock:
+            for memory_type, memory_id in accesses:
+                if memory_type not in ACCESS_TABLES:
+                    continue
+                self._stats['recorded'] += 1
+
+                entry = self._pending.get((memory_type, memory_id))
+                if entry:
+                    entry[0] += 1
+                    entry[1] = max(entry[1], accessed_at)
+                    self._stats['coalesced'] += 1
+                else:
+                    self._pending[(memory_type, memory_id)] = [1, accessed_at]
+
+            pending = len(self._pending)
+
+        self._ensure_started()
+
+        if pending >= 2 * self.max_pending:
+            self.flush()
+        elif pending >= self.max_pending:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Write all buffered access updates, returning the number of rows updated"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+
+            if not pending:
+                return 0
+
+            updates: Dict[str, List[Tuple[str, int, int, int]]] = {}
+            for (memory_type, memory_id), (count, accessed_at) in pending.items():
+                updates.setdefault(ACCESS_TABLES[memory_type], []).append(
+                    (accessed_at, epoch_ms(datetime.fromisoformat(accessed_at)), count, memory_id)
+                )
+
+            try:
+                with self.pool.connection() as conn:
+                    for table, rows in updates.items():
+                        conn.executemany(f"""
+                            UPDATE {table} SET
+                                accessed_at = ?, accessed_at_ms = ?,
+                                access_count = access_count + ?
+                            WHERE id = ?
+                        """, rows)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to flush {len(pending)} memory access updates: {e}")
+                self._requeue(pending)
+                return 0
+
+            with self._lock:
+                self._stats['flushes'] += 1
+                self._stats['rows_flushed'] += len(pending)
+
+            return len(pending)
+
+    def _requeue(self, pending: Dict[Tuple[str, int], List[Any]]):
+        """Merge a failed flush back into the buffer, dropping past the bound"""
+        with self._lock:
+            self._stats['failed_flushes'] += 1
+            for key, (count, accessed_at) in pending.items():
+                entry = self._pending.get(key)
+                if entry:
+                    entry[0] += count
+                    entry[1] = max(entry[1], accessed_at)
+                elif len(self._pending) < 2 * self.max_pending:
+                    self._pending[key] = [count, accessed_at]
+                else:
+                    self._stats['dropped'] += count
+
+    def _ensure_started(self):
+        """Start the background flusher on first use"""
+        if self._thread is not None or self._stopped.is_set():
+            return
+
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._flush_loop,
+                name="memory-access-flusher",
+                daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def _flush_loop(self):
+        """Flush the buffer periodically or when woken early"""
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error in access tracking flusher: {e}")
+
+    def stop(self):
+        """Stop the flusher and write any remaining updates"""
+        self._stopped.set()
+        self._wake.set()
+
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            atexit.unregister(self.stop)
+
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get access tracking statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+        return stats
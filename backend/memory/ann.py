@@ -0,0 +1,346 @@
+
+"""
+Approximate Nearest-Neighbour Index for the LexOS Memory System
+Inverted-file (IVF) index over unit-length embeddings with k-means coarse quantization
+"""
+
+import os
+import math
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Iterable
+
+import numpy as np
+
+from memory.embeddings import EMBEDDING_DTYPE
+
+logger = logging.getLogger(__name__)
+
+# Rows scored per chunk when assigning vectors to lists
+ASSIGN_CHUNK = 65536
+
+class IVFIndex:
+    """Inverted-file index over one agent's memories of one type
+
+    Vectors are clustered with spherical k-means into about sqrt(n) lists. A
+    search scores the query against the centroids, then scores only the
+    vectors in the ``nprobe`` closest lists, so recall@k rises with
+    ``nprobe`` up to an exact search at ``nprobe == nlist``. Until the index
+    holds ``train_threshold`` vectors there are no lists and every search is
+    exact.
+
+    Inserts are assigned to their nearest list as they arrive and never
+    cluster on their own: once the index reaches ``train_threshold`` vectors,
+    or grows to ``retrain_growth`` times its size at training, it only reports
+    ``needs_training`` so the owner can call ``train`` outside its write
+    transaction. Until then an untrained index keeps searching exactly.
+    Deletes only set a tombstone; the arrays are compacted once a quarter of
+    the rows are dead. Each row carries the memory's importance so searches
+    can filter before scoring.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        train_threshold: int = 2048,
+        kmeans_iterations: int = 10,
+        retrain_growth: float = 4.0,
+        seed: int = 0
+    ):
+        self.dimension = dimension
+        self.train_threshold = train_threshold
+        self.kmeans_iterations = kmeans_iterations
+        self.retrain_growth = retrain_growth
+        self.seed = seed
+
+        self._size = 0
+        self._vectors = np.empty((0, dimension), dtype=EMBEDDING_DTYPE)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._importance = np.empty(0, dtype=np.float32)
+        self._alive = np.empty(0, dtype=bool)
+        self._lists = np.empty(0, dtype=np.int32)
+        self._rows: Dict[int, int] = {}
+
+        self.centroids: Optional[np.ndarray] = None
+        self._trained_size = 0
+        self._postings: List[List[int]] = []
+        self._posting_cache: Dict[int, np.ndarray] = {}
+        self._lock = threading.RLock()
+
+    # ==================== SIZE ====================
+
+    def __len__(self) -> int:
+        """Number of live vectors"""
+        return len(self._rows)
+
+    @property
+    def nlist(self) -> int:
+        """Number of inverted lists (0 until trained)"""
+        return 0 if self.centroids is None else len(self.centroids)
+
+    @property
+    def needs_training(self) -> bool:
+        """Whether the index has reached its training threshold or outgrown its lists"""
+        if self.centroids is None:
+            return len(self) >= self.train_threshold
+        return len(self) > self.retrain_growth * self._trained_size
+
+    def ids(self) -> np.ndarray:
+        """Ids of the live vectors"""
+        with self._lock:
+            return self._ids[:self._size][self._alive[:self._size]].copy()
+
+    # ==================== UPDATES ====================
+
+    def add(self, ids: Iterable[int], vectors: np.ndarray, importance: Optional[Iterable[float]] = None):
+        """Insert vectors, replacing any already indexed under the same id
+
+        A replaced vector keeps its importance when ``importance`` is not given;
+        new vectors default to 0.5.
+        """
+        ids = np.asarray(list(ids), dtype=np.int64)
+        if len(ids) == 0:
+            return
+        vectors = np.asarray(vectors, dtype=EMBEDDING_DTYPE).reshape(len(ids), self.dimension)
+
+        with self._lock:
+            previous = [self._rows.get(memory_id) for memory_id in ids.tolist()]
+            if importance is None:
+                values = np.array([
+                    0.5 if row is None else self._importance[row] for row in previous
+                ], dtype=np.float32)
+            else:
+                values = np.asarray(list(importance), dtype=np.float32)
+            self._tombstone([row for row in previous if row is not None])
+
+            start = self._size
+            self._reserve(start + len(ids))
+            end = start + len(ids)
+            self._vectors[start:end] = vectors
+            self._ids[start:end] = ids
+            self._importance[start:end] = values
+            self._alive[start:end] = True
+            self._lists[start:end] = -1
+            self._size = end
+            self._rows.update(zip(ids.tolist(), range(start, end)))
+
+            if self.centroids is not None:
+                self._assign(np.arange(start, end))
+
+    def remove(self, ids: Iterable[int]) -> int:
+        """Tombstone vectors by id; returns how many were indexed"""
+        with self._lock:
+            rows = [self._rows.pop(memory_id) for memory_id in ids if memory_id in self._rows]
+            self._tombstone(rows, forget=False)
+            if self._size and (self._size - len(self)) > self._size // 4:
+                self.compact()
+            return len(rows)
+
+    def retain(self, ids: Iterable[int], horizon: Optional[int] = None) -> int:
+        """Tombstone every vector whose id is not in ``ids``; returns how many
+
+        Ids above ``horizon`` (the largest id handed out when ``ids`` was read)
+        were written since and are kept.
+        """
+        with self._lock:
+            stale = np.setdiff1d(self.ids(), np.asarray(list(ids), dtype=np.int64))
+            if horizon is not None:
+                stale = stale[stale <= horizon]
+            return self.remove(stale.tolist())
+
+    def set_importance(self, ids: Iterable[int], importance: Iterable[float]):
+        """Refresh the importance used by the search prefilter"""
+        with self._lock:
+            for memory_id, value in zip(ids, importance):
+                row = self._rows.get(memory_id)
+                if row is not None:
+                    self._importance[row] = value
+
+    def _tombstone(self, rows: List[int], forget: bool = True):
+        if not rows:
+            return
+        rows = np.asarray(rows, dtype=np.intp)
+        if forget:
+            for memory_id in self._ids[rows].tolist():
+                self._rows.pop(memory_id, None)
+        self._alive[rows] = False
+
+    def _reserve(self, capacity: int):
+        """Grow the row arrays geometrically to hold ``capacity`` rows"""
+        if capacity <= len(self._ids):
+            return
+        capacity = max(capacity, 2 * len(self._ids), 64)
+        for name in ('_vectors', '_ids', '_importance', '_alive', '_lists'):
+            old = getattr(self, name)
+            grown = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            grown[:self._size] = old[:self._size]
+            setattr(self, name, grown)
+
+    def compact(self):
+        """Drop tombstoned rows and rebuild the inverted lists"""
+        with self._lock:
+            keep = np.flatnonzero(self._alive[:self._size])
+            self._vectors = self._vectors[keep]
+            self._ids = self._ids[keep]
+            self._importance = self._importance[keep]
+            self._lists = self._lists[keep]
+            self._alive = np.ones(len(keep), dtype=bool)
+            self._size = len(keep)
+            self._rows = dict(zip(self._ids.tolist(), range(self._size)))
+            self._rebuild_postings()
+
+    # ==================== CLUSTERING ====================
+
+    def train(self):
+        """Cluster the live vectors into about sqrt(n) lists with spherical k-means
+
+        k-means runs on a copied sample outside the index lock, so searches and
+        inserts carry on meanwhile; every row, including those added during
+        training, is assigned once the new centroids are installed.
+        """
+        with self._lock:
+            self.compact()
+            count = self._size
+            if count == 0:
+                self.centroids = None
+                return
+            nlist = max(1, int(math.sqrt(count)))
+            rng = np.random.default_rng(self.seed)
+
+            # Centroids converge long before every vector is seen
+            sample_size = min(count, max(64 * nlist, min(count, ASSIGN_CHUNK)))
+            sample = self._vectors[rng.choice(count, sample_size, replace=False)]
+
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            counts = np.bincount(labels, minlength=nlist)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            empty = counts == 0
+            sums = np.zeros_like(centroids)
+            sums[~empty] = np.add.reduceat(sample[np.argsort(labels, kind='stable')], starts[~empty], axis=0)
+            if empty.any():  # Reseed empty lists on random vectors
+                sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = (sums / np.where(norms == 0, 1, norms)).astype(EMBEDDING_DTYPE)
+
+        with self._lock:
+            self.centroids = centroids
+            self._trained_size = count
+            self._assign(np.arange(self._size), rebuild=True)
+        logger.debug(f"Trained IVF index: {count} vectors in {nlist} lists")
+
+    def _assign(self, rows: np.ndarray, rebuild: bool = False):
+        """Assign rows to their nearest list"""
+        for start in range(0, len(rows), ASSIGN_CHUNK):
+            chunk = rows[start:start + ASSIGN_CHUNK]
+            self._lists[chunk] = np.argmax(self._vectors[chunk] @ self.centroids.T, axis=1)
+        if rebuild:
+            self._rebuild_postings()
+            return
+        for row, list_id in zip(rows.tolist(), self._lists[rows].tolist()):
+            self._postings[list_id].append(row)
+            self._posting_cache.pop(list_id, None)
+
+    def _rebuild_postings(self):
+        self._posting_cache = {}
+        if self.centroids is None:
+            self._postings = []
+            return
+        order = np.argsort(self._lists[:self._size], kind='stable')
+        bounds = np.searchsorted(self._lists[:self._size][order], np.arange(len(self.centroids) + 1))
+        self._postings = [order[bounds[i]:bounds[i + 1]].tolist() for i in range(len(self.centroids))]
+
+    def _posting(self, list_id: int) -> np.ndarray:
+        rows = self._posting_cache.get(list_id)
+        if rows is None:
+            rows = np.asarray(self._postings[list_id], dtype=np.intp)
+            self._posting_cache[list_id] = rows
+        return rows
+
+    # ==================== SEARCH ====================
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        nprobe: int = 8,
+        min_importance: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the ids and cosine similarities of the approximate k nearest vectors
+
+        Only vectors in the ``nprobe`` lists closest to the query are scored;
+        ``min_importance`` drops rows before scoring.
+        """
+        query = np.asarray(query, dtype=EMBEDDING_DTYPE).ravel()
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        with self._lock:
+            if self.centroids is None:
+                rows = np.arange(self._size)
+            else:
+                nprobe = max(1, min(nprobe, len(self.centroids)))
+                closest = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+                rows = np.concatenate([self._posting(int(list_id)) for list_id in closest])
+
+            mask = self._alive[rows]
+            if min_importance is not None:
+                mask &= self._importance[rows] >= min_importance
+            rows = rows[mask]
+            if k <= 0 or len(rows) == 0:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+            scores = self._vectors[rows] @ query
+            k = min(k, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind='stable')]
+            return self._ids[rows[top]].copy(), scores[top]
+
+    # ==================== PERSISTENCE ====================
+
+    def save(self, path: Path):
+        """Write the index to an ``.npz`` file, replacing it atomically"""
+        path = Path(path)
+        with self._lock:
+            self.compact()
+            arrays = {
+                'vectors': self._vectors, 'ids': self._ids,
+                'importance': self._importance, 'lists': self._lists,
+                'trained_size': np.array(self._trained_size)
+            }
+            if self.centroids is not None:
+                arrays['centroids'] = self.centroids
+            tmp = path.with_name(path.name + '.tmp')
+            with open(tmp, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path, dimension: int, **options) -> "IVFIndex":
+        """Read an index written by ``save``; an unreadable file or a dimension change gives an empty index"""
+        index = cls(dimension, **options)
+        try:
+            with np.load(path) as data:
+                vectors = data['vectors']
+                if vectors.shape[1:] != (dimension,):
+                    return index
+                index._vectors = vectors.astype(EMBEDDING_DTYPE, copy=False)
+                index._ids = data['ids'].astype(np.int64, copy=False)
+                index._importance = data['importance'].astype(np.float32, copy=False)
+                index._lists = data['lists'].astype(np.int32, copy=False)
+                index._trained_size = int(data['trained_size'])
+                if 'centroids' in data:
+                    index.centroids = data['centroids'].astype(EMBEDDING_DTYPE, copy=False)
+        except (FileNotFoundError, OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"Discarding unreadable ANN index {path}: {e}")
+            return index
+
+        index._size = len(index._ids)
+        index._alive = np.ones(index._size, dtype=bool)
+        index._rows = dict(zip(index._ids.tolist(), range(index._size)))
+        index._rebuild_postings()
+        return index
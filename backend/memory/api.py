@@ -5,40 +5,380 @@ Provides CRUD operations and advanced memory functions for all memory types
 """
 
 import sqlite3
+import re
+import base64
 import json
+import math
+import heapq
+import itertools
+import threading
 import logging
+import functools
+import tempfile
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple, Union
+from typing import Dict, List, Optional, Any, Tuple, Union, Iterable, Iterator, Callable
 from dataclasses import asdict
-import numpy as np
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 
 from schemas.memory_models import (
     MemoryEntry, MemoryType, EmotionalValence, MemoryConfig
 )
+from memory.pool import (
+    ConnectionPool, PooledConnection, ReadOnlyPool, ReadConnection, memory_database_uri
+)
+from memory.writer import WriteQueue
+from memory.access import AccessTracker
+from memory.migrations import MigrationRunner
+from memory.cache import SearchCache
+from memory.timings import StageTimings, BudgetStats
+from memory.timestamps import epoch_ms, insert_stamps, set_stamps
+from memory import ranking
+from memory.embeddings import EMBEDDING_FIELDS, EmbeddingCache, HashingEmbedder, memory_text
+from memory.embedding_worker import EmbeddingWorker
+from memory.quantization import QuantizedIndex, encode_embedding, decode_embedding, decode_embeddings
+from memory.vectors import VectorIndex, vector_index_dir, agent_file_stem
+from memory.ann import IVFIndex
 
 logger = logging.getLogger(__name__)
 
+# Per-type sources for search: (table, ranking importance, thresholded,
+# confidence, intensity); NULL inputs are neutral in the blended score
+SEARCH_SOURCES = {
+    'episodic': ('episodic_memory', 'm.importance', True, 'NULL', 'm.emotional_intensity'),
+    'semantic': ('semantic_memory', 'm.importance', True, 'm.confidence', 'NULL'),
+    'procedural': ('procedural_memory', '0.5', False, 'm.proficiency_level', 'NULL'),
+    'emotional': ('emotional_memory', '0.5', False, 'NULL', 'm.intensity')
+}
+
+# Candidate type codes follow name order, the final search tie-break
+SEARCH_TYPES = sorted(SEARCH_SOURCES)
+SEARCH_TYPE_CODES = {memory_type: code for code, memory_type in enumerate(SEARCH_TYPES)}
+
+# Keyset pagination rank column per type; pages run (rank, created_at_ms, id) descending
+PAGE_RANK_COLUMNS = {
+    'episodic': 'importance',
+    'semantic': 'importance',
+    'procedural': 'proficiency_level',
+    'emotional': 'intensity'
+}
+
+# JSON-encoded columns per type, with the value decoded when a row holds NULL
+JSON_COLUMNS = {
+    'episodic': {'participants': '[]', 'tags': '[]', 'metadata': '{}'},
+    'semantic': {'relationships': '{}', 'tags': '[]', 'metadata': '{}'},
+    'procedural': {'procedure_steps': '[]', 'conditions': '{}', 'tags': '[]', 'metadata': '{}'},
+    'emotional': {'physiological_response': '{}', 'tags': '[]', 'metadata': '{}'}
+}
+
+HOUR_MS = 3_600_000
+DAY_MS = 24 * HOUR_MS
+
+def recency_score(created_at_ms: Optional[int], now_ms: Optional[int] = None) -> float:
+    """Calculate recency score for memory relevance
+    
+    Scalar form of the recency term in ``memory.ranking.blended_scores``.
+    """
+    if created_at_ms is None:
+        return 0.5  # Default score for rows without a timestamp
+    age_ms = (epoch_ms() if now_ms is None else now_ms) - created_at_ms
+    # Exponential decay with half-life of 24 hours
+    return math.exp(-age_ms / DAY_MS)
+
+_TRIGRAM_RUN = re.compile(r"[^%_]{3}")
+
+def substring_source(table: str, terms: List[Tuple[str, str]]) -> Tuple[str, List[str]]:
+    """Build a FROM source (aliased ``m``) for rows where any ``column LIKE '%text%'``
+
+    When every text has three literal characters in a row, rows are found
+    through the table's trigram index and re-checked with the original LIKE,
+    so results match a plain scan; shorter patterns fall back to the scan.
+    """
+    patterns = [f"%{text}%" for _, text in terms]
+    if not all(_TRIGRAM_RUN.search(text) for _, text in terms):
+        matches = " OR ".join(f"{column} LIKE ?" for column, _ in terms)
+        return f"(SELECT * FROM {table} WHERE {matches}) m", patterns
+    recheck = " OR ".join(f"m.{column} LIKE ?" for column, _ in terms)
+    hits = " UNION ".join(f"SELECT rowid AS id FROM {table}_trigram WHERE {column} LIKE ?" for column, _ in terms)
+    return (
+        f"({hits}) hits CROSS JOIN {table} m ON m.id = hits.id AND ({recheck})",
+        patterns + patterns
+    )
+
+def _page_key(memory_type: str, row: Dict[str, Any]) -> Tuple[Any, Any, int]:
+    """Get the keyset position of a row: (rank, created_at_ms, id)"""
+    return (row[PAGE_RANK_COLUMNS[memory_type]], row['created_at_ms'], row['id'])
+
+def _encode_cursor(memory_type: str, key: Tuple[Any, Any, int]) -> str:
+    """Pack a keyset position into an opaque cursor token"""
+    return base64.urlsafe_b64encode(json.dumps([memory_type, *key]).encode()).decode()
+
+def _decode_cursor(memory_type: str, cursor: str) -> Tuple[Any, Any, int]:
+    """Unpack a cursor token issued by ``page_memories`` for the same memory type"""
+    try:
+        cursor_type, rank, created_at_ms, memory_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid memory cursor: {cursor!r}") from e
+    if cursor_type != memory_type:
+        raise ValueError(f"Cursor was issued for {cursor_type} memories, not {memory_type}")
+    return rank, created_at_ms, memory_id
+
+class SearchResults(list):
+    """Results of a latency-budgeted search
+
+    ``partial`` is True when the budget ran out before every tier was
+    searched; ``searched`` names the tiers that were, in the order visited.
+    """
+
+    def __init__(self, results: Iterable[Dict[str, Any]] = (), partial: bool = False,
+                 searched: Iterable[str] = ()):
+        super().__init__(results)
+        self.partial = partial
+        self.searched = tuple(searched)
+
+def queued_write(method):
+    """Route a write method through the group-commit queue when it is enabled
+
+    Calls made from the writer thread, or from inside an open connection block
+    (where queuing would wait on the caller's own write lock), run inline.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        write_queue = self.write_queue
+        if (
+            write_queue is None
+            or write_queue.owns_current_thread()
+            or self.pool.in_transaction()
+        ):
+            return method(self, *args, **kwargs)
+        return write_queue.submit(method, self, *args, **kwargs).result()
+    return wrapper
+
+def invalidates_search(method):
+    """Retire the agent's cached searches once a write method returns"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.search_cache.invalidate(args[0] if args else kwargs['agent_id'])
+    return wrapper
+
 class MemoryAPI:
     """Comprehensive memory management system for AI agents"""
     
-    def __init__(self, db_path: str = "backend/data/lexos.db"):
+    def __init__(self, db_path: str = "backend/data/lexos.db", use_write_queue: bool = False,
+                 run_migrations: bool = True, storage: str = "disk"):
         self.db_path = db_path
+        self.storage = storage
         self.config = MemoryConfig()
+        timeout = self.config.CONNECTION_TIMEOUT_SECONDS
+        
+        self._keeper = None
+        self._row_column_cache: Dict[str, str] = {}
+        self._search_executor: Optional[ThreadPoolExecutor] = None
+        self._search_executor_lock = threading.Lock()
+        self.embedder = HashingEmbedder(dimension=self.config.EMBEDDING_DIMENSION)
+        self.embedding_cache = EmbeddingCache(self.embedder, max_entries=self.config.EMBEDDING_CACHE_SIZE)
+        self.search_cache = SearchCache(
+            max_entries=self.config.SEARCH_CACHE_SIZE,
+            ttl_seconds=self.config.SEARCH_CACHE_TTL_SECONDS
+        )
+        self.search_timings = StageTimings()
+        self.search_budgets = BudgetStats()
+        if storage == "disk":
+            self.pool = ConnectionPool(db_path, timeout=timeout)
+            self.read_pool = ReadOnlyPool(db_path, size=self.config.READ_POOL_SIZE, timeout=timeout)
+        elif storage == "memory":
+            # db_path only names the database; it lives in process memory
+            uri = memory_database_uri(db_path)
+            self.pool = ConnectionPool(uri, timeout=timeout, uri=True)
+            self.read_pool = ReadOnlyPool(
+                db_path, size=self.config.READ_POOL_SIZE, timeout=timeout, uri=uri + "&mode=ro"
+            )
+            # Hold one connection open for the API's lifetime so the database
+            # is not freed between pooled connections
+            self._keeper = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            raise ValueError(f"Unsupported memory storage backend: {storage}")
+        
+        # Embedding matrices live beside the database; an in-memory database
+        # gets a scratch directory that goes away with it
+        if storage == "memory":
+            vector_dir = tempfile.mkdtemp(prefix="lexos-vectors-")
+        else:
+            vector_dir = vector_index_dir(db_path, self.config.VECTOR_INDEX_DIR)
+        self.vector_index = VectorIndex(vector_dir, self.config.EMBEDDING_DIMENSION)
+        self._vector_synced: set = set()
+        self._ann_indexes: Dict[Tuple[str, str], IVFIndex] = {}
+        self._quantized_indexes: Dict[Tuple[str, str], QuantizedIndex] = {}
+        self._ann_lock = threading.RLock()
+        
+        self.access_tracker = AccessTracker(
+            self.pool,
+            flush_interval=self.config.ACCESS_FLUSH_INTERVAL_SECONDS,
+            max_pending=self.config.ACCESS_BUFFER_MAX_PENDING
+        )
+        
+        self.embedding_worker = EmbeddingWorker(
+            self._embed_pending_batch,
+            poll_interval=self.config.EMBEDDING_POLL_INTERVAL_SECONDS
+        )
+        
+        self.write_queue = None
+        if use_write_queue:
+            self.write_queue = WriteQueue(
+                self.pool,
+                batch_size=self.config.WRITE_QUEUE_BATCH_SIZE,
+                flush_interval_ms=self.config.WRITE_QUEUE_FLUSH_INTERVAL_MS
+            )
+            self.write_queue.start()
+        
+        if run_migrations:
+            self.apply_migrations()
+        
+        # Rows left without embeddings by an earlier process are picked up on start
+        if self.config.EMBEDDING_BACKGROUND:
+            self.embedding_worker.notify()
+        
+    def get_connection(self) -> PooledConnection:
+        """Get the calling thread's pooled database connection"""
+        return self.pool.connection()
+    
+    def get_read_connection(self) -> Union[ReadConnection, PooledConnection]:
+        """Get a read-only connection for retrieval
+        
+        A thread already inside a write block keeps using its write connection
+        so the read sees that block's uncommitted changes.
+        """
+        if self.pool.in_transaction():
+            return self.pool.connection()
+        return self.read_pool.connection()
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get connection pool statistics"""
+        return self.pool.get_stats()
+    
+    def get_read_pool_stats(self) -> Dict[str, Any]:
+        """Get read-only connection pool statistics"""
+        return self.read_pool.get_stats()
+    
+    def get_write_queue_stats(self) -> Optional[Dict[str, Any]]:
+        """Get group-commit write queue statistics, if the queue is enabled"""
+        return self.write_queue.get_stats() if self.write_queue else None
+    
+    def get_search_cache_stats(self) -> Dict[str, Any]:
+        """Get search result cache statistics"""
+        return self.search_cache.get_stats()
+    
+    def get_search_timing_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-stage latency statistics of hybrid searches"""
+        return self.search_timings.get_stats()
+    
+    def get_search_budget_stats(self, agent_id: str) -> Dict[str, Any]:
+        """Get how many of an agent's latency-budgeted searches ran out of budget"""
+        return self.search_budgets.get_stats(agent_id)
+    
+    def invalidate_search_cache(self, agent_id: str):
+        """Retire an agent's cached searches after writing its memories directly"""
+        self.search_cache.invalidate(agent_id)
+    
+    def get_access_tracking_stats(self) -> Dict[str, Any]:
+        """Get buffered access tracking statistics"""
+        return self.access_tracker.get_stats()
+    
+    def flush_access_tracking(self) -> int:
+        """Write buffered access counts to the database"""
+        return self.access_tracker.flush()
+    
+    def get_embedding_pipeline_stats(self) -> Dict[str, Any]:
+        """Get background embedding progress, lag and content-hash cache statistics
+        
+        ``pending`` counts memories still without an embedding and ``lag_ms``
+        is the age of the oldest of them (0 when nothing is pending).
+        """
+        stats = self.embedding_worker.get_stats()
+        pending = 0
+        oldest = None
+        with self.get_read_connection() as conn:
+            for memory_type in SEARCH_TYPES:
+                count, created_at_ms = conn.execute(f"""
+                    SELECT COUNT(*), MIN(created_at_ms) FROM {SEARCH_SOURCES[memory_type][0]}
+                    WHERE embedding IS NULL
+                """).fetchone()
+                pending += count
+                if created_at_ms is not None:
+                    oldest = created_at_ms if oldest is None else min(oldest, created_at_ms)
+        stats['pending'] = pending
+        stats['lag_ms'] = max(0, epoch_ms() - oldest) if oldest is not None else 0
+        stats['cache'] = self.embedding_cache.get_stats()
+        return stats
+    
+    def backfill_embeddings(self, max_batches: Optional[int] = None) -> int:
+        """Embed every memory stored without an embedding, one batch per transaction
+        
+        Works on databases written before embeddings existed as well as rows
+        waiting for the background worker. Returns the number of rows filled.
+        """
+        return self.embedding_worker.drain(max_batches)
+    
+    def apply_migrations(self) -> List[int]:
+        """Apply pending schema migrations, returning the versions applied"""
+        with self.get_connection() as conn:
+            return MigrationRunner().apply(conn)
+    
+    def optimize_database(self, full_analyze: bool = False):
+        """Refresh query planner statistics
+        
+        ``PRAGMA optimize`` only re-analyzes tables whose statistics have gone
+        stale, so it is cheap enough to run on a schedule; ``full_analyze``
+        rebuilds statistics for every table and index.
+        """
+        with self.get_connection() as conn:
+            conn.execute("ANALYZE" if full_analyze else "PRAGMA optimize")
+    
+    def close(self):
+        """Flush buffered and queued writes and close all pooled database connections"""
+        self.embedding_worker.stop()
+        self.access_tracker.stop()
+        if self.write_queue:
+            self.write_queue.stop()
+        if self._search_executor is not None:
+            self._search_executor.shutdown()
+        if self.storage != "memory":
+            self._save_ann_indexes()
+        self.pool.close_all()
+        self.read_pool.close_all()
+        if self._keeper is not None:
+            self._keeper.close()
+            self._keeper = None
+        self.vector_index.close(remove=self.storage == "memory")
+    
+    def spill_to_disk(self, path: str) -> str:
+        """Write a consistent snapshot of the database to a file on disk
+        
+        Mainly for in-memory storage, whose contents are otherwise lost on
+        close; works for on-disk databases as an online backup too.
+        """
+        self.flush_access_tracking()
+        
+        target = sqlite3.connect(path)
+        try:
+            with self.get_connection() as conn:
+                conn.backup(target)
+        finally:
+            target.close()
         
-    def get_connection(self) -> sqlite3.Connection:
-        """Get database connection with optimizations"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        # Enable WAL mode for better concurrency
-        conn.execute("PRAGMA journal_mode=WAL")
-        conn.execute("PRAGMA synchronous=NORMAL")
-        conn.execute("PRAGMA cache_size=10000")
-        conn.execute("PRAGMA temp_store=memory")
-        return conn
+        logger.info(f"Spilled memory database {self.db_path} to {path}")
+        return path
     
     # ==================== EPISODIC MEMORY ====================
     
+    @invalidates_search
+    @queued_write
     def store_episodic_memory(
         self,
         agent_id: str,
@@ -67,13 +407,19 @@ class MemoryAPI:
             if not summary and len(content) > 200:
                 summary = content[:200] + "..."
             
-            cursor.execute("""
+            embedding = self._stored_embedding('episodic', {
+                'event_type': event_type, 'content': content,
+                'summary': summary, 'lessons_learned': lessons_learned
+            })
+            
+            stamp_columns, stamp_placeholders, stamps = insert_stamps('episodic_memory')
+            cursor.execute(f"""
                 INSERT INTO episodic_memory (
                     agent_id, session_id, event_type, content, summary,
                     participants, location_context, temporal_context,
                     importance, emotional_valence, emotional_intensity,
-                    lessons_learned, tags, metadata
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    lessons_learned, tags, metadata, embedding, {stamp_columns}
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {stamp_placeholders})
             """, (
                 agent_id, session_id, event_type, content, summary,
                 json.dumps(participants or []),
@@ -84,10 +430,12 @@ class MemoryAPI:
                 emotional_intensity,
                 lessons_learned,
                 json.dumps(tags or []),
-                json.dumps(metadata or {})
-            ))
+                json.dumps(metadata or {}),
+                embedding
+            ) + stamps)
             
             memory_id = cursor.lastrowid
+            self.index_embeddings(agent_id, 'episodic', [memory_id], [embedding], [importance])
             
             # Create associations with recent memories (only if not in test mode)
             try:
@@ -112,7 +460,7 @@ class MemoryAPI:
     ) -> List[Dict[str, Any]]:
         """Retrieve episodic memories with filtering"""
         
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             
             query = """
@@ -144,14 +492,16 @@ class MemoryAPI:
                 memory['tags'] = json.loads(memory['tags'] or '[]')
                 memory['metadata'] = json.loads(memory['metadata'] or '{}')
                 memories.append(memory)
-                
-                # Update access tracking
-                self._update_memory_access(memory['id'], "episodic")
+            
+            # Update access tracking
+            self.access_tracker.record_many(("episodic", memory['id']) for memory in memories)
             
             return memories
     
     # ==================== SEMANTIC MEMORY ====================
     
+    @invalidates_search
+    @queued_write
     def store_semantic_memory(
         self,
         agent_id: str,
@@ -169,6 +519,10 @@ class MemoryAPI:
     ) -> int:
         """Store semantic knowledge"""
         
+        embedding = self._stored_embedding('semantic', {
+            'concept': concept, 'definition': definition, 'category': category
+        })
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
@@ -182,12 +536,13 @@ class MemoryAPI:
             
             if existing:
                 # Update existing concept
-                cursor.execute("""
+                stamp_assignments, stamps = set_stamps(('updated_at',))
+                cursor.execute(f"""
                     UPDATE semantic_memory SET
                         definition = ?, category = ?, subcategory = ?,
                         relationships = ?, confidence = ?, source = ?,
                         evidence = ?, importance = ?, tags = ?,
-                        updated_at = CURRENT_TIMESTAMP, metadata = ?
+                        metadata = ?, embedding = ?, {stamp_assignments}
                     WHERE id = ?
                 """, (
                     definition, category, subcategory,
@@ -195,26 +550,30 @@ class MemoryAPI:
                     confidence, source, evidence, importance,
                     json.dumps(tags or []),
                     json.dumps(metadata or {}),
-                    existing['id']
-                ))
+                    embedding
+                ) + stamps + (existing['id'],))
                 memory_id = existing['id']
             else:
                 # Insert new concept
-                cursor.execute("""
+                stamp_columns, stamp_placeholders, stamps = insert_stamps('semantic_memory')
+                cursor.execute(f"""
                     INSERT INTO semantic_memory (
                         agent_id, concept, definition, category, subcategory,
                         relationships, confidence, source, evidence,
-                        importance, tags, metadata
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        importance, tags, metadata, embedding, {stamp_columns}
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {stamp_placeholders})
                 """, (
                     agent_id, concept, definition, category, subcategory,
                     json.dumps(relationships or {}),
                     confidence, source, evidence, importance,
                     json.dumps(tags or []),
-                    json.dumps(metadata or {})
-                ))
+                    json.dumps(metadata or {}),
+                    embedding
+                ) + stamps)
                 memory_id = cursor.lastrowid
             
+            self.index_embeddings(agent_id, 'semantic', [memory_id], [embedding], [importance])
+            
             # Create semantic associations
             if relationships:
                 self._create_semantic_associations(agent_id, memory_id, relationships)
@@ -232,24 +591,24 @@ class MemoryAPI:
     ) -> List[Dict[str, Any]]:
         """Retrieve semantic knowledge"""
         
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             
-            query = """
-                SELECT * FROM semantic_memory 
-                WHERE agent_id = ? AND confidence >= ?
-            """
-            params = [agent_id, confidence_threshold]
-            
+            source, params = "semantic_memory m", []
             if concept:
-                query += " AND concept LIKE ?"
-                params.append(f"%{concept}%")
+                source, params = substring_source("semantic_memory", [("concept", concept)])
+            
+            query = f"""
+                SELECT m.* FROM {source}
+                WHERE m.agent_id = ? AND m.confidence >= ?
+            """
+            params += [agent_id, confidence_threshold]
             
             if category:
-                query += " AND category = ?"
+                query += " AND m.category = ?"
                 params.append(category)
             
-            query += " ORDER BY importance DESC, confidence DESC LIMIT ?"
+            query += " ORDER BY m.importance DESC, m.confidence DESC LIMIT ?"
             params.append(limit)
             
             cursor.execute(query, params)
@@ -261,14 +620,16 @@ class MemoryAPI:
                 memory['tags'] = json.loads(memory['tags'] or '[]')
                 memory['metadata'] = json.loads(memory['metadata'] or '{}')
                 memories.append(memory)
-                
-                # Update access tracking
-                self._update_memory_access(memory['id'], "semantic")
+            
+            # Update access tracking
+            self.access_tracker.record_many(("semantic", memory['id']) for memory in memories)
             
             return memories
     
     # ==================== PROCEDURAL MEMORY ====================
     
+    @invalidates_search
+    @queued_write
     def store_procedural_memory(
         self,
         agent_id: str,
@@ -283,28 +644,37 @@ class MemoryAPI:
     ) -> int:
         """Store procedural knowledge/skills"""
         
+        embedding = self._stored_embedding('procedural', {
+            'skill_name': skill_name, 'skill_type': skill_type,
+            'procedure_steps': procedure_steps
+        })
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            cursor.execute("""
+            stamp_columns, stamp_placeholders, stamps = insert_stamps('procedural_memory')
+            cursor.execute(f"""
                 INSERT INTO procedural_memory (
                     agent_id, skill_name, skill_type, procedure_steps,
                     conditions, success_criteria, proficiency_level,
-                    tags, metadata
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    tags, metadata, embedding, {stamp_columns}
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {stamp_placeholders})
             """, (
                 agent_id, skill_name, skill_type,
                 json.dumps(procedure_steps),
                 json.dumps(conditions or {}),
                 success_criteria, proficiency_level,
                 json.dumps(tags or []),
-                json.dumps(metadata or {})
-            ))
+                json.dumps(metadata or {}),
+                embedding
+            ) + stamps)
             
             memory_id = cursor.lastrowid
+            self.index_embeddings(agent_id, 'procedural', [memory_id], [embedding])
             logger.info(f"Stored procedural memory {memory_id} for skill '{skill_name}'")
             return memory_id
     
+    @invalidates_search
     def update_skill_proficiency(
         self,
         agent_id: str,
@@ -336,22 +706,24 @@ class MemoryAPI:
             proficiency_adjustment = 0.01 if success else -0.005
             new_proficiency = min(1.0, max(0.0, skill['proficiency_level'] + proficiency_adjustment))
             
-            cursor.execute("""
+            stamp_assignments, stamps = set_stamps(('last_used', 'updated_at'))
+            cursor.execute(f"""
                 UPDATE procedural_memory SET
                     usage_frequency = ?, success_rate = ?, proficiency_level = ?,
-                    last_used = CURRENT_TIMESTAMP, improvement_notes = ?,
-                    updated_at = CURRENT_TIMESTAMP
+                    improvement_notes = ?, {stamp_assignments}
                 WHERE id = ?
             """, (
                 new_frequency, new_success_rate, new_proficiency,
-                improvement_notes, skill['id']
-            ))
+                improvement_notes
+            ) + stamps + (skill['id'],))
             
             logger.info(f"Updated skill '{skill_name}' proficiency to {new_proficiency:.3f}")
             return True
     
     # ==================== EMOTIONAL MEMORY ====================
     
+    @invalidates_search
+    @queued_write
     def store_emotional_memory(
         self,
         agent_id: str,
@@ -363,11 +735,17 @@ class MemoryAPI:
         context: Optional[str] = None,
         behavioral_tendency: Optional[str] = None,
         coping_strategy: Optional[str] = None,
+        resolution_outcome: Optional[str] = None,
         tags: Optional[List[str]] = None,
         metadata: Optional[Dict[str, Any]] = None
     ) -> int:
         """Store emotional memory"""
         
+        embedding = self._stored_embedding('emotional', {
+            'emotion_type': emotion_type, 'trigger_stimulus': trigger_stimulus,
+            'context': context
+        })
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
@@ -376,22 +754,26 @@ class MemoryAPI:
                 emotion_type, valence, arousal, intensity
             )
             
-            cursor.execute("""
+            stamp_columns, stamp_placeholders, stamps = insert_stamps('emotional_memory')
+            cursor.execute(f"""
                 INSERT INTO emotional_memory (
                     agent_id, trigger_stimulus, emotion_type, valence,
                     arousal, intensity, context, physiological_response,
-                    behavioral_tendency, coping_strategy, tags, metadata
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    behavioral_tendency, coping_strategy, resolution_outcome,
+                    tags, metadata, embedding, {stamp_columns}
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {stamp_placeholders})
             """, (
                 agent_id, trigger_stimulus, emotion_type, valence,
                 arousal, intensity, context,
                 json.dumps(physiological_response),
-                behavioral_tendency, coping_strategy,
+                behavioral_tendency, coping_strategy, resolution_outcome,
                 json.dumps(tags or []),
-                json.dumps(metadata or {})
-            ))
+                json.dumps(metadata or {}),
+                embedding
+            ) + stamps)
             
             memory_id = cursor.lastrowid
+            self.index_embeddings(agent_id, 'emotional', [memory_id], [embedding])
             
             # Create emotional associations with recent memories
             if intensity > self.config.EMOTIONAL_SIGNIFICANCE_THRESHOLD:
@@ -410,24 +792,24 @@ class MemoryAPI:
     ) -> List[Dict[str, Any]]:
         """Retrieve emotional patterns and triggers"""
         
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             
-            query = """
-                SELECT * FROM emotional_memory 
-                WHERE agent_id = ? AND intensity >= ?
+            source, params = "emotional_memory m", []
+            if trigger_pattern:
+                source, params = substring_source("emotional_memory", [("trigger_stimulus", trigger_pattern)])
+            
+            query = f"""
+                SELECT m.* FROM {source}
+                WHERE m.agent_id = ? AND m.intensity >= ?
             """
-            params = [agent_id, intensity_threshold]
+            params += [agent_id, intensity_threshold]
             
             if emotion_type:
-                query += " AND emotion_type = ?"
+                query += " AND m.emotion_type = ?"
                 params.append(emotion_type)
             
-            if trigger_pattern:
-                query += " AND trigger_stimulus LIKE ?"
-                params.append(f"%{trigger_pattern}%")
-            
-            query += " ORDER BY intensity DESC, created_at DESC LIMIT ?"
+            query += " ORDER BY m.intensity DESC, m.created_at DESC LIMIT ?"
             params.append(limit)
             
             cursor.execute(query, params)
@@ -439,14 +821,15 @@ class MemoryAPI:
                 memory['tags'] = json.loads(memory['tags'] or '[]')
                 memory['metadata'] = json.loads(memory['metadata'] or '{}')
                 memories.append(memory)
-                
-                # Update access tracking
-                self._update_memory_access(memory['id'], "emotional")
+            
+            # Update access tracking
+            self.access_tracker.record_many(("emotional", memory['id']) for memory in memories)
             
             return memories
     
     # ==================== WORKING MEMORY ====================
     
+    @queued_write
     def add_to_working_memory(
         self,
         agent_id: str,
@@ -476,17 +859,18 @@ class MemoryAPI:
             else:
                 expires_at = datetime.utcnow() + timedelta(minutes=self.config.WORKING_MEMORY_TIMEOUT_MINUTES)
             
-            cursor.execute("""
+            stamp_columns, stamp_placeholders, stamps = insert_stamps('working_memory')
+            cursor.execute(f"""
                 INSERT INTO working_memory (
                     agent_id, session_id, content_type, content, priority,
                     capacity_weight, source_memory_id, source_memory_type,
-                    expires_at, metadata
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    expires_at, expires_at_ms, metadata, {stamp_columns}
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {stamp_placeholders})
             """, (
                 agent_id, session_id, content_type, content, priority,
                 capacity_weight, source_memory_id, source_memory_type,
-                expires_at, json.dumps(metadata or {})
-            ))
+                expires_at, epoch_ms(expires_at), json.dumps(metadata or {})
+            ) + stamps)
             
             memory_id = cursor.lastrowid
             logger.info(f"Added item {memory_id} to working memory")
@@ -509,9 +893,9 @@ class MemoryAPI:
             query = """
                 SELECT * FROM working_memory 
                 WHERE agent_id = ? AND session_id = ?
-                AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)
+                AND (expires_at_ms IS NULL OR expires_at_ms > ?)
             """
-            params = [agent_id, session_id]
+            params = [agent_id, session_id, epoch_ms()]
             
             if content_type:
                 query += " AND content_type = ?"
@@ -526,12 +910,13 @@ class MemoryAPI:
                 memory = dict(row)
                 memory['metadata'] = json.loads(memory['metadata'] or '{}')
                 memories.append(memory)
-                
-                # Update last accessed
-                cursor.execute("""
+            
+            # Update last accessed
+            if memories:
+                cursor.executemany("""
                     UPDATE working_memory SET last_accessed = CURRENT_TIMESTAMP 
                     WHERE id = ?
-                """, (memory['id'],))
+                """, [(memory['id'],) for memory in memories])
             
             return memories
     
@@ -569,26 +954,28 @@ class MemoryAPI:
                 new_strength = min(1.0, existing['strength'] + 0.1)
                 new_count = existing['reinforcement_count'] + 1
                 
-                cursor.execute("""
+                stamp_assignments, stamps = set_stamps(('last_reinforced',))
+                cursor.execute(f"""
                     UPDATE memory_associations SET
-                        strength = ?, reinforcement_count = ?,
-                        last_reinforced = CURRENT_TIMESTAMP
+                        strength = ?, reinforcement_count = ?, {stamp_assignments}
                     WHERE id = ?
-                """, (new_strength, new_count, existing['id']))
+                """, (new_strength, new_count) + stamps + (existing['id'],))
                 
                 return existing['id']
             else:
                 # Create new association
-                cursor.execute("""
+                stamp_columns, stamp_placeholders, stamps = insert_stamps('memory_associations')
+                cursor.execute(f"""
                     INSERT INTO memory_associations (
                         agent_id, memory1_id, memory1_type, memory2_id, memory2_type,
-                        association_type, strength, direction, context, metadata
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        association_type, strength, direction, context, metadata,
+                        {stamp_columns}
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {stamp_placeholders})
                 """, (
                     agent_id, memory1_id, memory1_type, memory2_id, memory2_type,
                     association_type, strength, direction, context,
                     json.dumps(metadata or {})
-                ))
+                ) + stamps)
                 
                 return cursor.lastrowid
     
@@ -603,7 +990,7 @@ class MemoryAPI:
     ) -> List[Dict[str, Any]]:
         """Find memories associated with a given memory"""
         
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             
             query = """
@@ -640,6 +1027,344 @@ class MemoryAPI:
             cursor.execute(query, params)
             return [dict(row) for row in cursor.fetchall()]
     
+    # ==================== PAGINATION ====================
+    
+    def page_memories(
+        self,
+        agent_id: str,
+        memory_type: str,
+        page_size: int = 100,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Read one page of an agent's memories of a type
+        
+        Pages run in (rank, created_at_ms, id) descending order, where rank is
+        importance for episodic and semantic memories, proficiency for
+        procedural and intensity for emotional ones. Pass the returned
+        ``next_cursor`` (None after the last page) to get the following page;
+        each page seeks straight to its cursor, so deep pages cost the same as
+        the first. Paging does not count as access.
+        """
+        after = _decode_cursor(memory_type, cursor) if cursor else None
+        with self.get_read_connection() as conn:
+            memories = self._keyset_page(conn, agent_id, memory_type, page_size + 1, after)
+        
+        next_cursor = None
+        if len(memories) > page_size:
+            memories = memories[:page_size]
+            next_cursor = _encode_cursor(memory_type, _page_key(memory_type, memories[-1]))
+        return {'memories': memories, 'next_cursor': next_cursor}
+    
+    def iter_memories(
+        self,
+        agent_id: str,
+        memory_type: str,
+        chunk_size: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream all of an agent's memories of a type in ``page_memories`` order
+        
+        Rows are read ``chunk_size`` (default ``PAGE_CHUNK_SIZE``) at a time
+        inside one read transaction, so the stream is a consistent snapshot and
+        memory use stays flat however many rows the agent has. The read
+        connection is held until the generator is exhausted or closed; consume
+        it on the thread that created it.
+        """
+        chunk_size = chunk_size or self.config.PAGE_CHUNK_SIZE
+        with self.get_read_connection() as conn:
+            started = not conn.in_transaction
+            if started:
+                conn.execute("BEGIN")
+            try:
+                after = None
+                while True:
+                    chunk = self._keyset_page(conn, agent_id, memory_type, chunk_size, after)
+                    yield from chunk
+                    if len(chunk) < chunk_size:
+                        return
+                    after = _page_key(memory_type, chunk[-1])
+            finally:
+                if started:
+                    conn.rollback()
+    
+    def _keyset_page(
+        self,
+        conn: sqlite3.Connection,
+        agent_id: str,
+        memory_type: str,
+        limit: int,
+        after: Optional[Tuple[Any, Any, int]]
+    ) -> List[Dict[str, Any]]:
+        """Read up to ``limit`` decoded rows following a keyset position"""
+        table = SEARCH_SOURCES[memory_type][0]
+        rank = PAGE_RANK_COLUMNS[memory_type]
+        query = f"SELECT {self._row_columns(table)} FROM {table} WHERE agent_id = ?"
+        params: List[Any] = [agent_id]
+        if after is not None:
+            query += f" AND ({rank}, created_at_ms, id) < (?, ?, ?)"
+            params.extend(after)
+        query += f" ORDER BY {rank} DESC, created_at_ms DESC, id DESC LIMIT ?"
+        params.append(limit)
+        
+        memories = []
+        for row in conn.execute(query, params):
+            memory = dict(row)
+            for column, default in JSON_COLUMNS[memory_type].items():
+                memory[column] = json.loads(memory[column] or default)
+            memories.append(memory)
+        return memories
+    
+    # ==================== BULK INGEST ====================
+    
+    @invalidates_search
+    @queued_write
+    def store_episodic_memory_batch(
+        self,
+        agent_id: str,
+        memories: Iterable[Dict[str, Any]]
+    ) -> List[int]:
+        """Store many episodic memories in one transaction
+        
+        Each item takes the same keys as store_episodic_memory. Temporal
+        associations are built for the whole batch in one pass afterwards.
+        Returns the new memory ids in input order.
+        """
+        
+        temporal_context = self._generate_temporal_context()
+        rows = []
+        
+        for memory in memories:
+            content = memory['content']
+            summary = memory.get('summary')
+            if not summary and len(content) > 200:
+                summary = content[:200] + "..."
+            
+            rows.append((
+                agent_id, memory['session_id'], memory['event_type'], content, summary,
+                json.dumps(memory.get('participants') or []),
+                memory.get('location_context'),
+                temporal_context,
+                memory.get('importance', 0.5),
+                memory.get('emotional_valence', 0.0),
+                memory.get('emotional_intensity', 0.0),
+                memory.get('lessons_learned'),
+                json.dumps(memory.get('tags') or []),
+                json.dumps(memory.get('metadata') or {}),
+                self._stored_embedding('episodic', {**memory, 'summary': summary})
+            ))
+        
+        if not rows:
+            return []
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            stamp_columns, stamp_placeholders, stamps = insert_stamps('episodic_memory')
+            memory_ids = self._insert_batch(cursor, f"""
+                INSERT INTO episodic_memory (
+                    agent_id, session_id, event_type, content, summary,
+                    participants, location_context, temporal_context,
+                    importance, emotional_valence, emotional_intensity,
+                    lessons_learned, tags, metadata, embedding, {stamp_columns}
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {stamp_placeholders})
+            """, [row + stamps for row in rows])
+            
+            self.index_embeddings(
+                agent_id, 'episodic', memory_ids,
+                [row[-1] for row in rows], [row[8] for row in rows]
+            )
+            self._create_batch_temporal_associations(cursor, agent_id, memory_ids)
+        
+        logger.info(f"Stored {len(memory_ids)} episodic memories for agent {agent_id}")
+        return memory_ids
+    
+    @invalidates_search
+    @queued_write
+    def store_semantic_memory_batch(
+        self,
+        agent_id: str,
+        memories: Iterable[Dict[str, Any]]
+    ) -> List[int]:
+        """Store many semantic memories in one transaction
+        
+        Each item takes the same keys as store_semantic_memory. Existing
+        concepts are updated in place and a concept repeated within the batch
+        keeps its last definition. Relationships are resolved once the whole
+        batch is stored, so they may refer to concepts later in the same batch.
+        Returns the memory ids in input order.
+        """
+        
+        memories = list(memories)
+        if not memories:
+            return []
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            concepts = list(dict.fromkeys(memory['concept'] for memory in memories))
+            concept_ids = self._lookup_concept_ids(cursor, agent_id, concepts)
+            
+            # Last occurrence of each concept wins, as with sequential stores
+            latest = {memory['concept']: memory for memory in memories}
+            
+            update_rows = []
+            insert_rows = []
+            embeddings = {}
+            for concept, memory in latest.items():
+                values = (
+                    memory['definition'], memory.get('category'), memory.get('subcategory'),
+                    json.dumps(memory.get('relationships') or {}),
+                    memory.get('confidence', 0.5), memory.get('source'),
+                    memory.get('evidence'), memory.get('importance', 0.5),
+                    json.dumps(memory.get('tags') or []),
+                    json.dumps(memory.get('metadata') or {}),
+                    self._stored_embedding('semantic', memory)
+                )
+                embeddings[concept] = values[-1]
+                if concept in concept_ids:
+                    update_rows.append(values + (concept_ids[concept],))
+                else:
+                    insert_rows.append((agent_id, concept) + values)
+            
+            if update_rows:
+                stamp_assignments, stamps = set_stamps(('updated_at',))
+                cursor.executemany(f"""
+                    UPDATE semantic_memory SET
+                        definition = ?, category = ?, subcategory = ?,
+                        relationships = ?, confidence = ?, source = ?,
+                        evidence = ?, importance = ?, tags = ?,
+                        metadata = ?, embedding = ?, {stamp_assignments}
+                    WHERE id = ?
+                """, [row[:-1] + stamps + row[-1:] for row in update_rows])
+            
+            if insert_rows:
+                stamp_columns, stamp_placeholders, stamps = insert_stamps('semantic_memory')
+                inserted_ids = self._insert_batch(cursor, f"""
+                    INSERT INTO semantic_memory (
+                        agent_id, concept, definition, category, subcategory,
+                        relationships, confidence, source, evidence,
+                        importance, tags, metadata, embedding, {stamp_columns}
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {stamp_placeholders})
+                """, [row + stamps for row in insert_rows])
+                for row, memory_id in zip(insert_rows, inserted_ids):
+                    concept_ids[row[1]] = memory_id
+            
+            self.index_embeddings(
+                agent_id, 'semantic',
+                [concept_ids[concept] for concept in latest],
+                [embeddings[concept] for concept in latest],
+                [memory.get('importance', 0.5) for memory in latest.values()]
+            )
+            self._create_batch_semantic_associations(cursor, agent_id, latest, concept_ids)
+        
+        memory_ids = [concept_ids[memory['concept']] for memory in memories]
+        logger.info(f"Stored {len(memory_ids)} semantic memories for agent {agent_id}")
+        return memory_ids
+    
+    @invalidates_search
+    @queued_write
+    def store_procedural_memory_batch(
+        self,
+        agent_id: str,
+        memories: Iterable[Dict[str, Any]]
+    ) -> List[int]:
+        """Store many procedural memories in one transaction
+        
+        Each item takes the same keys as store_procedural_memory.
+        Returns the new memory ids in input order.
+        """
+        
+        rows = [
+            (
+                agent_id, memory['skill_name'], memory['skill_type'],
+                json.dumps(memory['procedure_steps']),
+                json.dumps(memory.get('conditions') or {}),
+                memory.get('success_criteria'),
+                memory.get('proficiency_level', 0.0),
+                json.dumps(memory.get('tags') or []),
+                json.dumps(memory.get('metadata') or {}),
+                self._stored_embedding('procedural', memory)
+            )
+            for memory in memories
+        ]
+        
+        if not rows:
+            return []
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            stamp_columns, stamp_placeholders, stamps = insert_stamps('procedural_memory')
+            memory_ids = self._insert_batch(cursor, f"""
+                INSERT INTO procedural_memory (
+                    agent_id, skill_name, skill_type, procedure_steps,
+                    conditions, success_criteria, proficiency_level,
+                    tags, metadata, embedding, {stamp_columns}
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {stamp_placeholders})
+            """, [row + stamps for row in rows])
+            self.index_embeddings(agent_id, 'procedural', memory_ids, [row[-1] for row in rows])
+        
+        logger.info(f"Stored {len(memory_ids)} procedural memories for agent {agent_id}")
+        return memory_ids
+    
+    @invalidates_search
+    @queued_write
+    def store_emotional_memory_batch(
+        self,
+        agent_id: str,
+        memories: Iterable[Dict[str, Any]]
+    ) -> List[int]:
+        """Store many emotional memories in one transaction
+        
+        Each item takes the same keys as store_emotional_memory. Emotional
+        associations for significant memories are built in one pass once the
+        batch is stored. Returns the new memory ids in input order.
+        """
+        
+        rows = []
+        for memory in memories:
+            physiological_response = self._generate_physiological_response(
+                memory['emotion_type'], memory['valence'],
+                memory['arousal'], memory['intensity']
+            )
+            rows.append((
+                agent_id, memory['trigger_stimulus'], memory['emotion_type'],
+                memory['valence'], memory['arousal'], memory['intensity'],
+                memory.get('context'),
+                json.dumps(physiological_response),
+                memory.get('behavioral_tendency'), memory.get('coping_strategy'),
+                memory.get('resolution_outcome'),
+                json.dumps(memory.get('tags') or []),
+                json.dumps(memory.get('metadata') or {}),
+                self._stored_embedding('emotional', memory)
+            ))
+        
+        if not rows:
+            return []
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            stamp_columns, stamp_placeholders, stamps = insert_stamps('emotional_memory')
+            memory_ids = self._insert_batch(cursor, f"""
+                INSERT INTO emotional_memory (
+                    agent_id, trigger_stimulus, emotion_type, valence,
+                    arousal, intensity, context, physiological_response,
+                    behavioral_tendency, coping_strategy, resolution_outcome,
+                    tags, metadata, embedding, {stamp_columns}
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, {stamp_placeholders})
+            """, [row + stamps for row in rows])
+            self.index_embeddings(agent_id, 'emotional', memory_ids, [row[-1] for row in rows])
+            
+            significant = [
+                (memory_id, row[2])
+                for memory_id, row in zip(memory_ids, rows)
+                if row[5] > self.config.EMOTIONAL_SIGNIFICANCE_THRESHOLD
+            ]
+            self._create_batch_emotional_associations(cursor, agent_id, significant)
+        
+        logger.info(f"Stored {len(memory_ids)} emotional memories for agent {agent_id}")
+        return memory_ids
+    
     # ==================== MEMORY CONSOLIDATION ====================
     
     def start_memory_consolidation(
@@ -679,6 +1404,466 @@ class MemoryAPI:
             logger.info(f"Completed memory consolidation {consolidation_id} for agent {agent_id}")
             return consolidation_id
     
+    # ==================== EMBEDDINGS ====================
+    
+    def embed_text(self, text: str) -> np.ndarray:
+        """Embed free text (e.g. a query) with the local embedder"""
+        return self.embedder.embed(text)
+    
+    def embed_memory(self, memory_type: str, fields: Dict[str, Any]) -> bytes:
+        """Build the embedding BLOB for a memory from its column values
+        
+        The BLOB is float32, int8 or binary per ``EMBEDDING_QUANTIZATION``.
+        Code writing memory rows with raw SQL stores this in the ``embedding``
+        column whenever it sets the embedded fields.
+        """
+        vector = self.embedding_cache.embed(memory_text(memory_type, fields))
+        return encode_embedding(vector, self._embedding_scheme(memory_type))
+    
+    def _stored_embedding(self, memory_type: str, fields: Dict[str, Any]) -> Optional[bytes]:
+        """Embedding BLOB a store method writes, or None to leave it to the background worker"""
+        if self.config.EMBEDDING_BACKGROUND:
+            self.embedding_worker.notify()
+            return None
+        return self.embed_memory(memory_type, fields)
+    
+    @staticmethod
+    def _embedding_text(memory_type: str, row: Dict[str, Any]) -> str:
+        """Embedded text of a memory row read back from its table"""
+        fields = dict(row)
+        for column in JSON_COLUMNS[memory_type].keys() & fields.keys():
+            fields[column] = json.loads(fields[column] or JSON_COLUMNS[memory_type][column])
+        return memory_text(memory_type, fields)
+    
+    def _embed_pending_batch(self) -> Tuple[int, int]:
+        """Embed one batch of memories stored without an embedding, oldest first
+        
+        Rows are read outside the write lock and written back in one short
+        transaction. An update only lands while the row is still pending and
+        its embedded columns are unchanged, so a concurrent edit is never
+        given a stale vector; it stays pending for a later batch. Returns the
+        number of pending rows found and the number written.
+        """
+        limit = self.config.EMBEDDING_BATCH_SIZE
+        pending = []
+        with self.get_read_connection() as conn:
+            for memory_type in SEARCH_TYPES:
+                if len(pending) >= limit:
+                    break
+                table, importance_expr = SEARCH_SOURCES[memory_type][:2]
+                fields = EMBEDDING_FIELDS[memory_type]
+                rows = conn.execute(f"""
+                    SELECT m.id, m.agent_id, {importance_expr} AS rank_importance,
+                           {', '.join('m.' + field for field in fields)}
+                    FROM {table} m
+                    WHERE m.embedding IS NULL
+                    ORDER BY m.created_at_ms
+                    LIMIT ?
+                """, (limit - len(pending),))
+                pending.extend((memory_type, dict(row)) for row in rows)
+        
+        if not pending:
+            return 0, 0
+        
+        vectors = self.embedding_cache.embed_batch(
+            self._embedding_text(memory_type, row) for memory_type, row in pending
+        )
+        written = []
+        with self.get_connection() as conn:
+            for (memory_type, row), vector in zip(pending, vectors):
+                fields = EMBEDDING_FIELDS[memory_type]
+                blob = encode_embedding(vector, self._embedding_scheme(memory_type))
+                cursor = conn.execute(f"""
+                    UPDATE {SEARCH_SOURCES[memory_type][0]} SET embedding = ?
+                    WHERE id = ? AND embedding IS NULL AND {' AND '.join(f'{field} IS ?' for field in fields)}
+                """, (blob, row['id'], *(row[field] for field in fields)))
+                if cursor.rowcount:
+                    written.append((memory_type, row, blob))
+        
+        indexed: Dict[Tuple[str, str], List[Tuple[Dict[str, Any], bytes]]] = {}
+        for memory_type, row, blob in written:
+            indexed.setdefault((row['agent_id'], memory_type), []).append((row, blob))
+        for (agent_id, memory_type), items in indexed.items():
+            self.index_embeddings(
+                agent_id, memory_type,
+                [row['id'] for row, _ in items], [blob for _, blob in items],
+                [row['rank_importance'] for row, _ in items]
+            )
+        for agent_id in {agent_id for agent_id, _ in indexed}:
+            self.invalidate_search_cache(agent_id)
+        
+        logger.debug(f"Embedded {len(written)} of {len(pending)} pending memories")
+        return len(pending), len(written)
+    
+    def get_embedding(self, memory_type: str, memory_id: int) -> Optional[np.ndarray]:
+        """Get a memory's embedding as a float32 vector
+        
+        float32 BLOBs are returned as a read-only view; quantized BLOBs are
+        decoded to an approximation of the original vector.
+        """
+        if memory_type not in EMBEDDING_FIELDS:
+            raise ValueError(f"Unsupported memory type for embeddings: {memory_type}")
+        
+        with self.get_read_connection() as conn:
+            row = conn.execute(
+                f"SELECT embedding FROM {memory_type}_memory WHERE id = ?", (memory_id,)
+            ).fetchone()
+        if row is None or row['embedding'] is None:
+            return None
+        return decode_embedding(row['embedding'], self.config.EMBEDDING_DIMENSION)
+    
+    def get_embedding_storage_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get the stored embedding format, row count and BLOB bytes per memory type
+        
+        ``float32_bytes`` is what the same rows would take unquantized.
+        """
+        stats = {}
+        with self.get_read_connection() as conn:
+            for memory_type in SEARCH_TYPES:
+                table = SEARCH_SOURCES[memory_type][0]
+                rows, stored = conn.execute(
+                    f"SELECT COUNT(embedding), COALESCE(SUM(LENGTH(embedding)), 0) FROM {table}"
+                ).fetchone()
+                stats[memory_type] = {
+                    'scheme': self._embedding_scheme(memory_type),
+                    'rows': rows,
+                    'bytes': stored,
+                    'float32_bytes': rows * self.config.EMBEDDING_DIMENSION * 4
+                }
+        return stats
+    
+    def index_embeddings(
+        self,
+        agent_id: str,
+        memory_type: str,
+        memory_ids: List[int],
+        embeddings: List[bytes],
+        importance: Optional[List[float]] = None
+    ):
+        """Add or replace memories' embedding BLOBs in the agent's vector indexes
+        
+        Store methods call this for every row they write; code updating the
+        embedding column with raw SQL calls it for the rows it changed.
+        Quantized memory types go to their code index rather than the float
+        matrix. ``importance`` feeds the ANN prefilter; without it an updated
+        memory keeps its indexed importance. Rows stored without an embedding
+        (None) are skipped until the background worker fills them in. Inside a
+        write transaction the indexes are updated only once it commits, so a
+        rollback never leaves vectors for rows that were not written.
+        """
+        if any(embedding is None for embedding in embeddings):
+            kept = [i for i, embedding in enumerate(embeddings) if embedding is not None]
+            memory_ids = [memory_ids[i] for i in kept]
+            embeddings = [embeddings[i] for i in kept]
+            importance = [importance[i] for i in kept] if importance is not None else None
+            if not kept:
+                return
+        self.pool.after_commit(
+            lambda: self._apply_embeddings(agent_id, memory_type, memory_ids, embeddings, importance)
+        )
+    
+    def _apply_embeddings(
+        self,
+        agent_id: str,
+        memory_type: str,
+        memory_ids: List[int],
+        embeddings: List[bytes],
+        importance: Optional[List[float]]
+    ):
+        """Write committed embeddings into the matrix, code and ANN indexes"""
+        vectors = decode_embeddings(embeddings, self.config.EMBEDDING_DIMENSION)
+        if self._embedding_scheme(memory_type) == 'float32':
+            self.vector_index.upsert(agent_id, SEARCH_TYPE_CODES[memory_type], memory_ids, vectors)
+        else:
+            quantized_index = self._quantized_indexes.get((agent_id, memory_type))
+            if quantized_index is not None:
+                quantized_index.add(memory_ids, embeddings)
+        ann_index = self._ann_indexes.get((agent_id, memory_type))
+        if ann_index is not None:
+            ann_index.add(memory_ids, vectors, importance)
+    
+    def sync_vector_index(self, agent_id: str) -> Dict[str, int]:
+        """Bring an agent's embedding matrix and loaded ANN indexes in line with the database
+        
+        Rows of memories that no longer exist are compacted away (tombstoned in
+        ANN indexes), memories missing from an index are added from their
+        stored BLOBs, and the importance behind the ANN prefilter is refreshed.
+        Quantized memory types are kept in their code indexes and out of the
+        float matrix. ANN indexes that inserts have pushed past their training
+        threshold are re-clustered here, outside any write transaction.
+        """
+        live = {}
+        matrix_live = {}
+        importance = {}
+        horizons = {}
+        missing = []
+        quantized_removed = 0
+        with self.get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            for memory_type, code in SEARCH_TYPE_CODES.items():
+                table, importance_expr = SEARCH_SOURCES[memory_type][:2]
+                # Ids handed out after this point belong to rows written concurrently
+                cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+                sequence = cursor.fetchone()
+                horizons[code] = sequence[0] if sequence else 0
+                cursor.execute(f"SELECT m.id, {importance_expr} FROM {table} m WHERE m.agent_id = ?", (agent_id,))
+                rows = cursor.fetchall()
+                live[code] = np.array([row[0] for row in rows], dtype=np.int64)
+                importance[code] = [row[1] for row in rows]
+                
+                if self._embedding_scheme(memory_type) == 'float32':
+                    matrix_live[code] = live[code]
+                    absent = np.setdiff1d(live[code], self.vector_index.indexed_ids(agent_id, code))
+                else:
+                    matrix_live[code] = np.empty(0, dtype=np.int64)
+                    absent = np.empty(0, dtype=np.int64)
+                    quantized_index = self._quantized_indexes.get((agent_id, memory_type))
+                    if quantized_index is not None:
+                        quantized_removed += quantized_index.retain(live[code], horizons[code])
+                        absent = np.setdiff1d(live[code], quantized_index.ids())
+                ann_index = self._ann_indexes.get((agent_id, memory_type))
+                if ann_index is not None:
+                    ann_index.retain(live[code], horizons[code])
+                    absent = np.union1d(absent, np.setdiff1d(live[code], ann_index.ids()))
+                if len(absent):
+                    cursor.execute(f"""
+                        SELECT id, embedding FROM {table}
+                        WHERE id IN (SELECT value FROM json_each(?)) AND embedding IS NOT NULL
+                    """, (json.dumps(absent.tolist()),))
+                    missing.append((memory_type, cursor.fetchall()))
+        
+        removed = self.vector_index.retain(agent_id, matrix_live, horizons) + quantized_removed
+        added = 0
+        for memory_type, rows in missing:
+            if rows:
+                self.index_embeddings(agent_id, memory_type, [row[0] for row in rows], [row[1] for row in rows])
+                added += len(rows)
+        
+        for memory_type, code in SEARCH_TYPE_CODES.items():
+            ann_index = self._ann_indexes.get((agent_id, memory_type))
+            if ann_index is not None:
+                ann_index.set_importance(live[code].tolist(), importance[code])
+        # k-means must not run while the caller holds the write lock
+        if not self.pool.in_transaction():
+            self._train_ann_indexes(agent_id)
+        if self.storage != "memory":
+            self._save_ann_indexes(agent_id)
+        
+        self._vector_synced.add(agent_id)
+        return {'removed': removed, 'added': added}
+    
+    def rebuild_vector_index(self, agent_id: str) -> Dict[str, int]:
+        """Rewrite an agent's embedding matrix and ANN indexes from the database"""
+        memory_types = [memory_type for key_agent, memory_type in list(self._ann_indexes) if key_agent == agent_id]
+        self.drop_vector_indexes(agent_id)
+        for memory_type in memory_types:
+            self._ann_index(agent_id, memory_type)
+        return self.sync_vector_index(agent_id)
+    
+    def drop_vector_indexes(self, agent_id: str):
+        """Delete an agent's embedding matrix and ANN indexes, in memory and on disk"""
+        with self._ann_lock:
+            for key in [key for key in self._ann_indexes if key[0] == agent_id]:
+                del self._ann_indexes[key]
+            for key in [key for key in self._quantized_indexes if key[0] == agent_id]:
+                del self._quantized_indexes[key]
+            self.vector_index.drop(agent_id)
+            self._vector_synced.discard(agent_id)
+    
+    def similar_memories(
+        self,
+        agent_id: str,
+        query: Union[str, np.ndarray],
+        k: int = 10,
+        memory_types: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Find the k memories whose embeddings are most similar to a query
+        
+        ``query`` is text (embedded locally) or a vector. Similarity is exact
+        cosine similarity over the agent's memory-mapped embedding matrix;
+        results carry ``memory_type`` and ``similarity`` and are ordered best
+        first. The matrix is checked against the database the first time an
+        agent is searched in a process.
+        
+        Quantized memory types are scanned on their int8 or binary codes, and
+        the best ``k * EMBEDDING_RERANK_FACTOR`` candidates are re-ranked by
+        exact similarity of their re-embedded text.
+        """
+        vector = self.embed_text(query) if isinstance(query, str) else query
+        return self._similarity_results(self._similar_hits(agent_id, vector, k, memory_types))
+    
+    def approximate_similar_memories(
+        self,
+        agent_id: str,
+        query: Union[str, np.ndarray],
+        k: int = 10,
+        memory_types: Optional[List[str]] = None,
+        importance_threshold: float = 0.0,
+        nprobe: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Find about the k most similar memories with the per-type IVF indexes
+        
+        Like ``similar_memories``, but each memory type is searched through an
+        approximate nearest-neighbour index that scores only the ``nprobe``
+        (default ``ANN_NPROBE``) closest inverted lists. Raising ``nprobe``
+        trades latency for recall@k. Episodic and semantic memories below
+        ``importance_threshold`` are filtered out before scoring. An index is
+        loaded (or built) and checked against the database on first use.
+        """
+        vector = self.embed_text(query) if isinstance(query, str) else query
+        nprobe = nprobe or self.config.ANN_NPROBE
+        
+        hits = []
+        for memory_type in memory_types or SEARCH_TYPES:
+            thresholded = SEARCH_SOURCES[memory_type][2]
+            ids, scores = self._ann_index(agent_id, memory_type).search(
+                vector, k, nprobe, importance_threshold if thresholded else None
+            )
+            code = SEARCH_TYPE_CODES[memory_type]
+            hits.extend(zip([code] * len(ids), ids.tolist(), scores.tolist()))
+        hits.sort(key=lambda hit: hit[2], reverse=True)
+        return self._similarity_results(hits[:k])
+    
+    def _similarity_results(self, hits: List[Tuple[int, int, float]]) -> List[Dict[str, Any]]:
+        """Build result rows for ranked (type code, memory id, similarity) hits"""
+        if not hits:
+            return []
+        
+        rows = {}
+        with self.get_read_connection() as conn:
+            for code, memory_type in enumerate(SEARCH_TYPES):
+                ids = [memory_id for hit_code, memory_id, _ in hits if hit_code == code]
+                if ids:
+                    for memory_id, row in self._fetch_rows(conn, SEARCH_SOURCES[memory_type][0], ids).items():
+                        rows[(code, memory_id)] = row
+        
+        results = []
+        for code, memory_id, similarity in hits:
+            row = rows.get((code, memory_id))
+            if row is not None:  # Forgotten since the index was last synced
+                results.append({**row, 'memory_type': SEARCH_TYPES[code], 'similarity': similarity})
+        return results
+    
+    def _similar_hits(
+        self,
+        agent_id: str,
+        vector: np.ndarray,
+        k: int,
+        memory_types: Optional[List[str]] = None
+    ) -> List[Tuple[int, int, float]]:
+        """Find the k most similar (type code, memory id, similarity) triples, best first"""
+        self._ensure_vector_index(agent_id)
+        memory_types = memory_types or SEARCH_TYPES
+        exact = [memory_type for memory_type in memory_types if self._embedding_scheme(memory_type) == 'float32']
+        quantized = [memory_type for memory_type in memory_types if memory_type not in exact]
+        
+        hits = []
+        if exact:
+            codes = None if len(exact) == len(SEARCH_TYPES) else [SEARCH_TYPE_CODES[memory_type] for memory_type in exact]
+            hits = self.vector_index.search(agent_id, vector, k, codes)
+        if quantized:
+            for memory_type in quantized:
+                hits.extend(self._reranked_hits(agent_id, memory_type, vector, k))
+            hits = sorted(hits, key=lambda hit: -hit[2])[:k]
+        return hits
+    
+    def _reranked_hits(
+        self,
+        agent_id: str,
+        memory_type: str,
+        vector: np.ndarray,
+        k: int
+    ) -> List[Tuple[int, int, float]]:
+        """Take candidates from a quantized type's codes and score them exactly
+        
+        The local embedder is deterministic, so re-embedding a candidate's text
+        gives exactly the float vector a float32 column would have stored.
+        """
+        quantized_index = self._quantized_index(agent_id, memory_type)
+        with self.search_timings.measure('quantized_candidates'):
+            candidates = quantized_index.candidates(vector, k * self.config.EMBEDDING_RERANK_FACTOR)
+        if len(candidates) == 0:
+            return []
+        
+        with self.search_timings.measure('rerank'):
+            table = SEARCH_SOURCES[memory_type][0]
+            fields = EMBEDDING_FIELDS[memory_type]
+            with self.get_read_connection() as conn:
+                rows = [dict(row) for row in conn.execute(
+                    f"SELECT id, {', '.join(fields)} FROM {table} WHERE id IN (SELECT value FROM json_each(?))",
+                    (json.dumps(candidates.tolist()),)
+                )]
+            exact = self.embedding_cache.embed_batch(self._embedding_text(memory_type, row) for row in rows)
+            query = np.asarray(vector, dtype=np.float32).ravel()
+            norm = np.linalg.norm(query)
+            scores = exact @ (query / norm if norm else query)
+        
+        code = SEARCH_TYPE_CODES[memory_type]
+        return [(code, row['id'], float(score)) for row, score in zip(rows, scores)]
+    
+    def _embedding_scheme(self, memory_type: str) -> str:
+        """Storage format of a memory type's embeddings"""
+        return self.config.EMBEDDING_QUANTIZATION.get(memory_type, 'float32')
+    
+    def _ensure_vector_index(self, agent_id: str):
+        """Check an agent's embedding matrix against the database once per process"""
+        if agent_id not in self._vector_synced:
+            self.sync_vector_index(agent_id)
+    
+    def _ann_index(self, agent_id: str, memory_type: str) -> IVFIndex:
+        """Get an agent's IVF index for one memory type, loading and syncing it on first use"""
+        key = (agent_id, memory_type)
+        ann_index = self._ann_indexes.get(key)
+        if ann_index is not None:
+            return ann_index
+        
+        with self._ann_lock:
+            ann_index = self._ann_indexes.get(key)
+            if ann_index is None:
+                ann_index = IVFIndex.load(
+                    self._ann_path(agent_id, memory_type), self.config.EMBEDDING_DIMENSION,
+                    train_threshold=self.config.ANN_TRAIN_THRESHOLD
+                )
+                self._ann_indexes[key] = ann_index
+                self.sync_vector_index(agent_id)
+            return ann_index
+    
+    def _quantized_index(self, agent_id: str, memory_type: str) -> QuantizedIndex:
+        """Get an agent's code index for a quantized memory type, filling it from the database on first use"""
+        key = (agent_id, memory_type)
+        quantized_index = self._quantized_indexes.get(key)
+        if quantized_index is not None:
+            return quantized_index
+        
+        with self._ann_lock:
+            quantized_index = self._quantized_indexes.get(key)
+            if quantized_index is None:
+                quantized_index = QuantizedIndex(self.config.EMBEDDING_DIMENSION, self._embedding_scheme(memory_type))
+                self._quantized_indexes[key] = quantized_index
+                self.sync_vector_index(agent_id)
+            return quantized_index
+    
+    def _train_ann_indexes(self, agent_id: str) -> int:
+        """Cluster an agent's loaded ANN indexes that are due for (re)training"""
+        trained = 0
+        for (key_agent, memory_type), ann_index in list(self._ann_indexes.items()):
+            if key_agent == agent_id and ann_index.needs_training:
+                ann_index.train()
+                trained += 1
+        return trained
+    
+    def _ann_path(self, agent_id: str, memory_type: str) -> Path:
+        return self.vector_index.directory / f"{agent_file_stem(agent_id)}.{memory_type}.ivf.npz"
+    
+    def _save_ann_indexes(self, agent_id: Optional[str] = None):
+        """Persist loaded ANN indexes, for one agent or all"""
+        with self._ann_lock:
+            for (key_agent, memory_type), ann_index in self._ann_indexes.items():
+                if agent_id is None or key_agent == agent_id:
+                    self.vector_index.directory.mkdir(parents=True, exist_ok=True)
+                    ann_index.save(self._ann_path(key_agent, memory_type))
+    
     # ==================== MEMORY SEARCH AND RETRIEVAL ====================
     
     def search_memories(
@@ -687,35 +1872,109 @@ class MemoryAPI:
         query: str,
         memory_types: Optional[List[str]] = None,
         importance_threshold: float = 0.2,
-        limit: int = 20
+        limit: int = 20,
+        parallel: Optional[bool] = None,
+        hybrid: Optional[bool] = None,
+        deadline_ms: Optional[float] = None
     ) -> List[Dict[str, Any]]:
-        """Search across all memory types"""
+        """Search across all memory types
         
-        results = []
+        Every match is scored by importance * recency (blended with confidence,
+        intensity and access count per the ``SEARCH_*_WEIGHT`` settings) in one
+        vectorized pass, and the ``limit`` best are returned whatever their
+        memory type. With ``parallel`` (default ``SEARCH_PARALLEL``) each memory
+        type is searched concurrently on its own read-only connection and the
+        per-type results are merged with a heap, so latency tracks the slowest
+        type.
         
-        if not memory_types or "episodic" in memory_types:
-            episodic = self._search_episodic_memories(agent_id, query, importance_threshold, limit // 4)
-            results.extend([{**mem, 'memory_type': 'episodic'} for mem in episodic])
+        With ``hybrid`` (default ``SEARCH_HYBRID``) the keyword match and an
+        embedding-similarity search run in parallel and their rankings are
+        combined with reciprocal rank fusion; see ``_hybrid_search``. Stage
+        latencies are reported by ``get_search_timing_stats``.
         
-        if not memory_types or "semantic" in memory_types:
-            semantic = self._search_semantic_memories(agent_id, query, importance_threshold, limit // 4)
-            results.extend([{**mem, 'memory_type': 'semantic'} for mem in semantic])
+        With ``deadline_ms`` (default ``SEARCH_DEADLINE_MS``) the search must
+        answer within that many milliseconds; see ``_budgeted_search``. It
+        returns ``SearchResults`` flagged ``partial`` when the budget ran out,
+        and ``get_search_budget_stats`` counts how often that happens.
         
-        if not memory_types or "procedural" in memory_types:
-            procedural = self._search_procedural_memories(agent_id, query, limit // 4)
-            results.extend([{**mem, 'memory_type': 'procedural'} for mem in procedural])
+        Results are cached per (agent, query, types, threshold, limit, mode)
+        until the agent's next write or ``SEARCH_CACHE_TTL_SECONDS``; identical
+        searches running at the same time share one query, except budgeted
+        ones, which never wait on or hand their results to another caller.
+        Partial results are never cached.
+        """
+        if hybrid is None:
+            hybrid = self.config.SEARCH_HYBRID
+        if deadline_ms is None:
+            deadline_ms = self.config.SEARCH_DEADLINE_MS
+        deadline = time.perf_counter() + deadline_ms / 1000.0 if deadline_ms is not None else None
         
-        if not memory_types or "emotional" in memory_types:
-            emotional = self._search_emotional_memories(agent_id, query, limit // 4)
-            results.extend([{**mem, 'memory_type': 'emotional'} for mem in emotional])
+        # A write block's uncommitted rows must not outlive it in the cache
+        if self.pool.in_transaction():
+            results = self._search_uncached(
+                agent_id, query, memory_types, importance_threshold, limit, parallel, hybrid, deadline
+            )
+        else:
+            key = (
+                agent_id, query, tuple(sorted(memory_types)) if memory_types else None,
+                importance_threshold, limit, hybrid, deadline is not None
+            )
+            results = self.search_cache.get_or_compute(
+                agent_id, key,
+                lambda: self._search_uncached(
+                    agent_id, query, memory_types, importance_threshold, limit, parallel, hybrid, deadline
+                ),
+                keep=lambda results: not getattr(results, 'partial', False),
+                # Each budgeted caller spends only its own budget on its own search
+                coalesce=deadline is None
+            )
         
-        # Sort by relevance (importance * recency)
-        for result in results:
-            recency_score = self._calculate_recency_score(result.get('created_at', ''))
-            result['relevance_score'] = result.get('importance', 0.5) * recency_score
+        if deadline is not None:
+            self.search_budgets.record(agent_id, results.partial)
+        return results
+    
+    def _search_uncached(
+        self,
+        agent_id: str,
+        query: str,
+        memory_types: Optional[List[str]],
+        importance_threshold: float,
+        limit: int,
+        parallel: Optional[bool],
+        hybrid: bool = False,
+        deadline: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Run search_memories against the database"""
+        if parallel is None:
+            parallel = self.config.SEARCH_PARALLEL
+        
+        searches = self._search_tasks(agent_id, query, memory_types, importance_threshold, limit)
+        if not searches or limit <= 0:
+            return [] if deadline is None else SearchResults()
         
-        results.sort(key=lambda x: x['relevance_score'], reverse=True)
-        return results[:limit]
+        if deadline is not None:
+            return self._budgeted_search(
+                agent_id, query, searches, importance_threshold, limit, hybrid, deadline
+            )
+        
+        # Text without searchable words has no keyword ranking to fuse
+        if hybrid and self._fts_query(query):
+            return self._hybrid_search(
+                agent_id, query, [memory_type for memory_type, _ in searches], importance_threshold, limit
+            )
+        
+        # Worker threads cannot see a write block's uncommitted rows
+        if parallel and len(searches) > 1 and not self.pool.in_transaction():
+            executor = self._get_search_executor()
+            futures = [(memory_type, executor.submit(search)) for memory_type, search in searches]
+            return self._rank_search_results(
+                [(memory_type, future.result()) for memory_type, future in futures], limit
+            )
+        
+        return self._ranked_search(
+            agent_id, [memory_type for memory_type, _ in searches],
+            self._fts_query(query), importance_threshold, limit, epoch_ms()
+        )
     
     # ==================== HELPER METHODS ====================
     
@@ -781,25 +2040,8 @@ class MemoryAPI:
         return base_response
     
     def _update_memory_access(self, memory_id: int, memory_type: str):
-        """Update memory access tracking"""
-        table_map = {
-            'episodic': 'episodic_memory',
-            'semantic': 'semantic_memory',
-            'procedural': 'procedural_memory',
-            'emotional': 'emotional_memory'
-        }
-        
-        if memory_type not in table_map:
-            return
-        
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"""
-                UPDATE {table_map[memory_type]} SET
-                    accessed_at = CURRENT_TIMESTAMP,
-                    access_count = access_count + 1
-                WHERE id = ?
-            """, (memory_id,))
+        """Update memory access tracking (buffered, see AccessTracker)"""
+        self.access_tracker.record(memory_type, memory_id)
     
     def _create_temporal_associations(self, agent_id: str, memory_id: int, memory_type: str):
         """Create temporal associations with recent memories"""
@@ -811,9 +2053,9 @@ class MemoryAPI:
                 cursor.execute("""
                     SELECT id FROM episodic_memory 
                     WHERE agent_id = ? AND id != ?
-                    AND created_at > datetime('now', '-1 hour')
-                    ORDER BY created_at DESC LIMIT 3
-                """, (agent_id, memory_id))
+                    AND created_at_ms > ?
+                    ORDER BY created_at_ms DESC LIMIT 3
+                """, (agent_id, memory_id, epoch_ms() - HOUR_MS))
                 
                 recent_memories = cursor.fetchall()
                 
@@ -873,6 +2115,162 @@ class MemoryAPI:
                     'emotional', strength=0.5
                 )
     
+    def _insert_batch(self, cursor: sqlite3.Cursor, sql: str, rows: List[tuple]) -> List[int]:
+        """Insert rows with executemany and return their ids in order
+        
+        The memory tables use AUTOINCREMENT and the insert holds the write
+        lock for its whole run, so the new ids are consecutive and end at
+        last_insert_rowid().
+        """
+        cursor.executemany(sql, rows)
+        last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+    
+    def _insert_associations(self, cursor: sqlite3.Cursor, agent_id: str, pairs: List[Tuple[int, str, int, str]],
+                             association_type: str, strength: float) -> int:
+        """Create or reinforce many associations with set-based statements"""
+        counts: Dict[Tuple[int, str, int, str], int] = {}
+        for pair in pairs:
+            counts[pair] = counts.get(pair, 0) + 1
+        
+        if not counts:
+            return 0
+        
+        existing = {}
+        memory1_ids = sorted({pair[0] for pair in counts})
+        for start in range(0, len(memory1_ids), 500):
+            chunk = memory1_ids[start:start + 500]
+            placeholders = ','.join('?' for _ in chunk)
+            cursor.execute(f"""
+                SELECT id, memory1_id, memory1_type, memory2_id, memory2_type,
+                       strength, reinforcement_count
+                FROM memory_associations
+                WHERE agent_id = ? AND memory1_id IN ({placeholders})
+            """, [agent_id, *chunk])
+            for row in cursor.fetchall():
+                key = (row['memory1_id'], row['memory1_type'], row['memory2_id'], row['memory2_type'])
+                if key in counts:
+                    existing[key] = row
+        
+        updates = []
+        inserts = []
+        for key, count in counts.items():
+            if key in existing:
+                row = existing[key]
+                updates.append((
+                    min(1.0, row['strength'] + 0.1 * count),
+                    row['reinforcement_count'] + count,
+                    row['id']
+                ))
+            else:
+                # Repeats after the first insert reinforce it, as sequential calls would
+                inserts.append((
+                    agent_id, key[0], key[1], key[2], key[3], association_type,
+                    min(1.0, strength + 0.1 * (count - 1)), count
+                ))
+        
+        if updates:
+            stamp_assignments, stamps = set_stamps(('last_reinforced',))
+            cursor.executemany(f"""
+                UPDATE memory_associations SET
+                    strength = ?, reinforcement_count = ?, {stamp_assignments}
+                WHERE id = ?
+            """, [row[:-1] + stamps + row[-1:] for row in updates])
+        
+        if inserts:
+            stamp_columns, stamp_placeholders, stamps = insert_stamps('memory_associations')
+            cursor.executemany(f"""
+                INSERT INTO memory_associations (
+                    agent_id, memory1_id, memory1_type, memory2_id, memory2_type,
+                    association_type, strength, reinforcement_count, direction, metadata,
+                    {stamp_columns}
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'bidirectional', '{{}}', {stamp_placeholders})
+            """, [row + stamps for row in inserts])
+        
+        return len(updates) + len(inserts)
+    
+    def _create_batch_temporal_associations(self, cursor: sqlite3.Cursor, agent_id: str, memory_ids: List[int]):
+        """Link each new episodic memory to the three memories stored just before it"""
+        cursor.execute("""
+            SELECT id FROM episodic_memory 
+            WHERE agent_id = ? AND id < ?
+            AND created_at_ms > ?
+            ORDER BY created_at_ms DESC LIMIT 3
+        """, (agent_id, memory_ids[0], epoch_ms() - HOUR_MS))
+        
+        sequence = [row['id'] for row in reversed(cursor.fetchall())] + memory_ids
+        offset = len(sequence) - len(memory_ids)
+        
+        pairs = []
+        for position, memory_id in enumerate(memory_ids, start=offset):
+            for recent_id in reversed(sequence[max(0, position - 3):position]):
+                pairs.append((memory_id, 'episodic', recent_id, 'episodic'))
+        
+        self._insert_associations(cursor, agent_id, pairs, 'temporal', 0.4)
+    
+    def _create_batch_semantic_associations(self, cursor: sqlite3.Cursor, agent_id: str,
+                                            memories: Dict[str, Dict[str, Any]], concept_ids: Dict[str, int]):
+        """Create semantic associations for a batch of concepts in one pass"""
+        related_concepts = {
+            concept
+            for memory in memories.values()
+            for related in (memory.get('relationships') or {}).values()
+            for concept in related
+        }
+        
+        missing = [concept for concept in related_concepts if concept not in concept_ids]
+        related_ids = dict(concept_ids)
+        related_ids.update(self._lookup_concept_ids(cursor, agent_id, missing))
+        
+        pairs = []
+        for concept, memory in memories.items():
+            for related in (memory.get('relationships') or {}).values():
+                for related_concept in related:
+                    if related_concept in related_ids:
+                        pairs.append((
+                            concept_ids[concept], 'semantic',
+                            related_ids[related_concept], 'semantic'
+                        ))
+        
+        self._insert_associations(cursor, agent_id, pairs, 'semantic', 0.6)
+    
+    def _create_batch_emotional_associations(self, cursor: sqlite3.Cursor, agent_id: str,
+                                             memories: List[Tuple[int, str]]):
+        """Link new significant emotional memories to the strongest memories of the same emotion"""
+        by_emotion: Dict[str, List[int]] = {}
+        for memory_id, emotion_type in memories:
+            by_emotion.setdefault(emotion_type, []).append(memory_id)
+        
+        pairs = []
+        for emotion_type, memory_ids in by_emotion.items():
+            cursor.execute("""
+                SELECT id FROM emotional_memory 
+                WHERE agent_id = ? AND emotion_type = ?
+                ORDER BY intensity DESC LIMIT ?
+            """, (agent_id, emotion_type, 3 + len(memory_ids)))
+            
+            # Only memories stored before each one count, as with sequential stores
+            candidates = [row['id'] for row in cursor.fetchall()]
+            for memory_id in memory_ids:
+                similar = [c for c in candidates if c < memory_id][:3]
+                pairs.extend((memory_id, 'emotional', s, 'emotional') for s in similar)
+        
+        self._insert_associations(cursor, agent_id, pairs, 'emotional', 0.5)
+    
+    def _lookup_concept_ids(self, cursor: sqlite3.Cursor, agent_id: str, concepts: List[str]) -> Dict[str, int]:
+        """Map concept names to semantic memory ids for an agent"""
+        concept_ids = {}
+        for start in range(0, len(concepts), 500):
+            chunk = concepts[start:start + 500]
+            placeholders = ','.join('?' for _ in chunk)
+            cursor.execute(f"""
+                SELECT id, concept FROM semantic_memory 
+                WHERE agent_id = ? AND concept IN ({placeholders})
+            """, [agent_id, *chunk])
+            for row in cursor.fetchall():
+                concept_ids.setdefault(row['concept'], row['id'])
+        return concept_ids
+    
     def _check_working_memory_capacity(self, agent_id: str, session_id: str, new_weight: float) -> bool:
         """Check if working memory has capacity for new item"""
         with self.get_connection() as conn:
@@ -882,8 +2280,8 @@ class MemoryAPI:
                 SELECT SUM(capacity_weight) as total_weight
                 FROM working_memory 
                 WHERE agent_id = ? AND session_id = ?
-                AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)
-            """, (agent_id, session_id))
+                AND (expires_at_ms IS NULL OR expires_at_ms > ?)
+            """, (agent_id, session_id, epoch_ms()))
             
             result = cursor.fetchone()
             current_weight = result['total_weight'] or 0
@@ -899,9 +2297,9 @@ class MemoryAPI:
             cursor.execute("""
                 SELECT id, capacity_weight FROM working_memory 
                 WHERE agent_id = ? AND session_id = ?
-                AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)
+                AND (expires_at_ms IS NULL OR expires_at_ms > ?)
                 ORDER BY priority ASC, activation_level ASC
-            """, (agent_id, session_id))
+            """, (agent_id, session_id, epoch_ms()))
             
             items = cursor.fetchall()
             freed_capacity = 0
@@ -922,8 +2320,8 @@ class MemoryAPI:
             cursor.execute("""
                 DELETE FROM working_memory 
                 WHERE agent_id = ? AND session_id = ?
-                AND expires_at IS NOT NULL AND expires_at <= CURRENT_TIMESTAMP
-            """, (agent_id, session_id))
+                AND expires_at_ms <= ?
+            """, (agent_id, session_id, epoch_ms()))
             
             if cursor.rowcount > 0:
                 logger.info(f"Cleaned up {cursor.rowcount} expired working memory items")
@@ -977,8 +2375,8 @@ class MemoryAPI:
             UPDATE episodic_memory SET
                 importance = importance * ?,
                 decay_factor = decay_factor * ?
-            WHERE agent_id = ? AND accessed_at < datetime('now', '-1 day')
-        """, (decay_rate, decay_rate, agent_id))
+            WHERE agent_id = ? AND accessed_at_ms < ?
+        """, (decay_rate, decay_rate, agent_id, epoch_ms() - DAY_MS))
         
         # Decay emotional memories (faster decay)
         emotional_decay = self.config.EMOTIONAL_DECAY_RATE
@@ -986,8 +2384,8 @@ class MemoryAPI:
             UPDATE emotional_memory SET
                 intensity = intensity * ?,
                 decay_factor = decay_factor * ?
-            WHERE agent_id = ? AND accessed_at < datetime('now', '-1 day')
-        """, (emotional_decay, emotional_decay, agent_id))
+            WHERE agent_id = ? AND accessed_at_ms < ?
+        """, (emotional_decay, emotional_decay, agent_id, epoch_ms() - DAY_MS))
     
     def _strengthen_important_memories(self, cursor: sqlite3.Cursor, agent_id: str) -> int:
         """Strengthen frequently accessed or important memories"""
@@ -1033,7 +2431,7 @@ class MemoryAPI:
             JOIN episodic_memory e2 ON e1.session_id = e2.session_id
             WHERE e1.agent_id = ? AND e2.agent_id = ?
             AND e1.id < e2.id
-            AND ABS(julianday(e1.created_at) - julianday(e2.created_at)) < 0.042  -- 1 hour
+            AND e2.created_at_ms > e1.created_at_ms - ? AND e2.created_at_ms < e1.created_at_ms + ?
             AND NOT EXISTS (
                 SELECT 1 FROM memory_associations ma
                 WHERE ma.agent_id = ? 
@@ -1041,7 +2439,7 @@ class MemoryAPI:
                 AND ma.memory2_id = e2.id AND ma.memory2_type = 'episodic'
             )
             LIMIT 10
-        """, (agent_id, agent_id, agent_id))
+        """, (agent_id, agent_id, HOUR_MS, HOUR_MS, agent_id))
         
         co_occurring = cursor.fetchall()
         
@@ -1055,72 +2453,396 @@ class MemoryAPI:
         
         return new_associations
     
-    def _search_episodic_memories(self, agent_id: str, query: str, importance_threshold: float, limit: int) -> List[Dict[str, Any]]:
-        """Search episodic memories"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT * FROM episodic_memory 
-                WHERE agent_id = ? AND importance >= ?
-                AND (content LIKE ? OR summary LIKE ? OR event_type LIKE ?)
-                ORDER BY importance DESC, created_at DESC
-                LIMIT ?
-            """, (agent_id, importance_threshold, f"%{query}%", f"%{query}%", f"%{query}%", limit))
-            
-            return [dict(row) for row in cursor.fetchall()]
+    @staticmethod
+    def _fts_query(query: str) -> Optional[str]:
+        """Turn free text into an FTS5 MATCH expression
+        
+        Every word must appear as a word or word prefix, in any of the indexed
+        columns. Terms are quoted so user input never reaches the FTS5 query
+        syntax. Returns None when the text has no searchable words.
+        """
+        terms = re.findall(r'\w+', query.lower())
+        if not terms:
+            return None
+        return ' '.join(f'"{term}"*' for term in terms)
     
-    def _search_semantic_memories(self, agent_id: str, query: str, importance_threshold: float, limit: int) -> List[Dict[str, Any]]:
-        """Search semantic memories"""
-        with self.get_connection() as conn:
+    def _ranked_search(
+        self,
+        agent_id: str,
+        memory_types: List[str],
+        match: Optional[str],
+        importance_threshold: float,
+        limit: int,
+        now: int
+    ) -> List[Dict[str, Any]]:
+        """Rank every match of the given memory types and build the best ``limit``
+        
+        One statement pulls only the ranking inputs of each candidate; scoring
+        and top-k selection run vectorized in NumPy, and full rows are read for
+        the winners alone.
+        """
+        weights, inputs = self._ranking_inputs()
+        
+        branches = []
+        for memory_type in memory_types:
+            table, _, thresholded = SEARCH_SOURCES[memory_type][:3]
+            columns = self._ranking_columns(memory_type, inputs)
+            # CROSS JOIN pins the full-text index as the outer loop; otherwise the
+            # planner may walk the agent index and re-run MATCH for every row
+            source = f"{table}_fts f CROSS JOIN {table} m ON m.id = f.rowid" if match else f"{table} m"
+            conditions = ["m.agent_id = :agent_id"]
+            if match:
+                conditions.insert(0, f"{table}_fts MATCH :match")
+            if thresholded:
+                conditions.append("m.importance >= :threshold")
+            branches.append(f"""
+                SELECT {', '.join(columns)}
+                FROM {source}
+                WHERE {' AND '.join(conditions)}""")
+        params = {
+            'agent_id': agent_id,
+            'match': match,
+            'threshold': importance_threshold
+        }
+        
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT * FROM semantic_memory 
-                WHERE agent_id = ? AND importance >= ?
-                AND (concept LIKE ? OR definition LIKE ? OR category LIKE ?)
-                ORDER BY importance DESC, confidence DESC
-                LIMIT ?
-            """, (agent_id, importance_threshold, f"%{query}%", f"%{query}%", f"%{query}%", limit))
-            
-            return [dict(row) for row in cursor.fetchall()]
+            cursor.row_factory = None  # Plain tuples convert to arrays several times faster than Rows
+            cursor.execute(" UNION ALL ".join(branches), params)
+            candidates = ranking.candidate_matrix(cursor.fetchall(), ranking.REQUIRED_COLUMNS + inputs)
+            winners, scores = ranking.rank_candidates(candidates, limit, now, weights)
+            return self._ranked_results(conn, candidates, winners, scores)
     
-    def _search_procedural_memories(self, agent_id: str, query: str, limit: int) -> List[Dict[str, Any]]:
-        """Search procedural memories"""
-        with self.get_connection() as conn:
+    def _ranking_inputs(self) -> Tuple[Dict[str, float], List[int]]:
+        """Get the relevance blend weights and the candidate columns they need
+        
+        Blend inputs with a zero weight are not read at all.
+        """
+        weights = {
+            'confidence_weight': self.config.SEARCH_CONFIDENCE_WEIGHT,
+            'intensity_weight': self.config.SEARCH_INTENSITY_WEIGHT,
+            'access_weight': self.config.SEARCH_ACCESS_WEIGHT
+        }
+        inputs = [
+            column for column, weight in (
+                (ranking.CONFIDENCE, weights['confidence_weight']),
+                (ranking.INTENSITY, weights['intensity_weight']),
+                (ranking.ACCESS_COUNT, weights['access_weight'])
+            ) if weight
+        ]
+        return weights, inputs
+    
+    @staticmethod
+    def _ranking_columns(memory_type: str, inputs: List[int]) -> List[str]:
+        """Build the select list of a memory type's candidate ranking inputs"""
+        _, importance, _, confidence, intensity = SEARCH_SOURCES[memory_type]
+        expressions = {
+            ranking.CONFIDENCE: confidence,
+            ranking.INTENSITY: intensity,
+            ranking.ACCESS_COUNT: 'm.access_count'
+        }
+        columns = [str(SEARCH_TYPE_CODES[memory_type]), 'm.id', importance, 'm.created_at_ms']
+        columns.extend(expressions[column] for column in inputs)
+        return columns
+    
+    def _ranked_results(
+        self,
+        conn: sqlite3.Connection,
+        candidates: np.ndarray,
+        winners: np.ndarray,
+        scores: np.ndarray
+    ) -> List[Dict[str, Any]]:
+        """Read the rows of the winning candidates and attach their scores, in ranked order"""
+        best = candidates[winners]
+        rows = {}
+        for code, memory_type in enumerate(SEARCH_TYPES):
+            ids = best[best[:, ranking.TYPE] == code, ranking.ID]
+            if len(ids):
+                table = SEARCH_SOURCES[memory_type][0]
+                for memory_id, row in self._fetch_rows(conn, table, ids.astype(int).tolist()).items():
+                    rows[(code, memory_id)] = row
+        
+        results = []
+        for index in winners:
+            code, memory_id = int(candidates[index, ranking.TYPE]), int(candidates[index, ranking.ID])
+            row = rows.get((code, memory_id))
+            if row is not None:  # Deleted between ranking and materializing
+                results.append({
+                    **row, 'memory_type': SEARCH_TYPES[code],
+                    'relevance_score': float(scores[index])
+                })
+        return results
+    
+    def _hybrid_search(
+        self,
+        agent_id: str,
+        query: str,
+        memory_types: List[str],
+        importance_threshold: float,
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """Fuse keyword and embedding-similarity rankings, then weight by relevance
+        
+        The keyword path ranks each memory type's full-text matches by BM25;
+        the vector path ranks the agent's embedding matrix by cosine similarity
+        to the query. Both run at once, each keeping its ``SEARCH_HYBRID_DEPTH``
+        best. Every candidate's reciprocal rank fusion score,
+        sum(1 / (SEARCH_RRF_K + rank)) over the lists it appears in, is then
+        multiplied by the usual importance * recency blend. Results carry
+        ``relevance_score`` (the product) and ``fusion_score``.
+        """
+        started = time.perf_counter()
+        depth = max(limit, self.config.SEARCH_HYBRID_DEPTH)
+        now = epoch_ms()
+        match = self._fts_query(query)
+        
+        keyword = functools.partial(
+            self._timed_stage, 'keyword', self._keyword_ranks,
+            agent_id, memory_types, match, importance_threshold, depth
+        )
+        vector = functools.partial(
+            self._timed_stage, 'vector', self._vector_ranks, agent_id, memory_types, query, depth
+        )
+        # Worker threads cannot see a write block's uncommitted rows
+        if self.pool.in_transaction():
+            ranked_lists = keyword() + vector()
+        else:
+            keyword_future = self._get_search_executor().submit(keyword)
+            vector_lists = vector()
+            ranked_lists = keyword_future.result() + vector_lists
+        
+        results = self._timed_stage(
+            'fusion', self._fuse_rankings, agent_id, ranked_lists, importance_threshold, limit, now
+        )
+        self.search_timings.record('total', time.perf_counter() - started)
+        return results
+    
+    def _budgeted_search(
+        self,
+        agent_id: str,
+        query: str,
+        searches: List[Tuple[str, Callable[[], List[Dict[str, Any]]]]],
+        importance_threshold: float,
+        limit: int,
+        hybrid: bool,
+        deadline: float
+    ) -> SearchResults:
+        """Search tiers one at a time in priority order until the deadline passes
+        
+        Memory types are visited in ``SEARCH_PRIORITY`` order. A keyword search
+        has one tier per type; a hybrid search has a keyword tier per type and
+        then the vector tier. The first tier always runs; no further tier
+        starts once ``deadline`` (a ``time.perf_counter()`` value) has passed,
+        and the tiers searched so far are ranked as usual. Tiers run
+        sequentially so the budget buys the most important ones first;
+        ``SEARCH_PARALLEL`` does not apply.
+        """
+        started = time.perf_counter()
+        priority = {memory_type: rank for rank, memory_type in enumerate(self.config.SEARCH_PRIORITY)}
+        searches = sorted(searches, key=lambda search: priority.get(search[0], len(priority)))
+        match = self._fts_query(query)
+        now = epoch_ms()
+        
+        if hybrid and match:
+            depth = max(limit, self.config.SEARCH_HYBRID_DEPTH)
+            tiers = [
+                (f"keyword:{memory_type}", functools.partial(
+                    self._timed_stage, 'keyword', self._keyword_ranks,
+                    agent_id, [memory_type], match, importance_threshold, depth
+                ))
+                for memory_type, _ in searches
+            ]
+            tiers.append(("vector", functools.partial(
+                self._timed_stage, 'vector', self._vector_ranks,
+                agent_id, [memory_type for memory_type, _ in searches], query, depth
+            )))
+        else:
+            tiers = searches
+        
+        searched = []
+        outputs = []
+        for name, tier in tiers:
+            if searched and time.perf_counter() >= deadline:
+                break
+            outputs.append(tier())
+            searched.append(name)
+        
+        if hybrid and match:
+            results = self._timed_stage(
+                'fusion', self._fuse_rankings, agent_id,
+                [ranked for ranked_lists in outputs for ranked in ranked_lists],
+                importance_threshold, limit, now
+            )
+            self.search_timings.record('total', time.perf_counter() - started)
+        else:
+            results = self._rank_search_results(list(zip(searched, outputs)), limit)
+        
+        partial = len(searched) < len(tiers)
+        if partial:
+            logger.debug(f"Search budget for agent {agent_id} ran out after {', '.join(searched)}")
+        return SearchResults(results, partial=partial, searched=searched)
+    
+    def _timed_stage(self, stage: str, func: Callable[..., Any], *args) -> Any:
+        with self.search_timings.measure(stage):
+            return func(*args)
+    
+    def _keyword_ranks(
+        self,
+        agent_id: str,
+        memory_types: List[str],
+        match: str,
+        importance_threshold: float,
+        depth: int
+    ) -> List[List[Tuple[int, int]]]:
+        """Rank each memory type's full-text matches by BM25, best ``depth`` per type
+        
+        BM25 scores depend on each table's own term statistics, so every type
+        contributes a separate ranked list to the fusion.
+        """
+        ranked_lists = []
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT * FROM procedural_memory 
-                WHERE agent_id = ?
-                AND (skill_name LIKE ? OR skill_type LIKE ? OR procedure_steps LIKE ?)
-                ORDER BY proficiency_level DESC, usage_frequency DESC
-                LIMIT ?
-            """, (agent_id, f"%{query}%", f"%{query}%", f"%{query}%", limit))
-            
-            return [dict(row) for row in cursor.fetchall()]
+            cursor.row_factory = None
+            for memory_type in memory_types:
+                table, _, thresholded = SEARCH_SOURCES[memory_type][:3]
+                threshold = "AND m.importance >= :threshold" if thresholded else ""
+                cursor.execute(f"""
+                    SELECT m.id FROM {table}_fts f CROSS JOIN {table} m ON m.id = f.rowid
+                    WHERE {table}_fts MATCH :match AND m.agent_id = :agent_id {threshold}
+                    ORDER BY f.rank LIMIT :depth
+                """, {'match': match, 'agent_id': agent_id, 'threshold': importance_threshold, 'depth': depth})
+                code = SEARCH_TYPE_CODES[memory_type]
+                ranked_lists.append([(code, row[0]) for row in cursor.fetchall()])
+        return ranked_lists
     
-    def _search_emotional_memories(self, agent_id: str, query: str, limit: int) -> List[Dict[str, Any]]:
-        """Search emotional memories"""
-        with self.get_connection() as conn:
+    def _vector_ranks(
+        self,
+        agent_id: str,
+        memory_types: List[str],
+        query: str,
+        depth: int
+    ) -> List[List[Tuple[int, int]]]:
+        """Rank the agent's memories by embedding similarity to the query, best ``depth``"""
+        hits = self._similar_hits(agent_id, self.embed_text(query), depth, memory_types)
+        return [[(code, memory_id) for code, memory_id, _ in hits]]
+    
+    def _fuse_rankings(
+        self,
+        agent_id: str,
+        ranked_lists: List[List[Tuple[int, int]]],
+        importance_threshold: float,
+        limit: int,
+        now: int
+    ) -> List[Dict[str, Any]]:
+        """Score candidates by reciprocal rank fusion times relevance and build the best ``limit``"""
+        fused: Dict[Tuple[int, int], float] = {}
+        for ranked in ranked_lists:
+            for rank, key in enumerate(ranked, 1):
+                fused[key] = fused.get(key, 0.0) + 1.0 / (self.config.SEARCH_RRF_K + rank)
+        if not fused:
+            return []
+        
+        weights, inputs = self._ranking_inputs()
+        branches = []
+        params = []
+        for memory_type in SEARCH_TYPES:
+            code = SEARCH_TYPE_CODES[memory_type]
+            ids = [memory_id for key_code, memory_id in fused if key_code == code]
+            if not ids:
+                continue
+            table, _, thresholded = SEARCH_SOURCES[memory_type][:3]
+            # Similarity hits have not been checked against the importance threshold yet
+            threshold = "AND m.importance >= ?" if thresholded else ""
+            branches.append(f"""
+                SELECT {', '.join(self._ranking_columns(memory_type, inputs))}
+                FROM {table} m
+                WHERE m.id IN (SELECT value FROM json_each(?)) AND m.agent_id = ? {threshold}""")
+            params.extend([json.dumps(ids), agent_id] + ([importance_threshold] if thresholded else []))
+        
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT * FROM emotional_memory 
-                WHERE agent_id = ?
-                AND (trigger_stimulus LIKE ? OR emotion_type LIKE ? OR context LIKE ?)
-                ORDER BY intensity DESC, created_at DESC
-                LIMIT ?
-            """, (agent_id, f"%{query}%", f"%{query}%", f"%{query}%", limit))
-            
-            return [dict(row) for row in cursor.fetchall()]
+            cursor.row_factory = None
+            cursor.execute(" UNION ALL ".join(branches), params)
+            candidates = ranking.candidate_matrix(cursor.fetchall(), ranking.REQUIRED_COLUMNS + inputs)
+            fusion = np.array([
+                fused[(int(code), int(memory_id))]
+                for code, memory_id in candidates[:, [ranking.TYPE, ranking.ID]]
+            ])
+            scores = fusion * ranking.blended_scores(candidates, now, **weights)
+            winners = ranking.top_k(candidates, scores, limit)
+            results = self._ranked_results(conn, candidates, winners, scores)
+        
+        for result in results:
+            result['fusion_score'] = fused[(SEARCH_TYPE_CODES[result['memory_type']], result['id'])]
+        return results
     
-    def _calculate_recency_score(self, created_at_str: str) -> float:
-        """Calculate recency score for memory relevance"""
-        try:
-            created_at = datetime.fromisoformat(created_at_str.replace('Z', '+00:00'))
-            age_hours = (datetime.utcnow() - created_at).total_seconds() / 3600
-            # Exponential decay with half-life of 24 hours
-            return np.exp(-age_hours / 24)
-        except:
-            return 0.5  # Default score if parsing fails
+    def _search_tasks(
+        self,
+        agent_id: str,
+        query: str,
+        memory_types: Optional[List[str]],
+        importance_threshold: float,
+        limit: int
+    ) -> List[Tuple[str, Callable[[], List[Dict[str, Any]]]]]:
+        """Build the per-type searches behind search_memories as (memory_type, search) pairs
+        
+        Each search returns its type's ``limit`` best results, ranked exactly as
+        the single-statement search would rank them.
+        """
+        match = self._fts_query(query)
+        now = epoch_ms()
+        return [
+            (memory_type, functools.partial(
+                self._ranked_search, agent_id, [memory_type], match, importance_threshold, limit, now
+            ))
+            for memory_type in SEARCH_SOURCES
+            if not memory_types or memory_type in memory_types
+        ]
+    
+    def _rank_search_results(
+        self,
+        results_by_type: List[Tuple[str, List[Dict[str, Any]]]],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """Merge per-type search results into the overall top ``limit``
+        
+        Each list is already in ranked order, so a heap merge yields the global
+        order while touching at most ``limit`` results past the list heads.
+        """
+        merged = heapq.merge(
+            *(memories for _, memories in results_by_type),
+            key=lambda x: (-x['relevance_score'], -x['id'], x['memory_type'])
+        )
+        return list(itertools.islice(merged, limit))
+    
+    def _get_search_executor(self) -> ThreadPoolExecutor:
+        """Get the thread pool that runs parallel per-type searches"""
+        with self._search_executor_lock:
+            if self._search_executor is None:
+                # One worker per read connection, so sub-searches never queue for one
+                self._search_executor = ThreadPoolExecutor(
+                    max_workers=self.config.READ_POOL_SIZE,
+                    thread_name_prefix="memory-search"
+                )
+            return self._search_executor
+    
+    def _fetch_rows(self, conn: sqlite3.Connection, table: str, memory_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Read the result rows of the given memory ids, keyed by id"""
+        cursor = conn.execute(
+            f"SELECT {self._row_columns(table)} FROM {table} "
+            f"WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(memory_ids),)
+        )
+        return {row['id']: dict(row) for row in cursor}
+    
+    def _row_columns(self, table: str) -> str:
+        """Build the select list of a table's non-BLOB columns for search results"""
+        columns = self._row_column_cache.get(table)
+        if columns is None:
+            with self.get_read_connection() as conn:
+                columns = ", ".join(
+                    row['name'] for row in conn.execute(f"PRAGMA table_info({table})")
+                    if row['type'].upper() != 'BLOB'
+                )
+            self._row_column_cache[table] = columns
+        return columns
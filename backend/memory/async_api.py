@@ -0,0 +1,152 @@
+
+"""
+Asyncio Facade for the LexOS Memory System
+Awaitable versions of the MemoryAPI methods backed by a bounded thread executor
+"""
+
+import asyncio
+import inspect
+import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Callable
+
+from memory.api import MemoryAPI
+from memory.integration import AgentMemoryInterface
+from schemas.memory_models import MemoryConfig
+
+logger = logging.getLogger(__name__)
+
+# Methods that hand out connections or manage lifetime are not wrapped; neither
+# is the iter_memories generator, which holds a read connection between rows
+# (page through page_memories instead)
+_UNWRAPPED_METHODS = {'get_connection', 'get_read_connection', 'close', 'iter_memories'}
+
+class AsyncMemoryAPI:
+    """Awaitable facade over a MemoryAPI
+
+    Every public MemoryAPI method has an ``async`` counterpart with the same
+    signature that runs on a dedicated executor of ``max_workers`` threads.
+    The default matches the read pool size, so concurrent reads each get
+    their own read-only connection instead of queueing for one.
+
+    At most ``max_workers`` calls are handed to the executor at once; the rest
+    wait on a semaphore, so a cancelled or timed-out call that has not started
+    never runs. A call already running in SQLite finishes in the background
+    (its transaction commits or rolls back as a unit) and its result is
+    discarded. ``timeout`` applies to every call; use ``asyncio.wait_for`` or
+    ``asyncio.timeout`` for per-call limits.
+    """
+
+    def __init__(
+        self,
+        memory_api: Optional[MemoryAPI] = None,
+        db_path: str = "backend/data/lexos.db",
+        max_workers: Optional[int] = None,
+        timeout: Optional[float] = None
+    ):
+        self.config = MemoryConfig()
+        self._owns_api = memory_api is None
+        self.memory_api = memory_api or MemoryAPI(db_path)
+        self.max_workers = max_workers or self.config.ASYNC_MAX_WORKERS
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="memory-async"
+        )
+        self._slots = asyncio.Semaphore(self.max_workers)
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking memory call on the executor"""
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            call = loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+            if self.timeout is None:
+                return await call
+            return await asyncio.wait_for(call, self.timeout)
+
+    async def search_memories(
+        self,
+        agent_id: str,
+        query: str,
+        memory_types: Optional[List[str]] = None,
+        importance_threshold: float = 0.2,
+        limit: int = 20,
+        parallel: Optional[bool] = True,
+        hybrid: Optional[bool] = None,
+        deadline_ms: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Search across all memory types, running the per-type searches concurrently
+        
+        Goes through the MemoryAPI search cache; on a miss the per-type searches
+        (or the two hybrid paths) fan out on the MemoryAPI's search executor
+        unless ``parallel`` is False. A ``deadline_ms`` budget is applied as in
+        ``MemoryAPI.search_memories``.
+        """
+        return await self.run(
+            self.memory_api.search_memories,
+            agent_id, query, memory_types, importance_threshold, limit,
+            parallel=parallel, hybrid=hybrid, deadline_ms=deadline_ms
+        )
+
+    async def close(self):
+        """Wait for running calls, then close the wrapped MemoryAPI if this facade created it"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown)
+        if self._owns_api:
+            self.memory_api.close()
+
+    async def __aenter__(self) -> "AsyncMemoryAPI":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+        return False
+
+def _make_async_method(name: str, method: Callable[..., Any]):
+    """Build the awaitable counterpart of a MemoryAPI method"""
+    @functools.wraps(method)
+    async def async_method(self, *args, **kwargs):
+        return await self.run(getattr(self.memory_api, name), *args, **kwargs)
+    return async_method
+
+for _name, _method in inspect.getmembers(MemoryAPI, inspect.isfunction):
+    if _name.startswith('_') or _name in _UNWRAPPED_METHODS or hasattr(AsyncMemoryAPI, _name):
+        continue
+    setattr(AsyncMemoryAPI, _name, _make_async_method(_name, _method))
+
+class AsyncAgentMemoryInterface:
+    """Awaitable AgentMemoryInterface sharing an AsyncMemoryAPI's executor
+
+    ``make_decision`` runs its four memory lookups concurrently; every other
+    public method of the interface is available as an awaitable.
+    """
+
+    def __init__(self, agent_id: str, async_api: AsyncMemoryAPI):
+        self.agent_id = agent_id
+        self.async_api = async_api
+        self.interface = AgentMemoryInterface(agent_id, async_api.memory_api)
+
+    async def make_decision(
+        self,
+        context: str,
+        options: List[str],
+        decision_type: str = "general"
+    ) -> Dict[str, Any]:
+        """Make decision based on memory and experience"""
+        lookups = self.interface._decision_lookups(context, decision_type)
+        results = await asyncio.gather(*(self.async_api.run(lookup) for lookup in lookups.values()))
+        return await self.async_api.run(
+            self.interface._complete_decision,
+            context, options, decision_type, dict(zip(lookups, results))
+        )
+
+    def __getattr__(self, name: str):
+        method = getattr(self.interface, name)
+        if name.startswith('_') or not callable(method):
+            return method
+
+        @functools.wraps(method)
+        async def async_method(*args, **kwargs):
+            return await self.async_api.run(method, *args, **kwargs)
+        return async_method
@@ -13,7 +13,8 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any
 from pathlib import Path
 
-from memory.api import MemoryAPI
+from memory.api import MemoryAPI, epoch_ms
+from memory.timestamps import fill_epoch_columns
 
 logger = logging.getLogger(__name__)
 
@@ -37,7 +38,7 @@ class MemoryBackupManager:
         backup_path = self.backup_dir / backup_filename
         
         try:
-            with self.memory_api.get_connection() as conn:
+            with self.memory_api.get_read_connection() as conn:
                 # Generate SQL dump
                 sql_dump = self._generate_sql_dump(conn, agent_id)
                 
@@ -69,7 +70,7 @@ class MemoryBackupManager:
             export_filename = f"agent_memories_{agent_id}_{timestamp}.sql"
             export_path = self.backup_dir / export_filename
             
-            with self.memory_api.get_connection() as conn:
+            with self.memory_api.get_read_connection() as conn:
                 sql_dump = self._generate_sql_dump(conn, agent_id)
                 
             with open(export_path, 'w', encoding='utf-8') as f:
@@ -104,6 +105,8 @@ class MemoryBackupManager:
                 
                 with self.memory_api.get_connection() as conn:
                     conn.executescript(sql_content)
+                    # Dumps taken before the *_ms columns existed leave them NULL
+                    fill_epoch_columns(conn)
                     import_stats = self._count_imported_memories(conn, agent_id)
             
             else:
@@ -133,6 +136,7 @@ class MemoryBackupManager:
                 
                 # Execute restore script
                 conn.executescript(sql_content)
+                fill_epoch_columns(conn)
             
             logger.info(f"Restored memories from backup: {backup_path}")
             return True
@@ -234,6 +238,8 @@ class MemoryBackupManager:
                                 values.append('NULL')
                             elif isinstance(value, str):
                                 values.append(f"'{value.replace(chr(39), chr(39)+chr(39))}'")
+                            elif isinstance(value, bytes):
+                                values.append(f"X'{value.hex()}'")
                             else:
                                 values.append(str(value))
                         
@@ -259,26 +265,14 @@ class MemoryBackupManager:
             'statistics': {}
         }
         
-        # Export episodic memories
-        episodic_memories = self.memory_api.retrieve_episodic_memories(
-            agent_id, limit=10000
-        )
-        export_data['episodic_memories'] = episodic_memories
-        
-        # Export semantic memories
-        semantic_memories = self.memory_api.retrieve_semantic_memory(
-            agent_id, limit=10000
-        )
-        export_data['semantic_memories'] = semantic_memories
-        
-        # Export emotional patterns
-        emotional_memories = self.memory_api.retrieve_emotional_patterns(
-            agent_id, limit=10000
-        )
-        export_data['emotional_memories'] = emotional_memories
+        # Stream each memory type in keyset chunks rather than one capped read
+        for memory_type in ('episodic', 'semantic', 'procedural', 'emotional'):
+            export_data[f'{memory_type}_memories'] = list(
+                self.memory_api.iter_memories(agent_id, memory_type)
+            )
         
         # Export associations
-        with self.memory_api.get_connection() as conn:
+        with self.memory_api.get_read_connection() as conn:
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -287,22 +281,6 @@ class MemoryBackupManager:
             
             associations = [dict(row) for row in cursor.fetchall()]
             export_data['associations'] = associations
-            
-            # Export procedural memories
-            cursor.execute("""
-                SELECT * FROM procedural_memory WHERE agent_id = ?
-            """, (agent_id,))
-            
-            procedural = []
-            for row in cursor.fetchall():
-                memory = dict(row)
-                memory['procedure_steps'] = json.loads(memory['procedure_steps'] or '[]')
-                memory['conditions'] = json.loads(memory['conditions'] or '{}')
-                memory['tags'] = json.loads(memory['tags'] or '[]')
-                memory['metadata'] = json.loads(memory['metadata'] or '{}')
-                procedural.append(memory)
-            
-            export_data['procedural_memories'] = procedural
         
         # Add statistics
         from memory.consolidator import MemoryConsolidator
@@ -311,6 +289,17 @@ class MemoryBackupManager:
         
         return export_data
     
+    @staticmethod
+    def _without_blobs(rows: List[Any]) -> List[Dict[str, Any]]:
+        """Drop BLOB values (embeddings) from rows bound for JSON
+        
+        Embeddings are derived from the memory text and rebuilt on import.
+        """
+        return [
+            {key: value for key, value in dict(row).items() if not isinstance(value, bytes)}
+            for row in rows
+        ]
+    
     def _import_from_json(self, agent_id: str, memories_data: Dict[str, Any]) -> Dict[str, int]:
         """Import memories from JSON data"""
         import_stats = {
@@ -418,65 +407,58 @@ class MemoryBackupManager:
                 'associations': []
             }
         }
+        since_ms = epoch_ms(since)
         
-        with self.memory_api.get_connection() as conn:
+        with self.memory_api.get_read_connection() as conn:
             cursor = conn.cursor()
             
             # Get episodic memories created/updated since timestamp
             cursor.execute("""
                 SELECT * FROM episodic_memory 
                 WHERE agent_id = ? AND (
-                    created_at > ? OR accessed_at > ?
+                    created_at_ms > ? OR accessed_at_ms > ?
                 )
-            """, (agent_id, since, since))
+            """, (agent_id, since_ms, since_ms))
             
-            incremental_data['changes']['episodic_memories'] = [
-                dict(row) for row in cursor.fetchall()
-            ]
+            incremental_data['changes']['episodic_memories'] = self._without_blobs(cursor.fetchall())
             
             # Get semantic memories updated since timestamp
             cursor.execute("""
                 SELECT * FROM semantic_memory 
                 WHERE agent_id = ? AND (
-                    created_at > ? OR updated_at > ? OR accessed_at > ?
+                    created_at_ms > ? OR updated_at_ms > ? OR accessed_at_ms > ?
                 )
-            """, (agent_id, since, since, since))
+            """, (agent_id, since_ms, since_ms, since_ms))
             
-            incremental_data['changes']['semantic_memories'] = [
-                dict(row) for row in cursor.fetchall()
-            ]
+            incremental_data['changes']['semantic_memories'] = self._without_blobs(cursor.fetchall())
             
             # Get procedural memories updated since timestamp
             cursor.execute("""
                 SELECT * FROM procedural_memory 
                 WHERE agent_id = ? AND (
-                    created_at > ? OR updated_at > ? OR accessed_at > ?
+                    created_at_ms > ? OR updated_at_ms > ? OR accessed_at_ms > ?
                 )
-            """, (agent_id, since, since, since))
+            """, (agent_id, since_ms, since_ms, since_ms))
             
-            incremental_data['changes']['procedural_memories'] = [
-                dict(row) for row in cursor.fetchall()
-            ]
+            incremental_data['changes']['procedural_memories'] = self._without_blobs(cursor.fetchall())
             
             # Get emotional memories created since timestamp
             cursor.execute("""
                 SELECT * FROM emotional_memory 
                 WHERE agent_id = ? AND (
-                    created_at > ? OR accessed_at > ?
+                    created_at_ms > ? OR accessed_at_ms > ?
                 )
-            """, (agent_id, since, since))
+            """, (agent_id, since_ms, since_ms))
             
-            incremental_data['changes']['emotional_memories'] = [
-                dict(row) for row in cursor.fetchall()
-            ]
+            incremental_data['changes']['emotional_memories'] = self._without_blobs(cursor.fetchall())
             
             # Get associations created since timestamp
             cursor.execute("""
                 SELECT * FROM memory_associations 
                 WHERE agent_id = ? AND (
-                    created_at > ? OR last_reinforced > ?
+                    created_at_ms > ? OR last_reinforced_ms > ?
                 )
-            """, (agent_id, since, since))
+            """, (agent_id, since_ms, since_ms))
             
             incremental_data['changes']['associations'] = [
                 dict(row) for row in cursor.fetchall()
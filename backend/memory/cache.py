@@ -0,0 +1,133 @@
+
+"""
+Search Result Cache for the LexOS Memory System
+LRU/TTL cache for search_memories invalidated by per-agent write generations
+"""
+
+import copy
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Any, Tuple, Hashable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+class SearchCache:
+    """LRU cache of search results with per-agent write generations
+
+    Every write to an agent's memories bumps that agent's generation; entries
+    remember the generation they were computed under and are ignored once it
+    moves on, so a search never returns results older than the last write it
+    could have seen. ``ttl_seconds`` bounds staleness from writes the cache is
+    not told about (direct SQL, other processes).
+
+    Concurrent misses on the same key are coalesced: the first caller runs the
+    search and the others wait for its result instead of querying SQLite too.
+    Callers passing ``coalesce=False`` (latency-budgeted searches) neither wait
+    on nor lead such a flight, so no caller's budget is spent on another's
+    search and no waiter receives a result cut short by someone else's budget.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._inflight: Dict[Tuple[Hashable, int], Future] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'invalidations': 0,
+            'evictions': 0
+        }
+
+    def get_or_compute(self, agent_id: str, key: Hashable,
+                       compute: Callable[[], List[Dict[str, Any]]],
+                       keep: Optional[Callable[[List[Dict[str, Any]]], bool]] = None,
+                       coalesce: bool = True) -> List[Dict[str, Any]]:
+        """Return cached results for key, running compute on a miss
+
+        Results ``keep`` rejects are handed to the callers waiting on them but
+        not stored. Without ``coalesce`` a miss always runs its own compute.
+        """
+        if self.max_entries <= 0:
+            return compute()
+
+        with self._lock:
+            generation = self._generations.get(agent_id, 0)
+            entry = self._entries.get(key)
+            if entry and entry[0] == generation and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return self._copy(entry[2])
+
+            flight = self._inflight.get((key, generation)) if coalesce else None
+            leader = flight is None
+            if leader:
+                self._stats['misses'] += 1
+                if coalesce:
+                    flight = Future()
+                    self._inflight[(key, generation)] = flight
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            return self._copy(flight.result())
+
+        try:
+            results = compute()
+        except BaseException as e:
+            if flight is not None:
+                with self._lock:
+                    del self._inflight[(key, generation)]
+                flight.set_exception(e)
+            raise
+
+        with self._lock:
+            if flight is not None:
+                del self._inflight[(key, generation)]
+            if keep is None or keep(results):
+                # Stored under the generation read before the search started, so a
+                # write that landed meanwhile makes this entry stale immediately
+                self._entries[key] = (generation, time.monotonic() + self.ttl_seconds, results)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+
+        if flight is not None:
+            flight.set_result(results)
+        return self._copy(results)
+
+    def invalidate(self, agent_id: str):
+        """Bump an agent's write generation, retiring its cached searches"""
+        with self._lock:
+            self._generations[agent_id] = self._generations.get(agent_id, 0) + 1
+            self._stats['invalidations'] += 1
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache hit, miss and invalidation counts"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses'] + self._stats['coalesced']
+            return {
+                **self._stats,
+                'entries': len(self._entries),
+                'hit_rate': (self._stats['hits'] + self._stats['coalesced']) / lookups if lookups else 0.0
+            }
+
+    @staticmethod
+    def _copy(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Callers annotate result dicts; keep the cached ones untouched. A shallow
+        # copy first keeps the list's type and attributes (e.g. SearchResults flags)
+        copied = copy.copy(results)
+        copied[:] = [dict(result) for result in results]
+        return copied
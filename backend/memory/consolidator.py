@@ -14,7 +14,8 @@ from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 import schedule
 
-from memory.api import MemoryAPI
+from memory.api import MemoryAPI, epoch_ms, HOUR_MS, DAY_MS
+from memory.timestamps import insert_stamps, set_stamps
 from schemas.memory_models import MemoryConfig
 
 logger = logging.getLogger(__name__)
@@ -63,6 +64,10 @@ class MemoryConsolidator:
             self._run_memory_cleanup
         )
         
+        schedule.every(self.config.OPTIMIZE_INTERVAL_HOURS).hours.do(
+            self._run_database_optimization
+        )
+        
         # Start scheduler thread
         self.consolidation_thread = threading.Thread(
             target=self._scheduler_loop,
@@ -117,6 +122,13 @@ class MemoryConsolidator:
             except Exception as e:
                 logger.error(f"Error in sleep consolidation for agent {agent_id}: {e}")
     
+    def _run_database_optimization(self):
+        """Refresh query planner statistics"""
+        try:
+            self.memory_api.optimize_database()
+        except Exception as e:
+            logger.error(f"Error optimizing memory database: {e}")
+    
     def _run_memory_cleanup(self):
         """Run memory cleanup and archiving"""
         logger.info("Starting memory cleanup")
@@ -152,6 +164,9 @@ class MemoryConsolidator:
         )
         
         try:
+            # Decay and strengthening read access counts, so apply buffered ones first
+            self.memory_api.flush_access_tracking()
+            
             with self.memory_api.get_connection() as conn:
                 cursor = conn.cursor()
                 
@@ -208,6 +223,9 @@ class MemoryConsolidator:
                         status = 'failed', completed_at = CURRENT_TIMESTAMP
                     WHERE agent_id = ? AND status = 'running'
                 """, (agent_id,))
+        finally:
+            self.memory_api.invalidate_search_cache(agent_id)
+            self.memory_api.sync_vector_index(agent_id)
         
         return stats
     
@@ -308,6 +326,9 @@ class MemoryConsolidator:
             'associations_cleaned': 0
         }
         
+        # Deletion keys on access_count, so apply buffered accesses first
+        self.memory_api.flush_access_tracking()
+        
         with self.memory_api.get_connection() as conn:
             cursor = conn.cursor()
             
@@ -319,8 +340,8 @@ class MemoryConsolidator:
                 UPDATE episodic_memory SET
                     metadata = json_set(COALESCE(metadata, '{}'), '$.archived', 1)
                 WHERE agent_id = ? AND importance < ? 
-                AND created_at < ? AND json_extract(metadata, '$.archived') IS NULL
-            """, (agent_id, self.config.LOW_IMPORTANCE_THRESHOLD, archive_threshold))
+                AND created_at_ms < ? AND json_extract(metadata, '$.archived') IS NULL
+            """, (agent_id, self.config.LOW_IMPORTANCE_THRESHOLD, epoch_ms(archive_threshold)))
             
             cleanup_stats['archived'] += cursor.rowcount
             
@@ -330,8 +351,8 @@ class MemoryConsolidator:
             cursor.execute("""
                 DELETE FROM episodic_memory 
                 WHERE agent_id = ? AND importance < ? 
-                AND created_at < ? AND access_count = 0
-            """, (agent_id, self.config.FORGOTTEN_MEMORY_THRESHOLD, forgotten_threshold))
+                AND created_at_ms < ? AND access_count = 0
+            """, (agent_id, self.config.FORGOTTEN_MEMORY_THRESHOLD, epoch_ms(forgotten_threshold)))
             
             cleanup_stats['deleted'] += cursor.rowcount
             
@@ -339,21 +360,23 @@ class MemoryConsolidator:
             cursor.execute("""
                 DELETE FROM memory_associations 
                 WHERE agent_id = ? AND strength < ?
-                AND last_reinforced < datetime('now', '-30 days')
-            """, (agent_id, self.config.WEAK_ASSOCIATION_THRESHOLD))
+                AND last_reinforced_ms < ?
+            """, (agent_id, self.config.WEAK_ASSOCIATION_THRESHOLD, epoch_ms() - 30 * DAY_MS))
             
             cleanup_stats['associations_cleaned'] += cursor.rowcount
             
             # 4. Clean up expired working memory
             cursor.execute("""
                 DELETE FROM working_memory 
-                WHERE agent_id = ? AND expires_at < CURRENT_TIMESTAMP
-            """, (agent_id,))
+                WHERE agent_id = ? AND expires_at_ms < ?
+            """, (agent_id, epoch_ms()))
             
             # 5. Vacuum database if significant cleanup occurred
             if cleanup_stats['deleted'] > 100:
                 cursor.execute("VACUUM")
         
+        self.memory_api.invalidate_search_cache(agent_id)
+        self.memory_api.sync_vector_index(agent_id)
         logger.info(f"Cleaned up memories for agent {agent_id}: {cleanup_stats}")
         return cleanup_stats
     
@@ -374,6 +397,9 @@ class MemoryConsolidator:
             
             # 4. Update memory importance based on association strength
             self._update_importance_from_associations(cursor, agent_id)
+        
+        self.memory_api.invalidate_search_cache(agent_id)
+        self.memory_api.sync_vector_index(agent_id)
     
     def _apply_gentle_decay(self, cursor: sqlite3.Cursor, agent_id: str) -> int:
         """Apply gentle decay to memories"""
@@ -382,8 +408,8 @@ class MemoryConsolidator:
         cursor.execute("""
             UPDATE episodic_memory SET
                 importance = importance * ?
-            WHERE agent_id = ? AND accessed_at < datetime('now', '-2 days')
-        """, (decay_rate, agent_id))
+            WHERE agent_id = ? AND accessed_at_ms < ?
+        """, (decay_rate, agent_id, epoch_ms() - 2 * DAY_MS))
         
         return cursor.rowcount
     
@@ -395,8 +421,8 @@ class MemoryConsolidator:
             UPDATE episodic_memory SET
                 importance = importance * ?,
                 decay_factor = decay_factor * ?
-            WHERE agent_id = ? AND accessed_at < datetime('now', '-1 day')
-        """, (decay_rate, decay_rate, agent_id))
+            WHERE agent_id = ? AND accessed_at_ms < ?
+        """, (decay_rate, decay_rate, agent_id, epoch_ms() - DAY_MS))
         
         weakened = cursor.rowcount
         
@@ -406,8 +432,8 @@ class MemoryConsolidator:
             UPDATE emotional_memory SET
                 intensity = intensity * ?,
                 decay_factor = decay_factor * ?
-            WHERE agent_id = ? AND accessed_at < datetime('now', '-1 day')
-        """, (emotional_decay, emotional_decay, agent_id))
+            WHERE agent_id = ? AND accessed_at_ms < ?
+        """, (emotional_decay, emotional_decay, agent_id, epoch_ms() - DAY_MS))
         
         weakened += cursor.rowcount
         return weakened
@@ -419,9 +445,9 @@ class MemoryConsolidator:
         cursor.execute("""
             UPDATE episodic_memory SET
                 importance = MIN(1.0, importance * ?)
-            WHERE agent_id = ? AND accessed_at > datetime('now', '-1 day')
+            WHERE agent_id = ? AND accessed_at_ms > ?
             AND (importance > ? OR emotional_intensity > ?)
-        """, (boost_factor, agent_id, 
+        """, (boost_factor, agent_id, epoch_ms() - DAY_MS,
               self.config.HIGH_IMPORTANCE_THRESHOLD,
               self.config.EMOTIONAL_SIGNIFICANCE_THRESHOLD))
         
@@ -469,7 +495,7 @@ class MemoryConsolidator:
             JOIN episodic_memory e2 ON e1.session_id = e2.session_id
             WHERE e1.agent_id = ? AND e2.agent_id = ?
             AND e1.id < e2.id
-            AND ABS(julianday(e1.created_at) - julianday(e2.created_at)) < 0.125  -- 3 hours
+            AND e2.created_at_ms > e1.created_at_ms - ? AND e2.created_at_ms < e1.created_at_ms + ?
             AND NOT EXISTS (
                 SELECT 1 FROM memory_associations ma
                 WHERE ma.agent_id = ? 
@@ -477,7 +503,7 @@ class MemoryConsolidator:
                 AND ma.memory2_id = e2.id AND ma.memory2_type = 'episodic'
             )
             LIMIT 5
-        """, (agent_id, agent_id, agent_id))
+        """, (agent_id, agent_id, 3 * HOUR_MS, 3 * HOUR_MS, agent_id))
         
         pairs = cursor.fetchall()
         
@@ -547,7 +573,7 @@ class MemoryConsolidator:
             
             # Check if this semantic memory already exists
             cursor.execute("""
-                SELECT id FROM semantic_memory 
+                SELECT id, category FROM semantic_memory 
                 WHERE agent_id = ? AND concept = ?
             """, (agent_id, concept))
             
@@ -555,20 +581,30 @@ class MemoryConsolidator:
             
             if existing:
                 # Update existing
-                cursor.execute("""
+                embedding = self.memory_api.embed_memory('semantic', {
+                    'concept': concept, 'definition': definition, 'category': existing['category']
+                })
+                stamp_assignments, stamps = set_stamps(('updated_at',))
+                cursor.execute(f"""
                     UPDATE semantic_memory SET
                         definition = ?, confidence = MIN(1.0, confidence + 0.1),
-                        updated_at = CURRENT_TIMESTAMP
+                        embedding = ?, {stamp_assignments}
                     WHERE id = ?
-                """, (definition, existing['id']))
+                """, (definition, embedding) + stamps + (existing['id'],))
+                self.memory_api.index_embeddings(agent_id, 'semantic', [existing['id']], [embedding])
             else:
                 # Create new
-                cursor.execute("""
+                embedding = self.memory_api.embed_memory('semantic', {
+                    'concept': concept, 'definition': definition, 'category': 'learned_pattern'
+                })
+                stamp_columns, stamp_placeholders, stamps = insert_stamps('semantic_memory')
+                cursor.execute(f"""
                     INSERT INTO semantic_memory (
                         agent_id, concept, definition, category,
-                        confidence, source, importance
-                    ) VALUES (?, ?, ?, 'learned_pattern', 0.7, 'episodic_consolidation', 0.6)
-                """, (agent_id, concept, definition))
+                        confidence, source, importance, embedding, {stamp_columns}
+                    ) VALUES (?, ?, ?, 'learned_pattern', 0.7, 'episodic_consolidation', 0.6, ?,
+                              {stamp_placeholders})
+                """, (agent_id, concept, definition, embedding) + stamps)
                 
                 consolidated += 1
         
@@ -581,8 +617,8 @@ class MemoryConsolidator:
             DELETE FROM episodic_memory 
             WHERE agent_id = ? AND importance < ?
             AND access_count = 0 
-            AND created_at < datetime('now', '-30 days')
-        """, (agent_id, self.config.FORGOTTEN_MEMORY_THRESHOLD))
+            AND created_at_ms < ?
+        """, (agent_id, self.config.FORGOTTEN_MEMORY_THRESHOLD, epoch_ms() - 30 * DAY_MS))
         
         forgotten = cursor.rowcount
         
@@ -591,8 +627,8 @@ class MemoryConsolidator:
             DELETE FROM emotional_memory 
             WHERE agent_id = ? AND intensity < 0.1
             AND access_count = 0
-            AND created_at < datetime('now', '-14 days')
-        """, (agent_id,))
+            AND created_at_ms < ?
+        """, (agent_id, epoch_ms() - 14 * DAY_MS))
         
         forgotten += cursor.rowcount
         return forgotten
@@ -605,8 +641,8 @@ class MemoryConsolidator:
             UPDATE procedural_memory SET
                 proficiency_level = MAX(0.0, proficiency_level - 0.01)
             WHERE agent_id = ? 
-            AND (last_used IS NULL OR last_used < datetime('now', '-7 days'))
-        """, (agent_id,))
+            AND (last_used_ms IS NULL OR last_used_ms < ?)
+        """, (agent_id, epoch_ms() - 7 * DAY_MS))
     
     def _update_emotional_patterns(self, cursor: sqlite3.Cursor, agent_id: str):
         """Update emotional memory patterns and coping strategies"""
@@ -631,16 +667,21 @@ class MemoryConsolidator:
                 skill_name = f"Coping with {strategy['emotion_type']}"
                 procedure_steps = [f"Apply strategy: {strategy['coping_strategy']}"]
                 
-                cursor.execute("""
+                stamp_columns, stamp_placeholders, stamps = insert_stamps('procedural_memory')
+                cursor.execute(f"""
                     INSERT OR REPLACE INTO procedural_memory (
                         agent_id, skill_name, skill_type, procedure_steps,
-                        proficiency_level, success_rate
-                    ) VALUES (?, ?, 'emotional_regulation', ?, ?, ?)
+                        proficiency_level, success_rate, embedding, {stamp_columns}
+                    ) VALUES (?, ?, 'emotional_regulation', ?, ?, ?, ?, {stamp_placeholders})
                 """, (
                     agent_id, skill_name, json.dumps(procedure_steps),
                     min(1.0, strategy['usage_count'] * 0.1),
-                    strategy['success_rate']
-                ))
+                    strategy['success_rate'],
+                    self.memory_api.embed_memory('procedural', {
+                        'skill_name': skill_name, 'skill_type': 'emotional_regulation',
+                        'procedure_steps': procedure_steps
+                    })
+                ) + stamps)
     
     def _strengthen_goal_related_memories(self, cursor: sqlite3.Cursor, agent_id: str) -> int:
         """Strengthen memories related to current goals"""
@@ -651,25 +692,26 @@ class MemoryConsolidator:
             UPDATE episodic_memory SET
                 importance = MIN(1.0, importance * 1.1)
             WHERE agent_id = ? AND importance > 0.7
-            AND created_at > datetime('now', '-3 days')
-        """, (agent_id,))
+            AND created_at_ms > ?
+        """, (agent_id, epoch_ms() - 3 * DAY_MS))
         
         return cursor.rowcount
     
     def _rehearse_procedural_memories(self, cursor: sqlite3.Cursor, agent_id: str):
         """Rehearse important procedural memories"""
         
-        cursor.execute("""
+        stamp_assignments, stamps = set_stamps(('accessed_at',))
+        cursor.execute(f"""
             UPDATE procedural_memory SET
                 proficiency_level = MIN(1.0, proficiency_level + 0.02),
-                accessed_at = CURRENT_TIMESTAMP,
+                {stamp_assignments},
                 access_count = access_count + 1
             WHERE agent_id = ? AND (
                 usage_frequency > 5 OR 
                 success_rate > 0.8 OR
                 proficiency_level > 0.7
             )
-        """, (agent_id,))
+        """, stamps + (agent_id,))
     
     def _strengthen_emotional_memories(self, cursor: sqlite3.Cursor, agent_id: str) -> int:
         """Strengthen high-intensity emotional memories"""
@@ -693,7 +735,7 @@ class MemoryConsolidator:
             JOIN episodic_memory e2 ON e1.agent_id = e2.agent_id
             WHERE e1.agent_id = ? AND e1.id < e2.id
             AND e1.importance > 0.7 AND e2.importance > 0.7
-            AND ABS(julianday(e1.created_at) - julianday(e2.created_at)) < 1  -- 1 day
+            AND e2.created_at_ms > e1.created_at_ms - ? AND e2.created_at_ms < e1.created_at_ms + ?
             AND NOT EXISTS (
                 SELECT 1 FROM memory_associations ma
                 WHERE ma.agent_id = ? 
@@ -701,7 +743,7 @@ class MemoryConsolidator:
                 AND ma.memory2_id = e2.id AND ma.memory2_type = 'episodic'
             )
             LIMIT 3
-        """, (agent_id, agent_id))
+        """, (agent_id, DAY_MS, DAY_MS, agent_id))
         
         pairs = cursor.fetchall()
         
@@ -848,7 +890,7 @@ class MemoryConsolidator:
     
     def get_consolidation_history(self, agent_id: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
         """Get consolidation history"""
-        with self.memory_api.get_connection() as conn:
+        with self.memory_api.get_read_connection() as conn:
             cursor = conn.cursor()
             
             query = "SELECT * FROM memory_consolidation"
@@ -866,7 +908,7 @@ class MemoryConsolidator:
     
     def get_memory_statistics(self, agent_id: str) -> Dict[str, Any]:
         """Get comprehensive memory statistics for an agent"""
-        with self.memory_api.get_connection() as conn:
+        with self.memory_api.get_read_connection() as conn:
             cursor = conn.cursor()
             
             stats = {}
@@ -0,0 +1,111 @@
+
+"""
+Background Embedding Pipeline for the LexOS Memory System
+Fills in memories stored without an embedding, one short write batch at a time
+"""
+
+import atexit
+import logging
+import threading
+from typing import Dict, Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingWorker:
+    """Daemon thread draining memories whose embedding column is NULL
+
+    ``run_batch`` embeds and writes one bounded batch of pending rows in its
+    own transaction and returns how many rows it found and how many it wrote
+    (rows edited meanwhile are skipped and found again by a later batch). The
+    worker calls it until a batch finds nothing pending, so the write lock is
+    released between batches.
+    It runs when notified of new rows and every ``poll_interval`` seconds
+    otherwise. Pending rows live in the database, so stopping the worker
+    loses nothing: the next run (or a backfill) picks them up.
+    """
+
+    def __init__(self, run_batch: Callable[[], Tuple[int, int]], poll_interval: float = 0.5):
+        self.run_batch = run_batch
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._stats = {
+            'batches': 0,
+            'embedded': 0,
+            'skipped': 0,
+            'failed_batches': 0
+        }
+
+    def notify(self):
+        """Signal that rows are waiting, starting the worker on first use"""
+        self._ensure_started()
+        self._wake.set()
+
+    def drain(self, max_batches: Optional[int] = None) -> int:
+        """Run batches in the calling thread until none is left or the worker stops
+
+        Returns the number of rows written.
+        """
+        total = 0
+        batches = 0
+        with self._run_lock:
+            while not self._stopped.is_set() and (max_batches is None or batches < max_batches):
+                found, written = self.run_batch()
+                if not found:
+                    break
+                batches += 1
+                total += written
+                with self._lock:
+                    self._stats['batches'] += 1
+                    self._stats['embedded'] += written
+                    self._stats['skipped'] += found - written
+        return total
+
+    def _ensure_started(self):
+        """Start the background thread on first use"""
+        if self._thread is not None or self._stopped.is_set():
+            return
+
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run_loop,
+                name="memory-embedding-worker",
+                daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def _run_loop(self):
+        """Drain pending rows whenever woken, and at least every poll interval"""
+        while not self._stopped.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.drain()
+            except Exception as e:
+                with self._lock:
+                    self._stats['failed_batches'] += 1
+                logger.error(f"Error in embedding worker: {e}")
+
+    def stop(self):
+        """Stop the worker after its current batch"""
+        self._stopped.set()
+        self._wake.set()
+
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            atexit.unregister(self.stop)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get embedding worker statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['running'] = self._thread is not None and self._thread.is_alive()
+        return stats
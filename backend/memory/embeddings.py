@@ -0,0 +1,184 @@
+
+"""
+Local Text Embeddings for the LexOS Memory System
+Deterministic hashed n-gram embeddings stored as packed float32 BLOBs
+"""
+
+import re
+import zlib
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Iterable, Mapping, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Stored vectors are little-endian float32, whatever the host byte order
+EMBEDDING_DTYPE = np.dtype('<f4')
+
+# Columns whose text is embedded for each memory type
+EMBEDDING_FIELDS = {
+    'episodic': ('event_type', 'content', 'summary', 'lessons_learned'),
+    'semantic': ('concept', 'definition', 'category'),
+    'procedural': ('skill_name', 'skill_type', 'procedure_steps'),
+    'emotional': ('emotion_type', 'trigger_stimulus', 'context')
+}
+
+WORD_PATTERN = re.compile(r'\w+')
+
+class HashingEmbedder:
+    """Deterministic, offline text embedder based on feature hashing
+
+    Word unigrams, word bigrams and character n-grams of each word are hashed
+    with CRC32 (stable across processes, unlike ``hash()``) into ``dimension``
+    signed buckets. Counts are log-scaled and the vector is L2-normalized, so
+    a dot product of two embeddings is their cosine similarity. The same text
+    always maps to the same vector; no model or network call is involved.
+    """
+
+    def __init__(self, dimension: int = 256, char_ngrams: Tuple[int, int] = (3, 5),
+                 char_weight: float = 0.5):
+        self.dimension = dimension
+        self.char_ngrams = char_ngrams
+        self.char_weight = char_weight
+
+    def features(self, text: str) -> Tuple[List[bytes], List[float]]:
+        """Extract the hashed features of a text with their weights"""
+        words = WORD_PATTERN.findall(text.lower())
+        features = [b'w:' + word.encode() for word in words]
+        features.extend(b'b:' + f"{a} {b}".encode() for a, b in zip(words, words[1:]))
+        weights = [1.0] * len(features)
+
+        low, high = self.char_ngrams
+        for word in words:
+            padded = f"<{word}>"
+            for n in range(low, min(high, len(padded)) + 1):
+                for start in range(len(padded) - n + 1):
+                    features.append(b'c:' + padded[start:start + n].encode())
+                    weights.append(self.char_weight)
+        return features, weights
+
+    def embed(self, text: Optional[str]) -> np.ndarray:
+        """Embed one text as a unit-length float32 vector (all zeros for empty text)"""
+        features, weights = self.features(text or "")
+        if not features:
+            return np.zeros(self.dimension, dtype=EMBEDDING_DTYPE)
+
+        hashes = np.fromiter((zlib.crc32(feature) for feature in features),
+                             dtype=np.uint32, count=len(features))
+        # Low bits pick the bucket, the top bit the sign, so collisions cancel out on average
+        signs = np.where(hashes >> 31, -1.0, 1.0)
+        counts = np.bincount(hashes % self.dimension, weights=signs * weights,
+                             minlength=self.dimension)
+        vector = np.sign(counts) * np.log1p(np.abs(counts))
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector.astype(EMBEDDING_DTYPE)
+
+    def embed_batch(self, texts: Iterable[Optional[str]]) -> np.ndarray:
+        """Embed many texts into an (n, dimension) float32 matrix"""
+        vectors = [self.embed(text) for text in texts]
+        if not vectors:
+            return np.empty((0, self.dimension), dtype=EMBEDDING_DTYPE)
+        return np.vstack(vectors)
+
+class EmbeddingCache:
+    """LRU memo of embeddings keyed by a hash of the embedded text
+
+    Memories often repeat the same text (agent responses, recurring
+    stimuli); each distinct text is embedded once while it stays among the
+    ``max_entries`` most recently used. Cached vectors are read-only.
+    """
+
+    def __init__(self, embedder: HashingEmbedder, max_entries: int = 4096):
+        self.embedder = embedder
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        """Content hash of a text"""
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed one text, reusing a cached vector for the same content"""
+        return self.embed_batch([text])[0]
+
+    def embed_batch(self, texts: Iterable[str]) -> np.ndarray:
+        """Embed many texts into an (n, dimension) matrix, each distinct uncached text once"""
+        texts = list(texts)
+        keys = [self.key(text) for text in texts]
+        found: Dict[bytes, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = vector
+            # Repeats within the batch are embedded once and count as hits
+            missing = {key: text for key, text in zip(keys, texts) if key not in found}
+            self._stats['hits'] += len(keys) - len(missing)
+            self._stats['misses'] += len(missing)
+
+        if missing:
+            vectors = self.embedder.embed_batch(missing.values())
+            vectors.flags.writeable = False
+            found.update(zip(missing, vectors))
+            with self._lock:
+                for key in missing:
+                    self._entries[key] = found[key]
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        if not keys:
+            return np.empty((0, self.embedder.dimension), dtype=EMBEDDING_DTYPE)
+        return np.vstack([found[key] for key in keys])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit, miss and size statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+def memory_text(memory_type: str, fields: Mapping[str, Any]) -> str:
+    """Join the embedded fields of a memory into one text
+
+    List values (procedure steps) are joined with spaces; JSON-encoded lists
+    read back from the database tokenize to the same words.
+    """
+    parts = []
+    for field in EMBEDDING_FIELDS[memory_type]:
+        value = fields.get(field)
+        if isinstance(value, (list, tuple)):
+            value = " ".join(str(item) for item in value)
+        if value:
+            parts.append(str(value))
+    return " ".join(parts)
+
+def to_blob(vector: np.ndarray) -> bytes:
+    """Pack a vector as the float32 BLOB stored in the embedding columns"""
+    return np.ascontiguousarray(vector, dtype=EMBEDDING_DTYPE).tobytes()
+
+def from_blob(blob: Optional[bytes]) -> Optional[np.ndarray]:
+    """View an embedding BLOB as a float32 vector without copying
+
+    The array shares the BLOB's buffer and is read-only.
+    """
+    if blob is None:
+        return None
+    return np.frombuffer(blob, dtype=EMBEDDING_DTYPE)
+
+def stack_blobs(blobs: List[bytes], dimension: int) -> np.ndarray:
+    """Stack same-length embedding BLOBs into an (n, dimension) matrix with one copy"""
+    if not blobs:
+        return np.empty((0, dimension), dtype=EMBEDDING_DTYPE)
+    return np.frombuffer(b"".join(blobs), dtype=EMBEDDING_DTYPE).reshape(len(blobs), dimension)
@@ -7,9 +7,9 @@ Connects agent personalities to their memory systems and enables memory-driven b
 import json
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Callable
 
-from memory.api import MemoryAPI
+from memory.api import MemoryAPI, epoch_ms, DAY_MS, substring_source
 from memory.consolidator import MemoryConsolidator
 from memory.backup import MemoryBackupManager
 from schemas.memory_models import MemoryType, MemoryConfig
@@ -92,25 +92,44 @@ class AgentMemoryInterface:
         query: str,
         memory_types: Optional[List[str]] = None,
         limit: int = 10,
-        importance_threshold: float = 0.3
+        importance_threshold: float = 0.3,
+        approximate: Optional[bool] = None,
+        deadline_ms: Optional[float] = None
     ) -> List[Dict[str, Any]]:
-        """Retrieve memories relevant to current context"""
-        
-        # Search across memory types
-        relevant_memories = self.memory_api.search_memories(
-            agent_id=self.agent_id,
-            query=query,
-            memory_types=memory_types,
-            importance_threshold=importance_threshold,
-            limit=limit
-        )
+        """Retrieve memories relevant to current context
+        
+        With ``approximate`` (default ``ANN_RETRIEVAL``) memories are ranked by
+        embedding similarity through the approximate nearest-neighbour index
+        instead of by keyword match. ``deadline_ms`` bounds the keyword search
+        as in ``MemoryAPI.search_memories``; an approximate search probes one
+        index and is not budgeted.
+        """
+        
+        if approximate is None:
+            approximate = self.config.ANN_RETRIEVAL
+        
+        if approximate:
+            relevant_memories = self.memory_api.approximate_similar_memories(
+                self.agent_id, query,
+                k=limit,
+                memory_types=memory_types,
+                importance_threshold=importance_threshold
+            )
+        else:
+            # Search across memory types
+            relevant_memories = self.memory_api.search_memories(
+                agent_id=self.agent_id,
+                query=query,
+                memory_types=memory_types,
+                importance_threshold=importance_threshold,
+                limit=limit,
+                deadline_ms=deadline_ms
+            )
         
         # Update access tracking for retrieved memories
-        for memory in relevant_memories:
-            self.memory_api._update_memory_access(
-                memory['id'], 
-                memory['memory_type']
-            )
+        self.memory_api.access_tracker.record_many(
+            (memory['memory_type'], memory['id']) for memory in relevant_memories
+        )
         
         return relevant_memories
     
@@ -122,6 +141,40 @@ class AgentMemoryInterface:
     ) -> Dict[str, Any]:
         """Make decision based on memory and experience"""
         
+        lookups = self._decision_lookups(context, decision_type)
+        decision_inputs = {name: lookup() for name, lookup in lookups.items()}
+        return self._complete_decision(context, options, decision_type, decision_inputs)
+    
+    def _decision_lookups(self, context: str, decision_type: str) -> Dict[str, Callable[[], Any]]:
+        """Build the independent memory lookups behind a decision, keyed by input name"""
+        return {
+            # Retrieve relevant procedural memories
+            'procedural_memories': lambda: self._get_relevant_procedures(decision_type, context),
+            # Retrieve similar past experiences
+            'past_experiences': lambda: self.retrieve_relevant_memories(
+                query=f"{decision_type} {context}",
+                memory_types=["episodic"],
+                limit=5
+            ),
+            # Retrieve relevant knowledge
+            'knowledge': lambda: self.retrieve_relevant_memories(
+                query=context,
+                memory_types=["semantic"],
+                limit=3
+            ),
+            # Get emotional associations
+            'emotional_context': lambda: self._get_emotional_context(context)
+        }
+    
+    def _complete_decision(
+        self,
+        context: str,
+        options: List[str],
+        decision_type: str,
+        decision_inputs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Score options from the looked-up memories and record the decision"""
+        
         decision_context = {
             'context': context,
             'options': options,
@@ -129,25 +182,10 @@ class AgentMemoryInterface:
             'timestamp': datetime.utcnow().isoformat()
         }
         
-        # Retrieve relevant procedural memories
-        procedural_memories = self._get_relevant_procedures(decision_type, context)
-        
-        # Retrieve similar past experiences
-        past_experiences = self.retrieve_relevant_memories(
-            query=f"{decision_type} {context}",
-            memory_types=["episodic"],
-            limit=5
-        )
-        
-        # Retrieve relevant knowledge
-        knowledge = self.retrieve_relevant_memories(
-            query=context,
-            memory_types=["semantic"],
-            limit=3
-        )
-        
-        # Get emotional associations
-        emotional_context = self._get_emotional_context(context)
+        procedural_memories = decision_inputs['procedural_memories']
+        past_experiences = decision_inputs['past_experiences']
+        knowledge = decision_inputs['knowledge']
+        emotional_context = decision_inputs['emotional_context']
         
         # Calculate decision scores (simplified heuristic)
         decision_scores = self._calculate_decision_scores(
@@ -268,17 +306,24 @@ class AgentMemoryInterface:
         )
         
         # Boost importance of relevant memories
-        for memory in related_memories:
-            if memory['memory_type'] == 'episodic':
-                with self.memory_api.get_connection() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute("""
-                        UPDATE episodic_memory SET
-                            importance = MIN(1.0, importance * 1.1),
-                            accessed_at = CURRENT_TIMESTAMP,
-                            access_count = access_count + 1
-                        WHERE id = ?
-                    """, (memory['id'],))
+        episodic_ids = [
+            (memory['id'],) for memory in related_memories
+            if memory['memory_type'] == 'episodic'
+        ]
+        
+        if episodic_ids:
+            with self.memory_api.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany("""
+                    UPDATE episodic_memory SET
+                        importance = MIN(1.0, importance * 1.1)
+                    WHERE id = ?
+                """, episodic_ids)
+            self.memory_api.invalidate_search_cache(self.agent_id)
+            
+            self.memory_api.access_tracker.record_many(
+                ('episodic', memory_id) for (memory_id,) in episodic_ids
+            )
     
     def _load_session_context(self):
         """Load relevant context into working memory for session"""
@@ -377,21 +422,20 @@ class AgentMemoryInterface:
     def _get_relevant_procedures(self, decision_type: str, context: str) -> List[Dict[str, Any]]:
         """Get procedural memories relevant to decision"""
         
-        with self.memory_api.get_connection() as conn:
+        with self.memory_api.get_read_connection() as conn:
             cursor = conn.cursor()
             
-            cursor.execute("""
-                SELECT * FROM procedural_memory 
-                WHERE agent_id = ? 
-                AND (skill_type LIKE ? OR skill_name LIKE ? OR procedure_steps LIKE ?)
-                ORDER BY proficiency_level DESC, success_rate DESC
+            source, params = substring_source("procedural_memory", [
+                ("skill_type", decision_type),
+                ("skill_name", context),
+                ("procedure_steps", context)
+            ])
+            cursor.execute(f"""
+                SELECT m.* FROM {source}
+                WHERE m.agent_id = ?
+                ORDER BY m.proficiency_level DESC, m.success_rate DESC
                 LIMIT 5
-            """, (
-                self.agent_id,
-                f"%{decision_type}%",
-                f"%{context}%",
-                f"%{context}%"
-            ))
+            """, params + [self.agent_id])
             
             procedures = []
             for row in cursor.fetchall():
@@ -484,11 +528,14 @@ class AgentMemoryInterface:
         with self.memory_api.get_connection() as conn:
             cursor = conn.cursor()
             
-            cursor.execute("""
-                SELECT id, skill_name FROM procedural_memory 
-                WHERE agent_id = ? 
-                AND (skill_name LIKE ? OR procedure_steps LIKE ?)
-            """, (self.agent_id, f"%{action}%", f"%{action}%"))
+            source, params = substring_source("procedural_memory", [
+                ("skill_name", action),
+                ("procedure_steps", action)
+            ])
+            cursor.execute(f"""
+                SELECT m.id, m.skill_name FROM {source}
+                WHERE m.agent_id = ?
+            """, params + [self.agent_id])
             
             related_skills = cursor.fetchall()
             
@@ -503,7 +550,7 @@ class AgentMemoryInterface:
     def _get_agent_skills(self) -> List[Dict[str, Any]]:
         """Get agent's procedural skills"""
         
-        with self.memory_api.get_connection() as conn:
+        with self.memory_api.get_read_connection() as conn:
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -519,7 +566,7 @@ class AgentMemoryInterface:
     def _generate_memory_summary(self) -> Dict[str, Any]:
         """Generate summary of agent's memory state"""
         
-        with self.memory_api.get_connection() as conn:
+        with self.memory_api.get_read_connection() as conn:
             cursor = conn.cursor()
             
             # Count memories by type
@@ -545,8 +592,8 @@ class AgentMemoryInterface:
             cursor.execute("""
                 SELECT COUNT(*) as recent_memories
                 FROM episodic_memory 
-                WHERE agent_id = ? AND created_at > datetime('now', '-24 hours')
-            """, (self.agent_id,))
+                WHERE agent_id = ? AND created_at_ms > ?
+            """, (self.agent_id, epoch_ms() - DAY_MS))
             
             recent_activity = cursor.fetchone()['recent_memories']
             
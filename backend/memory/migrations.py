@@ -0,0 +1,116 @@
+
+"""
+Schema Migrations for the LexOS Memory System
+Applies the versioned SQL files in backend/migrations exactly once per database
+"""
+
+import re
+import sqlite3
+import logging
+from pathlib import Path
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+_MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+class MigrationRunner:
+    """Applies pending ``NNN_name.sql`` migrations in version order
+
+    Applied versions are recorded in a ``schema_version`` table. Each migration
+    runs inside its own ``BEGIN IMMEDIATE`` transaction together with its
+    version row, so a failed migration leaves no partial schema behind and two
+    processes starting at once cannot apply the same migration twice.
+    """
+
+    def __init__(self, migrations_dir: Path = MIGRATIONS_DIR):
+        self.migrations_dir = Path(migrations_dir)
+
+    def discover(self) -> List[Tuple[int, str, Path]]:
+        """List available migrations as (version, name, path) sorted by version"""
+        migrations = []
+        for path in self.migrations_dir.glob("*.sql"):
+            match = _MIGRATION_FILE.match(path.name)
+            if match:
+                migrations.append((int(match.group(1)), match.group(2), path))
+        return sorted(migrations)
+
+    def applied_versions(self, conn: sqlite3.Connection) -> List[int]:
+        """Get the versions already applied to a database"""
+        self._ensure_version_table(conn)
+        rows = conn.execute("SELECT version FROM schema_version ORDER BY version").fetchall()
+        return [row[0] for row in rows]
+
+    def current_version(self, conn: sqlite3.Connection) -> int:
+        """Get the highest applied migration version (0 if none)"""
+        versions = self.applied_versions(conn)
+        return versions[-1] if versions else 0
+
+    def apply(self, conn: sqlite3.Connection) -> List[int]:
+        """Apply all pending migrations, returning the versions applied"""
+        applied = set(self.applied_versions(conn))
+        conn.commit()
+
+        newly_applied = []
+        for version, name, path in self.discover():
+            if version in applied:
+                continue
+
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have applied it while we waited for the lock
+                already = conn.execute(
+                    "SELECT 1 FROM schema_version WHERE version = ?", (version,)
+                ).fetchone()
+                if not already:
+                    for statement in self._split_statements(path.read_text()):
+                        conn.execute(statement)
+                    conn.execute(
+                        "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                        (version, name)
+                    )
+                    newly_applied.append(version)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                logger.error(f"Migration {path.name} failed; database left at previous version")
+                raise
+
+            if not already:
+                logger.info(f"Applied memory schema migration {path.name}")
+
+        return newly_applied
+
+    def _ensure_version_table(self, conn: sqlite3.Connection):
+        """Create the schema_version table if missing"""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+    @staticmethod
+    def _split_statements(script: str) -> List[str]:
+        """Split a SQL script into complete statements
+
+        ``executescript`` would commit the surrounding transaction, so statements
+        are executed one at a time instead. Trigger bodies stay intact because
+        ``sqlite3.complete_statement`` only accepts them after their ``END;``.
+        """
+        statements = []
+        buffer = ""
+        for line in script.splitlines(keepends=True):
+            if not buffer.strip() and line.strip().startswith("--"):
+                continue
+            buffer += line
+            if sqlite3.complete_statement(buffer):
+                if buffer.strip():
+                    statements.append(buffer.strip())
+                buffer = ""
+        if buffer.strip():
+            statements.append(buffer.strip())
+        return statements
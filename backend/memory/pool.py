@@ -0,0 +1,361 @@
+
+"""
+Connection Pooling for the LexOS Memory System
+Keeps one initialized SQLite connection per thread and reuses it across calls,
+plus a bounded lane of read-only connections for retrieval
+"""
+
+import os
+import queue
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from urllib.parse import quote
+from typing import Dict, Any, List, Tuple, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+def memory_database_uri(name: str) -> str:
+    """Get the URI of a named in-memory database shared by all connections in this process
+
+    Uses SQLite's ``memdb`` VFS rather than shared-cache ``:memory:`` so that
+    connections keep ordinary file locking and honour the busy timeout. The
+    database is freed when its last connection closes.
+    """
+    return f"file:/{quote(name, safe='')}?vfs=memdb"
+
+class PooledConnection:
+    """Context manager handed out by the pool in place of a raw connection
+
+    Entering returns the thread's persistent ``sqlite3.Connection``. Calls nest:
+    only the outermost ``with`` block commits (or rolls back on error), so helper
+    methods that open their own block share the caller's transaction instead of
+    contending with it for the write lock. Callbacks registered with
+    ``ConnectionPool.after_commit`` run once that commit succeeds and are
+    dropped on rollback.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, state: Dict[str, Any]):
+        self._conn = conn
+        self._state = state
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._state['depth'] += 1
+        return self._conn
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._state['depth'] -= 1
+        if self._state['depth'] == 0:
+            callbacks, self._state['after_commit'] = self._state['after_commit'], []
+            if exc_type is None:
+                self._conn.commit()
+                for callback in callbacks:
+                    try:
+                        callback()
+                    except Exception as e:
+                        logger.warning(f"Post-commit callback failed: {e}")
+            else:
+                self._conn.rollback()
+        return False
+
+    def __getattr__(self, name: str):
+        return getattr(self._conn, name)
+
+class ConnectionPool:
+    """Thread-local pool of persistent SQLite connections"""
+
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA cache_size=10000",
+        "PRAGMA temp_store=memory",
+        # Rows removed by INSERT OR REPLACE must fire the full-text delete triggers
+        "PRAGMA recursive_triggers=ON",
+    )
+
+    def __init__(self, db_path: str, timeout: float = 5.0, uri: bool = False):
+        self.db_path = db_path
+        self.timeout = timeout
+        self.uri = uri
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: Dict[int, Tuple[threading.Thread, sqlite3.Connection]] = {}
+        self._pid = os.getpid()
+        self._inherited: List[sqlite3.Connection] = []
+        self._stats = {
+            'connections_created': 0,
+            'connections_closed': 0,
+            'acquisitions': 0,
+            'fork_resets': 0
+        }
+
+    def connection(self) -> PooledConnection:
+        """Get the calling thread's connection, creating it on first use"""
+        if os.getpid() != self._pid:
+            self._reset_after_fork()
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.conn = conn
+            self._local.state = {'depth': 0, 'after_commit': []}
+
+        with self._lock:
+            self._stats['acquisitions'] += 1
+
+        return PooledConnection(conn, self._local.state)
+
+    def in_transaction(self) -> bool:
+        """Check whether the calling thread is inside a connection block"""
+        state = getattr(self._local, 'state', None)
+        return bool(state and state['depth'] > 0)
+
+    def after_commit(self, callback: Callable[[], None]):
+        """Run ``callback`` when the calling thread's transaction commits
+
+        Outside a connection block it runs at once. Work that must only follow
+        durable rows (such as updating in-process indexes) goes here, so a
+        rollback never leaves it describing rows that do not exist.
+        """
+        if self.in_transaction():
+            self._local.state['after_commit'].append(callback)
+        else:
+            callback()
+
+    def after_commit_mark(self) -> int:
+        """Position in the calling thread's post-commit callbacks, for ``discard_after_commit``"""
+        state = getattr(self._local, 'state', None)
+        return len(state['after_commit']) if state else 0
+
+    def discard_after_commit(self, mark: int):
+        """Drop callbacks registered since ``mark``, after rolling back to a savepoint"""
+        state = getattr(self._local, 'state', None)
+        if state:
+            del state['after_commit'][mark:]
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open and initialize a new connection for the current thread"""
+        # check_same_thread is disabled only so close_all() can run from any
+        # thread; each connection is otherwise used by its owning thread alone
+        conn = sqlite3.connect(
+            self.db_path, timeout=self.timeout,
+            check_same_thread=False, uri=self.uri
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+
+        current = threading.current_thread()
+        with self._lock:
+            self._prune_dead_threads()
+            self._connections[current.ident] = (current, conn)
+            self._stats['connections_created'] += 1
+
+        logger.debug(f"Opened pooled connection to {self.db_path} for thread {current.name}")
+        return conn
+
+    def _prune_dead_threads(self):
+        """Close connections owned by threads that have exited (lock held)"""
+        for ident, (thread, conn) in list(self._connections.items()):
+            if not thread.is_alive():
+                conn.close()
+                del self._connections[ident]
+                self._stats['connections_closed'] += 1
+
+    def _reset_after_fork(self):
+        """Drop connections inherited from the parent process
+
+        SQLite connections must not be used across fork(), so the child parks
+        them unused (letting them be garbage collected would close file handles
+        the parent still relies on) and lazily opens fresh ones.
+        """
+        self._inherited.extend(conn for _, conn in self._connections.values())
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = {}
+        self._pid = os.getpid()
+        self._stats['fork_resets'] += 1
+
+    def close_all(self):
+        """Close every pooled connection"""
+        with self._lock:
+            for thread, conn in self._connections.values():
+                conn.close()
+                self._stats['connections_closed'] += 1
+            self._connections = {}
+            self._local = threading.local()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool usage statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['open_connections'] = len(self._connections)
+        stats['db_path'] = self.db_path
+        stats['pid'] = self._pid
+        return stats
+
+class ReadConnection:
+    """Context manager lending a read-only connection to the calling thread
+
+    Nested blocks on the same thread reuse the connection already lent to it;
+    the connection returns to the pool when the outermost block exits.
+    """
+
+    def __init__(self, pool: "ReadOnlyPool"):
+        self._pool = pool
+
+    def __enter__(self) -> sqlite3.Connection:
+        return self._pool._checkout()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._pool._checkin()
+        return False
+
+class ReadOnlyPool:
+    """Bounded pool of read-only SQLite connections shared across threads
+
+    Connections are opened with ``mode=ro`` and ``PRAGMA query_only`` so they
+    can never take the write lock. Under WAL they read from their own snapshot
+    and never wait on a writer. At most ``size`` connections exist; a thread
+    that finds them all lent out waits up to ``timeout`` seconds for one.
+    """
+
+    PRAGMAS = (
+        "PRAGMA query_only=ON",
+        "PRAGMA cache_size=10000",
+        "PRAGMA temp_store=memory",
+    )
+
+    def __init__(self, db_path: str, size: int = 4, timeout: float = 5.0, uri: Optional[str] = None):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._uri = uri or Path(db_path).resolve().as_uri() + "?mode=ro"
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # LIFO keeps the most recently used (warmest) connections in rotation
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._connections: List[sqlite3.Connection] = []
+        self._pid = os.getpid()
+        self._inherited: List[sqlite3.Connection] = []
+        self._stats = {
+            'connections_created': 0,
+            'connections_closed': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'fork_resets': 0
+        }
+
+    def connection(self) -> ReadConnection:
+        """Borrow a read-only connection for the duration of a ``with`` block"""
+        return ReadConnection(self)
+
+    def _checkout(self) -> sqlite3.Connection:
+        """Lend a connection to the calling thread, reusing one it already holds"""
+        if os.getpid() != self._pid:
+            self._reset_after_fork()
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            return conn
+
+        conn = self._acquire()
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def _checkin(self):
+        """Return the calling thread's connection once its outermost block exits"""
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+
+        conn, self._local.conn = self._local.conn, None
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    def _acquire(self) -> sqlite3.Connection:
+        """Take an idle connection, open a new one, or wait for one to be returned"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+
+        if conn is None:
+            with self._lock:
+                can_open = len(self._connections) < self.size
+                if can_open:
+                    # Reserve the slot before opening outside the lock
+                    self._connections.append(None)
+
+            if can_open:
+                try:
+                    conn = self._open_connection()
+                except Exception:
+                    with self._lock:
+                        self._connections.remove(None)
+                    raise
+            else:
+                with self._lock:
+                    self._stats['waits'] += 1
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError(
+                        f"Timed out waiting for a read-only connection to {self.db_path}"
+                    )
+
+        with self._lock:
+            self._stats['checkouts'] += 1
+        return conn
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open and initialize a new read-only connection"""
+        conn = sqlite3.connect(
+            self._uri, timeout=self.timeout,
+            check_same_thread=False, uri=True
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+
+        with self._lock:
+            self._connections[self._connections.index(None)] = conn
+            self._stats['connections_created'] += 1
+
+        logger.debug(f"Opened read-only connection to {self.db_path}")
+        return conn
+
+    def _reset_after_fork(self):
+        """Drop connections inherited from the parent process"""
+        self._inherited.extend(conn for conn in self._connections if conn is not None)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        self._pid = os.getpid()
+        self._stats['fork_resets'] += 1
+
+    def close_all(self):
+        """Close every read-only connection"""
+        with self._lock:
+            for conn in self._connections:
+                if conn is not None:
+                    conn.close()
+                    self._stats['connections_closed'] += 1
+            self._connections = []
+            self._idle = queue.LifoQueue()
+            self._local = threading.local()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get read pool usage statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['open_connections'] = sum(1 for conn in self._connections if conn is not None)
+        stats['idle_connections'] = self._idle.qsize()
+        stats['size'] = self.size
+        stats['db_path'] = self.db_path
+        return stats
@@ -0,0 +1,231 @@
+
+"""
+Quantized Embeddings for the LexOS Memory System
+int8 scalar and 1-bit binary codes for stored embeddings, scanned for search candidates
+"""
+
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple, Iterable
+
+import numpy as np
+
+from memory.embeddings import EMBEDDING_DTYPE, to_blob, from_blob, stack_blobs
+
+logger = logging.getLogger(__name__)
+
+# Storage formats of the embedding columns, configured per memory type
+QUANTIZATION_SCHEMES = ('float32', 'int8', 'binary')
+
+# int8 codes are prefixed with their little-endian float32 scale
+SCALE_DTYPE = np.dtype('<f4')
+
+# Set bits per byte, for Hamming distances on NumPy without bitwise_count
+_POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+
+def blob_size(scheme: str, dimension: int) -> int:
+    """Bytes taken by one embedding BLOB in a storage format"""
+    if scheme == 'float32':
+        return dimension * EMBEDDING_DTYPE.itemsize
+    if scheme == 'int8':
+        return SCALE_DTYPE.itemsize + dimension
+    if scheme == 'binary':
+        return (dimension + 7) // 8
+    raise ValueError(f"Unknown embedding quantization: {scheme}")
+
+def blob_scheme(blob: bytes, dimension: int) -> str:
+    """Tell the storage format of an embedding BLOB from its length"""
+    for scheme in QUANTIZATION_SCHEMES:
+        if len(blob) == blob_size(scheme, dimension):
+            return scheme
+    raise ValueError(f"Embedding BLOB of {len(blob)} bytes does not match dimension {dimension}")
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Scale each row into [-127, 127]; returns (int8 codes, float32 scales)"""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=EMBEDDING_DTYPE))
+    scales = (np.abs(vectors).max(axis=1) / 127.0).astype(SCALE_DTYPE)
+    safe = np.where(scales == 0, 1, scales)
+    codes = np.clip(np.rint(vectors / safe[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """Pack the sign of each component into one bit per dimension"""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=EMBEDDING_DTYPE))
+    return np.packbits(vectors > 0, axis=1)
+
+def encode_embedding(vector: np.ndarray, scheme: str) -> bytes:
+    """Pack a float32 embedding as the BLOB stored for a quantization scheme"""
+    if scheme == 'float32':
+        return to_blob(vector)
+    if scheme == 'int8':
+        codes, scales = quantize_int8(vector)
+        return scales.tobytes() + codes.tobytes()
+    if scheme == 'binary':
+        return quantize_binary(vector).tobytes()
+    raise ValueError(f"Unknown embedding quantization: {scheme}")
+
+def decode_embedding(blob: bytes, dimension: int) -> np.ndarray:
+    """Read an embedding BLOB of any format as a float32 vector
+
+    float32 BLOBs are viewed without copying; int8 codes are rescaled and
+    binary codes become unit-length +/-1 vectors, both approximations.
+    """
+    scheme = blob_scheme(blob, dimension)
+    if scheme == 'float32':
+        return from_blob(blob)
+    if scheme == 'int8':
+        scale = np.frombuffer(blob, dtype=SCALE_DTYPE, count=1)[0]
+        return np.frombuffer(blob, dtype=np.int8, offset=SCALE_DTYPE.itemsize).astype(EMBEDDING_DTYPE) * scale
+    bits = np.unpackbits(np.frombuffer(blob, dtype=np.uint8))[:dimension]
+    return ((bits.astype(EMBEDDING_DTYPE) * 2 - 1) / np.sqrt(dimension)).astype(EMBEDDING_DTYPE)
+
+def decode_embeddings(blobs: List[bytes], dimension: int) -> np.ndarray:
+    """Stack embedding BLOBs of any mix of formats into an (n, dimension) float32 matrix"""
+    if not blobs:
+        return np.empty((0, dimension), dtype=EMBEDDING_DTYPE)
+    row_bytes = blob_size('float32', dimension)
+    if all(len(blob) == row_bytes for blob in blobs):
+        return stack_blobs(blobs, dimension)
+    return np.vstack([decode_embedding(blob, dimension) for blob in blobs])
+
+def hamming_distances(codes: np.ndarray, query_bits: np.ndarray) -> np.ndarray:
+    """Hamming distance from a packed query to every packed code row"""
+    differing = np.bitwise_xor(codes, query_bits)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(differing).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[differing].sum(axis=1, dtype=np.int32)
+
+class QuantizedIndex:
+    """In-memory int8 or binary codes of one agent's memories of one type
+
+    Candidate generation scans the codes only: int8 rows are scored by an
+    integer dot product with the int8-quantized query times the row scale,
+    binary rows by Hamming distance to the query's sign bits. Callers re-rank
+    the returned candidates with exact float vectors.
+
+    Codes are added from stored BLOBs in any format (float32 BLOBs written
+    before a type was quantized are quantized on the way in). Updates replace
+    a row in place; deletes tombstone it until a quarter of the rows are dead.
+    """
+
+    def __init__(self, dimension: int, scheme: str):
+        if scheme not in ('int8', 'binary'):
+            raise ValueError(f"QuantizedIndex needs int8 or binary codes, not {scheme}")
+        self.dimension = dimension
+        self.scheme = scheme
+        width = dimension if scheme == 'int8' else (dimension + 7) // 8
+        self._codes = np.empty((0, width), dtype=np.int8 if scheme == 'int8' else np.uint8)
+        self._scales = np.empty(0, dtype=SCALE_DTYPE)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._alive = np.empty(0, dtype=bool)
+        self._size = 0
+        self._rows: Dict[int, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        """Number of live codes"""
+        return len(self._rows)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the live codes and scales"""
+        row_bytes = self._codes.shape[1] + (SCALE_DTYPE.itemsize if self.scheme == 'int8' else 0)
+        return len(self) * row_bytes
+
+    def ids(self) -> np.ndarray:
+        """Ids of the live codes"""
+        with self._lock:
+            return self._ids[:self._size][self._alive[:self._size]].copy()
+
+    def _codes_from_blobs(self, blobs: List[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+        """Turn stored BLOBs into this index's codes and scales"""
+        if all(blob_scheme(blob, self.dimension) == self.scheme for blob in blobs):
+            raw = np.frombuffer(b"".join(blobs), dtype=np.uint8).reshape(len(blobs), -1)
+            if self.scheme == 'binary':
+                return raw, np.ones(len(blobs), dtype=SCALE_DTYPE)
+            scales = raw[:, :SCALE_DTYPE.itemsize].copy().view(SCALE_DTYPE).ravel()
+            return raw[:, SCALE_DTYPE.itemsize:].view(np.int8), scales
+        vectors = decode_embeddings(blobs, self.dimension)
+        if self.scheme == 'binary':
+            return quantize_binary(vectors), np.ones(len(blobs), dtype=SCALE_DTYPE)
+        return quantize_int8(vectors)
+
+    def add(self, ids: Iterable[int], blobs: List[bytes]):
+        """Insert codes from stored BLOBs, replacing any already indexed under the same id"""
+        ids = np.asarray(list(ids), dtype=np.int64)
+        if len(ids) == 0:
+            return
+        codes, scales = self._codes_from_blobs(blobs)
+
+        with self._lock:
+            rows = np.array([self._rows.get(memory_id, -1) for memory_id in ids.tolist()], dtype=np.intp)
+            existing = rows >= 0
+            self._codes[rows[existing]] = codes[existing]
+            self._scales[rows[existing]] = scales[existing]
+
+            fresh = np.flatnonzero(~existing)
+            if len(fresh):
+                start, end = self._size, self._size + len(fresh)
+                self._reserve(end)
+                self._codes[start:end] = codes[fresh]
+                self._scales[start:end] = scales[fresh]
+                self._ids[start:end] = ids[fresh]
+                self._alive[start:end] = True
+                self._size = end
+                self._rows.update(zip(ids[fresh].tolist(), range(start, end)))
+
+    def retain(self, ids: Iterable[int], horizon: Optional[int] = None) -> int:
+        """Drop every code whose id is not in ``ids``; returns how many
+
+        Ids above ``horizon`` (the largest id handed out when ``ids`` was read)
+        were written since and are kept.
+        """
+        with self._lock:
+            stale = np.setdiff1d(self.ids(), np.asarray(list(ids), dtype=np.int64))
+            if horizon is not None:
+                stale = stale[stale <= horizon]
+            for memory_id in stale.tolist():
+                self._alive[self._rows.pop(memory_id)] = False
+            if self._size and (self._size - len(self)) > self._size // 4:
+                self._compact()
+            return len(stale)
+
+    def _reserve(self, capacity: int):
+        """Grow the row arrays geometrically to hold ``capacity`` rows"""
+        if capacity <= len(self._ids):
+            return
+        capacity = max(capacity, 2 * len(self._ids), 64)
+        for name in ('_codes', '_scales', '_ids', '_alive'):
+            old = getattr(self, name)
+            grown = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            grown[:self._size] = old[:self._size]
+            setattr(self, name, grown)
+
+    def _compact(self):
+        keep = np.flatnonzero(self._alive[:self._size])
+        self._codes = self._codes[keep]
+        self._scales = self._scales[keep]
+        self._ids = self._ids[keep]
+        self._alive = np.ones(len(keep), dtype=bool)
+        self._size = len(keep)
+        self._rows = dict(zip(self._ids.tolist(), range(self._size)))
+
+    def candidates(self, query: np.ndarray, n: int) -> np.ndarray:
+        """Return the ids of the ``n`` best rows by their quantized score, best first"""
+        query = np.asarray(query, dtype=EMBEDDING_DTYPE).ravel()
+        with self._lock:
+            if n <= 0 or len(self) == 0:
+                return np.empty(0, dtype=np.int64)
+            # Score every row in place; tombstoned rows are masked afterwards
+            codes = self._codes[:self._size]
+            if self.scheme == 'int8':
+                query_codes, _ = quantize_int8(query)
+                scores = np.einsum('ij,j->i', codes, query_codes[0], dtype=np.int32) * self._scales[:self._size]
+            else:
+                scores = -hamming_distances(codes, quantize_binary(query)[0]).astype(np.float32)
+            scores[~self._alive[:self._size]] = -np.inf
+            ids = self._ids[:self._size].copy()
+
+        n = min(n, len(self))
+        top = np.argpartition(-scores, n - 1)[:n]
+        return ids[top[np.argsort(-scores[top], kind='stable')]]
@@ -0,0 +1,96 @@
+
+"""
+Vectorized Relevance Ranking for the LexOS Memory System
+Scores search candidates as NumPy arrays and selects the top k before any row is built
+"""
+
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = 86_400_000  # Same decay constant as memory.api.recency_score
+
+# Column layout of a candidate matrix, one row per candidate memory
+TYPE, ID, IMPORTANCE, CREATED_AT_MS, CONFIDENCE, INTENSITY, ACCESS_COUNT = range(7)
+COLUMN_COUNT = 7
+
+# Columns every candidate query must return, in this order
+REQUIRED_COLUMNS = [TYPE, ID, IMPORTANCE, CREATED_AT_MS]
+
+def candidate_matrix(rows: List[tuple], columns: Sequence[int] = REQUIRED_COLUMNS) -> np.ndarray:
+    """Pack fetched candidate tuples into a float64 matrix
+
+    ``columns`` gives the layout column of each value in a row. Columns that
+    were not fetched, and NULLs, become NaN, which the scoring treats as neutral.
+    """
+    matrix = np.full((len(rows), COLUMN_COUNT), np.nan)
+    if rows:
+        matrix[:, list(columns)] = np.array(rows, dtype=np.float64)
+    return matrix
+
+def blended_scores(
+    candidates: np.ndarray,
+    now_ms: int,
+    confidence_weight: float = 0.0,
+    intensity_weight: float = 0.0,
+    access_weight: float = 0.0
+) -> np.ndarray:
+    """Score every candidate in one vectorized pass
+
+    relevance = importance * recency * confidence^wc * intensity^wi
+                * (1 + log(1 + access_count))^wa
+
+    Recency decays with a 24 hour half-life as in ``recency_score``; rows
+    without a timestamp get 0.5. With the default weights the score is
+    importance * recency.
+    """
+    created = candidates[:, CREATED_AT_MS]
+    recency = np.exp((created - now_ms) / DAY_MS)
+    scores = candidates[:, IMPORTANCE] * np.where(np.isnan(created), 0.5, recency)
+
+    if confidence_weight:
+        scores *= np.power(np.nan_to_num(candidates[:, CONFIDENCE], nan=1.0), confidence_weight)
+    if intensity_weight:
+        scores *= np.power(np.nan_to_num(candidates[:, INTENSITY], nan=1.0), intensity_weight)
+    if access_weight:
+        access = np.nan_to_num(candidates[:, ACCESS_COUNT], nan=0.0)
+        scores *= np.power(1.0 + np.log1p(access), access_weight)
+    return scores
+
+def top_k(candidates: np.ndarray, scores: np.ndarray, k: int) -> np.ndarray:
+    """Return the indices of the k best candidates in ranked order
+
+    Order is relevance descending, then id descending, then memory type code.
+    ``argpartition`` finds the k-th best score in linear time; every candidate
+    tied with it is kept so the tie-break is exact, and only that handful is
+    fully sorted.
+    """
+    count = len(scores)
+    if k <= 0 or count == 0:
+        return np.empty(0, dtype=np.intp)
+
+    if k < count:
+        cutoff = scores[np.argpartition(scores, count - k)[count - k]]
+        selected = np.flatnonzero(scores >= cutoff)
+    else:
+        selected = np.arange(count)
+
+    order = np.lexsort((
+        candidates[selected, TYPE],
+        -candidates[selected, ID],
+        -scores[selected]
+    ))
+    return selected[order[:k]]
+
+def rank_candidates(
+    candidates: np.ndarray,
+    k: int,
+    now_ms: int,
+    weights: Optional[Dict[str, float]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Score candidates; returns the ranked indices of the k best and every score"""
+    scores = blended_scores(candidates, now_ms, **(weights or {}))
+    return top_k(candidates, scores, k), scores
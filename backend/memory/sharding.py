@@ -0,0 +1,361 @@
+
+"""
+Per-Agent Database Sharding for the LexOS Memory System
+Routes each agent to its own SQLite file (or a hash bucket) behind the MemoryAPI interface
+"""
+
+import os
+import re
+import shutil
+import sqlite3
+import hashlib
+import inspect
+import logging
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Callable, Iterable
+
+from memory.api import MemoryAPI
+from memory.pool import memory_database_uri
+from memory.timestamps import fill_epoch_columns
+from memory.vectors import vector_index_dir
+from schemas.memory_models import MemoryConfig
+
+logger = logging.getLogger(__name__)
+
+# Tables holding per-agent rows, copied when migrating to shards
+SHARDED_TABLES = [
+    'episodic_memory',
+    'semantic_memory',
+    'procedural_memory',
+    'emotional_memory',
+    'working_memory',
+    'memory_associations',
+    'memory_consolidation',
+    'memory_importance_log'
+]
+
+# Public MemoryAPI methods whose first argument is agent_id
+ROUTED_METHODS = frozenset(
+    name for name, method in inspect.getmembers(MemoryAPI, inspect.isfunction)
+    if not name.startswith('_')
+    and list(inspect.signature(method).parameters)[1:2] == ['agent_id']
+)
+
+class ShardRouter:
+    """Resolves an agent_id to the SQLite file that holds its memories
+
+    With ``buckets`` unset every agent gets its own file; otherwise agents are
+    spread over ``buckets`` files by a stable hash of their id.
+    """
+
+    def __init__(self, shard_dir: str, buckets: Optional[int] = None):
+        self.shard_dir = Path(shard_dir)
+        self.buckets = buckets
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def per_agent(self) -> bool:
+        return not self.buckets
+
+    def shard_for(self, agent_id: str) -> str:
+        """Get the database path for an agent"""
+        digest = hashlib.blake2b(agent_id.encode('utf-8'), digest_size=8).hexdigest()
+
+        if self.per_agent:
+            # The digest keeps ids that sanitize to the same name apart
+            safe_id = re.sub(r'[^A-Za-z0-9_.-]', '_', agent_id)[:64]
+            filename = f"agent_{safe_id}_{digest[:8]}.db"
+        else:
+            filename = f"shard_{int(digest, 16) % self.buckets:04d}.db"
+
+        return str(self.shard_dir / filename)
+
+    def memory_name_for(self, agent_id: str) -> str:
+        """Get the in-memory database name for an ephemeral agent
+
+        Ephemeral agents always get a database of their own, even with hash
+        buckets, so dropping one never touches another agent's rows.
+        """
+        digest = hashlib.blake2b(agent_id.encode('utf-8'), digest_size=8).hexdigest()
+        return str(self.shard_dir.resolve() / f"ephemeral_{digest}")
+
+    def list_shards(self) -> List[str]:
+        """List the shard files that exist on disk"""
+        pattern = "agent_*.db" if self.per_agent else "shard_*.db"
+        return sorted(str(path) for path in self.shard_dir.glob(pattern))
+
+class ShardedMemoryAPI:
+    """MemoryAPI facade that keeps each agent's memories in its own shard
+
+    Methods taking ``agent_id`` are forwarded to the shard's ``MemoryAPI``, so
+    the facade can stand in for a single-file ``MemoryAPI`` in agent-scoped
+    code. Components that work on one database (the consolidator, backups,
+    ``AgentMemoryInterface``) take ``for_agent(agent_id)`` instead and can
+    run per shard in parallel with ``map_shards``.
+
+    Agents listed in ``ephemeral_agents`` keep their memories in an in-memory
+    database instead of a shard file. ``spill_agent`` copies one to disk.
+    """
+
+    def __init__(self, shard_dir: str, buckets: Optional[int] = None, use_write_queue: bool = False,
+                 ephemeral_agents: Optional[Iterable[str]] = None):
+        self.router = ShardRouter(shard_dir, buckets)
+        self.use_write_queue = use_write_queue
+        self.config = MemoryConfig()
+        self.ephemeral_agents = set(ephemeral_agents or ())
+        self._shards: Dict[str, MemoryAPI] = {}
+        self._lock = threading.Lock()
+
+    def for_agent(self, agent_id: str) -> MemoryAPI:
+        """Get the MemoryAPI for an agent's shard, opening it on first use"""
+        if agent_id in self.ephemeral_agents:
+            return self._open_shard(self.router.memory_name_for(agent_id), storage="memory")
+        return self._open_shard(self.router.shard_for(agent_id))
+
+    def _open_shard(self, db_path: str, storage: str = "disk") -> MemoryAPI:
+        """Get or create the MemoryAPI for a shard file or in-memory database"""
+        with self._lock:
+            memory_api = self._shards.get(db_path)
+            if memory_api is None:
+                memory_api = MemoryAPI(db_path, use_write_queue=self.use_write_queue, storage=storage)
+                self._shards[db_path] = memory_api
+                logger.debug(f"Opened {storage} memory shard {db_path}")
+            return memory_api
+
+    def __getattr__(self, name: str):
+        if name not in ROUTED_METHODS:
+            raise AttributeError(f"'{type(self).__name__}' has no attribute '{name}'")
+
+        def routed(*args, **kwargs):
+            agent_id = args[0] if args else kwargs['agent_id']
+            return getattr(self.for_agent(agent_id), name)(*args, **kwargs)
+
+        routed.__name__ = name
+        return routed
+
+    def shards(self) -> List[MemoryAPI]:
+        """Get a MemoryAPI for every shard on disk and every open in-memory shard"""
+        on_disk = [self._open_shard(db_path) for db_path in self.router.list_shards()]
+        with self._lock:
+            in_memory = [api for api in self._shards.values() if api.storage == "memory"]
+        return on_disk + in_memory
+
+    def map_shards(self, operation: Callable[[MemoryAPI], Any],
+                   max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """Run an operation against every shard in parallel, keyed by shard path
+
+        Shards share no locks, so per-shard consolidation, cleanup (including
+        ``VACUUM``) and backups proceed without blocking one another.
+        """
+        shards = self.shards()
+        if not shards:
+            return {}
+
+        workers = max_workers or min(len(shards), self.config.SHARD_PARALLELISM)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="memory-shard") as executor:
+            futures = {
+                memory_api.db_path: executor.submit(operation, memory_api)
+                for memory_api in shards
+            }
+            return {db_path: future.result() for db_path, future in futures.items()}
+
+    def spill_agent(self, agent_id: str) -> int:
+        """Copy an ephemeral agent's memories to its shard on disk
+
+        Row ids are preserved. The agent stops being ephemeral: its in-memory
+        database is closed and later calls go to the disk shard. Returns the
+        number of rows copied.
+        """
+        if agent_id not in self.ephemeral_agents:
+            raise ValueError(f"Agent {agent_id} is not ephemeral")
+
+        memory_api = self.for_agent(agent_id)
+        db_path = self.router.shard_for(agent_id)
+        # Opening the disk shard creates its schema before rows are copied in
+        self._open_shard(db_path)
+        memory_api.flush_access_tracking()
+
+        # Attach from the disk side: a database attached to a memdb connection
+        # would itself be opened in memory
+        conn = sqlite3.connect(
+            Path(db_path).resolve().as_uri(), uri=True,
+            timeout=self.config.CONNECTION_TIMEOUT_SECONDS
+        )
+        try:
+            conn.execute("ATTACH DATABASE ? AS ephemeral", (memory_database_uri(memory_api.db_path),))
+            try:
+                rows = _copy_agent_rows(conn, agent_id, source="ephemeral", target="main")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.execute("DETACH DATABASE ephemeral")
+        finally:
+            conn.close()
+
+        with self._lock:
+            self.ephemeral_agents.discard(agent_id)
+            self._shards.pop(memory_api.db_path, None)
+        memory_api.close()
+
+        logger.info(f"Spilled {rows} rows for ephemeral agent {agent_id} to {db_path}")
+        return rows
+
+    def drop_agent(self, agent_id: str) -> bool:
+        """Delete all of an agent's memories
+
+        In the per-agent layout this closes and removes the shard file and its
+        embedding matrices. With hash buckets the agent's rows and matrix are
+        deleted from its shared bucket. An ephemeral agent's in-memory database
+        is simply closed.
+        """
+        if agent_id in self.ephemeral_agents:
+            with self._lock:
+                memory_api = self._shards.pop(self.router.memory_name_for(agent_id), None)
+            if memory_api:
+                memory_api.close()
+            return memory_api is not None
+
+        db_path = self.router.shard_for(agent_id)
+
+        if not self.router.per_agent:
+            if not os.path.exists(db_path):
+                return False
+            memory_api = self.for_agent(agent_id)
+            with memory_api.get_connection() as conn:
+                for table in SHARDED_TABLES:
+                    conn.execute(f"DELETE FROM {table} WHERE agent_id = ?", (agent_id,))
+            memory_api.invalidate_search_cache(agent_id)
+            memory_api.drop_vector_indexes(agent_id)
+            memory_api.sync_vector_index(agent_id)
+            logger.info(f"Deleted memories for agent {agent_id} from {db_path}")
+            return True
+
+        with self._lock:
+            memory_api = self._shards.pop(db_path, None)
+        if memory_api:
+            memory_api.close()
+
+        existed = os.path.exists(db_path)
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(db_path + suffix)
+            except FileNotFoundError:
+                pass
+        shutil.rmtree(vector_index_dir(db_path, self.config.VECTOR_INDEX_DIR), ignore_errors=True)
+
+        if existed:
+            logger.info(f"Dropped memory shard for agent {agent_id}: {db_path}")
+        return existed
+
+    def get_shard_stats(self) -> Dict[str, Any]:
+        """Get the shard layout and per-shard file sizes"""
+        shard_paths = self.router.list_shards()
+        return {
+            'layout': 'per_agent' if self.router.per_agent else 'hash_buckets',
+            'buckets': self.router.buckets,
+            'shard_count': len(shard_paths),
+            'open_shards': len(self._shards),
+            'ephemeral_agents': len(self.ephemeral_agents),
+            'shard_sizes': {path: os.path.getsize(path) for path in shard_paths}
+        }
+
+    def close(self):
+        """Close every open shard"""
+        with self._lock:
+            shards, self._shards = list(self._shards.values()), {}
+        for memory_api in shards:
+            memory_api.close()
+
+def _copy_agent_rows(conn: sqlite3.Connection, agent_id: str, source: str, target: str,
+                     tables: Optional[List[str]] = None) -> int:
+    """Copy an agent's rows between two attached schemas, preserving row ids"""
+    rows = 0
+    unstamped = []
+    for table in tables or SHARDED_TABLES:
+        # Copy the columns both schemas have, whatever their order
+        target_columns = [row[1] for row in conn.execute(f"PRAGMA {target}.table_info({table})")]
+        source_columns = {row[1] for row in conn.execute(f"PRAGMA {source}.table_info({table})")}
+        columns = ', '.join(c for c in target_columns if c in source_columns)
+        if any(c.endswith('_ms') and c not in source_columns for c in target_columns):
+            unstamped.append(table)
+
+        cursor = conn.execute(f"""
+            INSERT OR REPLACE INTO {target}.{table} ({columns})
+            SELECT {columns} FROM {source}.{table} WHERE agent_id = ?
+        """, (agent_id,))
+        rows += cursor.rowcount
+
+    # Sources older than the *_ms columns leave them to be derived from the DATETIME text
+    if unstamped:
+        fill_epoch_columns(conn, unstamped, schema=target)
+    return rows
+
+def migrate_to_shards(source_db: str, shard_dir: str, buckets: Optional[int] = None) -> Dict[str, int]:
+    """Copy every agent's memories from a single-file database into shards
+
+    Row ids are preserved, so associations and consolidation records stay
+    valid. The source database is only read. Returns rows copied per agent.
+    """
+    sharded = ShardedMemoryAPI(shard_dir, buckets)
+    source_path = str(Path(source_db).resolve())
+    source_uri = Path(source_path).as_uri() + "?mode=ro"
+    copied: Dict[str, int] = {}
+
+    try:
+        source = sqlite3.connect(source_uri, uri=True)
+        try:
+            present = {
+                row[0] for row in source.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'"
+                )
+            }
+            tables = [table for table in SHARDED_TABLES if table in present]
+            agent_ids = sorted({
+                row[0]
+                for table in tables
+                for row in source.execute(f"SELECT DISTINCT agent_id FROM {table}")
+            })
+        finally:
+            source.close()
+
+        for agent_id in agent_ids:
+            memory_api = sharded.for_agent(agent_id)
+
+            with memory_api.get_connection() as conn:
+                conn.execute("ATTACH DATABASE ? AS source", (source_path,))
+                try:
+                    rows = _copy_agent_rows(conn, agent_id, source="source", target="main", tables=tables)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    conn.execute("DETACH DATABASE source")
+
+            copied[agent_id] = rows
+            logger.info(f"Migrated {rows} rows for agent {agent_id} to {memory_api.db_path}")
+    finally:
+        sharded.close()
+
+    return copied
+
+def main():
+    """Command line entry point for migrating a single-file database to shards"""
+    parser = argparse.ArgumentParser(description="Split a LexOS memory database into per-agent shards")
+    parser.add_argument("source_db", help="Existing single-file memory database")
+    parser.add_argument("shard_dir", help="Directory to write shard files into")
+    parser.add_argument("--buckets", type=int, default=None,
+                        help="Number of hash buckets (default: one file per agent)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    copied = migrate_to_shards(args.source_db, args.shard_dir, args.buckets)
+    print(f"Migrated {len(copied)} agents ({sum(copied.values())} rows) into {args.shard_dir}")
+
+if __name__ == "__main__":
+    main()
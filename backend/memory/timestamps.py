@@ -0,0 +1,88 @@
+
+"""
+Timestamps for the LexOS Memory System
+DATETIME text and epoch-millisecond copies written together by each statement
+"""
+
+import logging
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+
+# DATETIME columns with an integer epoch-millisecond *_ms copy, per table
+EPOCH_COLUMNS = {
+    'episodic_memory': ('created_at', 'accessed_at'),
+    'semantic_memory': ('created_at', 'updated_at', 'accessed_at'),
+    'procedural_memory': ('created_at', 'updated_at', 'accessed_at', 'last_used'),
+    'emotional_memory': ('created_at', 'accessed_at'),
+    'working_memory': ('created_at', 'expires_at'),
+    'memory_associations': ('created_at', 'last_reinforced')
+}
+
+# Columns a new row takes from the moment it is inserted (the rest start NULL)
+INSERT_STAMPED = {
+    'episodic_memory': ('created_at', 'accessed_at'),
+    'semantic_memory': ('created_at', 'updated_at', 'accessed_at'),
+    'procedural_memory': ('created_at', 'updated_at', 'accessed_at'),
+    'emotional_memory': ('created_at', 'accessed_at'),
+    'working_memory': ('created_at',),
+    'memory_associations': ('created_at', 'last_reinforced')
+}
+
+def epoch_ms(moment: Optional[datetime] = None) -> int:
+    """Convert a UTC datetime (default: now) to the epoch milliseconds stored in *_ms columns"""
+    moment = moment or datetime.utcnow()
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return (moment - _EPOCH) // timedelta(milliseconds=1)
+
+def sql_timestamp(moment: Optional[datetime] = None) -> Tuple[str, int]:
+    """A UTC moment (default: now) as CURRENT_TIMESTAMP-style text and its epoch milliseconds"""
+    moment = (moment or datetime.utcnow()).replace(microsecond=0)
+    return moment.strftime('%Y-%m-%d %H:%M:%S'), epoch_ms(moment)
+
+def insert_stamps(table: str, moment: Optional[datetime] = None) -> Tuple[str, str, tuple]:
+    """Column list, placeholders and values stamping a new row with its write time
+
+    Every column in ``INSERT_STAMPED[table]`` is written with its *_ms copy.
+    """
+    columns = INSERT_STAMPED[table]
+    stamp = sql_timestamp(moment)
+    return (
+        ", ".join(f"{column}, {column}_ms" for column in columns),
+        ", ".join("?, ?" for _ in columns),
+        stamp * len(columns)
+    )
+
+def set_stamps(columns: Sequence[str], moment: Optional[datetime] = None) -> Tuple[str, tuple]:
+    """SET assignments and values moving DATETIME columns and their *_ms copies to a write time"""
+    stamp = sql_timestamp(moment)
+    return (
+        ", ".join(f"{column} = ?, {column}_ms = ?" for column in columns),
+        stamp * len(columns)
+    )
+
+def fill_epoch_columns(conn: sqlite3.Connection, tables: Optional[Sequence[str]] = None,
+                       schema: str = "main") -> Dict[str, int]:
+    """Derive missing *_ms values from their DATETIME columns, e.g. after copying old rows
+
+    Returns the number of rows filled per table.
+    """
+    filled = {}
+    for table in tables or EPOCH_COLUMNS:
+        columns = EPOCH_COLUMNS.get(table)
+        if not columns:
+            continue
+        assignments = ", ".join(
+            f"{column}_ms = COALESCE({column}_ms, "
+            f"CAST(ROUND((julianday({column}) - 2440587.5) * 86400000) AS INTEGER))"
+            for column in columns
+        )
+        missing = " OR ".join(f"({column}_ms IS NULL AND {column} IS NOT NULL)" for column in columns)
+        cursor = conn.execute(f"UPDATE {schema}.{table} SET {assignments} WHERE {missing}")
+        filled[table] = cursor.rowcount
+    return filled
@@ -0,0 +1,80 @@
+
+"""
+Stage Timings for the LexOS Memory System
+Running per-stage latency statistics and latency budget counters for searches
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+class StageTimings:
+    """Per-stage latency counters
+
+    Each stage keeps a call count, total, maximum and most recent duration, so
+    ``get_stats`` shows which stage of a search dominates its latency.
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        """Add one measured duration to a stage"""
+        ms = seconds * 1000.0
+        with self._lock:
+            stats = self._stages.setdefault(stage, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_ms': 0.0})
+            stats['count'] += 1
+            stats['total_ms'] += ms
+            stats['max_ms'] = max(stats['max_ms'], ms)
+            stats['last_ms'] = ms
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block as one run of ``stage``"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get count, mean, max and last duration (ms) per stage"""
+        with self._lock:
+            return {
+                stage: {
+                    **stats,
+                    'mean_ms': stats['total_ms'] / stats['count'] if stats['count'] else 0.0
+                }
+                for stage, stats in self._stages.items()
+            }
+
+    def reset(self):
+        """Clear all stage statistics"""
+        with self._lock:
+            self._stages.clear()
+
+class BudgetStats:
+    """Per-agent counts of latency-budgeted searches and of budgets exhausted"""
+
+    def __init__(self):
+        self._agents: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, agent_id: str, exhausted: bool):
+        """Count one budgeted search, and whether it ran out of budget"""
+        with self._lock:
+            stats = self._agents.setdefault(agent_id, {'searches': 0, 'budget_hits': 0})
+            stats['searches'] += 1
+            stats['budget_hits'] += int(exhausted)
+
+    def get_stats(self, agent_id: str) -> Dict[str, Any]:
+        """Get an agent's budgeted search count, budget hits and hit rate"""
+        with self._lock:
+            stats = dict(self._agents.get(agent_id, {'searches': 0, 'budget_hits': 0}))
+        stats['hit_rate'] = stats['budget_hits'] / stats['searches'] if stats['searches'] else 0.0
+        return stats
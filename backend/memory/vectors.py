@@ -0,0 +1,336 @@
+
+"""
+Memory-Mapped Embedding Matrices for the LexOS Memory System
+Per-agent float32 embedding files with an id map, searched by one matrix-vector product
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Iterable
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: matrices are shared by one process only
+    fcntl = None
+
+from memory.embeddings import EMBEDDING_DTYPE
+
+logger = logging.getLogger(__name__)
+
+# Id map rows: (memory type code, memory id)
+ID_DTYPE = np.dtype('<i8')
+
+def agent_file_stem(agent_id: str) -> str:
+    """File name stem for an agent's index files, safe for any agent id"""
+    return f"agent_{hashlib.blake2b(agent_id.encode('utf-8'), digest_size=8).hexdigest()}"
+
+def vector_index_dir(db_path: str, root: Optional[str] = None) -> Path:
+    """Directory for a database's embedding matrices: ``<name>.vectors`` beside it or under ``root``"""
+    directory = Path(db_path).with_suffix('.vectors')
+    return Path(root) / directory.name if root else directory
+
+class _AgentMatrix:
+    """One agent's embedding matrix file, id map file and in-process view of them
+
+    Processes sharing the files take an exclusive ``flock`` on a sibling
+    ``.lock`` file to append, overwrite, compact or reload them, and reload
+    their view whenever the files' inode, size or mtime differ from what they
+    last saw, so ``count`` and ``max_ids`` never lag another process's writes.
+    """
+
+    def __init__(self, base: Path, dimension: int):
+        self.vectors_path = base.with_suffix('.f32')
+        self.ids_path = base.with_suffix('.ids')
+        self.meta_path = base.with_suffix('.json')
+        self.lock_path = base.with_suffix('.lock')
+        self.dimension = dimension
+        self.count = 0
+        self.max_ids: Dict[int, int] = {}
+        self._matrix: Optional[np.memmap] = None
+        self._keys: Optional[np.ndarray] = None
+        self._seen: Optional[tuple] = None
+        with self.locked():
+            pass
+
+    def _signature(self) -> tuple:
+        """(inode, size, mtime) of each file, to notice writes by other processes"""
+        signature = []
+        for path in (self.vectors_path, self.ids_path, self.meta_path):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                signature.append(None)
+            else:
+                signature.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+        return tuple(signature)
+
+    @contextmanager
+    def locked(self):
+        """Hold the cross-process file lock over a fresh view of the files"""
+        with open(self.lock_path, 'a+b') as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                if self._signature() != self._seen:
+                    self._invalidate()
+                    self._load()
+                yield self
+            finally:
+                self._seen = self._signature()
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def refresh(self):
+        """Reload the view if another process has changed the files since it was read"""
+        if self._signature() != self._seen:
+            with self.locked():
+                pass
+
+    def _load(self):
+        """Open existing files, discarding a partial trailing append or a dimension change (file lock held)"""
+        try:
+            meta = json.loads(self.meta_path.read_text())
+        except (FileNotFoundError, ValueError):
+            meta = None
+        if not meta or meta.get('dimension') != self.dimension:
+            self._reset()
+            return
+
+        row_bytes = self.dimension * EMBEDDING_DTYPE.itemsize
+        vector_rows = self.vectors_path.stat().st_size // row_bytes if self.vectors_path.exists() else 0
+        id_rows = self.ids_path.stat().st_size // (2 * ID_DTYPE.itemsize) if self.ids_path.exists() else 0
+        self.count = min(vector_rows, id_rows)
+        # Vectors are written before ids, so the id map bounds the valid rows
+        for path, size in ((self.vectors_path, row_bytes), (self.ids_path, 2 * ID_DTYPE.itemsize)):
+            if path.exists() and path.stat().st_size != self.count * size:
+                os.truncate(path, self.count * size)
+
+        keys = self.keys()
+        self.max_ids = {
+            int(code): int(keys[keys[:, 0] == code, 1].max())
+            for code in np.unique(keys[:, 0])
+        }
+
+    def _reset(self):
+        """Start empty files for this agent (file lock held)"""
+        self.vectors_path.write_bytes(b"")
+        self.ids_path.write_bytes(b"")
+        self.meta_path.write_text(json.dumps({'dimension': self.dimension}))
+        self.count = 0
+        self.max_ids = {}
+        self._invalidate()
+
+    def _invalidate(self):
+        self._matrix = None
+        self._keys = None
+
+    def matrix(self) -> np.ndarray:
+        """Memory-mapped (count, dimension) view of the vectors"""
+        if self._matrix is None:
+            if self.count == 0:
+                return np.empty((0, self.dimension), dtype=EMBEDDING_DTYPE)
+            self._matrix = np.memmap(self.vectors_path, dtype=EMBEDDING_DTYPE, mode='r',
+                                     shape=(self.count, self.dimension))
+        return self._matrix
+
+    def keys(self) -> np.ndarray:
+        """(count, 2) id map of (type code, memory id) per matrix row"""
+        if self._keys is None:
+            if self.count == 0:
+                return np.empty((0, 2), dtype=ID_DTYPE)
+            self._keys = np.memmap(self.ids_path, dtype=ID_DTYPE, mode='r', shape=(self.count, 2))
+        return self._keys
+
+    def upsert(self, code: int, ids: np.ndarray, vectors: np.ndarray) -> int:
+        """Overwrite rows already in the matrix and append the rest; returns rows appended (file lock held)"""
+        vectors = np.ascontiguousarray(vectors, dtype=EMBEDDING_DTYPE)
+        # Ids are AUTOINCREMENT, so anything above the largest indexed id is new
+        fresh = ids > self.max_ids.get(code, 0)
+        if not fresh.all():
+            keys = self.keys()
+            rows = np.flatnonzero(keys[:, 0] == code)
+            positions = dict(zip(keys[rows, 1].tolist(), rows.tolist()))
+            row_bytes = self.dimension * EMBEDDING_DTYPE.itemsize
+            with open(self.vectors_path, 'r+b') as f:
+                for index in np.flatnonzero(~fresh):
+                    row = positions.get(int(ids[index]))
+                    if row is None:
+                        fresh[index] = True
+                    else:
+                        f.seek(row * row_bytes)
+                        f.write(vectors[index].tobytes())
+
+        if fresh.any():
+            with open(self.vectors_path, 'ab') as f:
+                f.write(vectors[fresh].tobytes())
+            keys = np.column_stack([np.full(int(fresh.sum()), code), ids[fresh]]).astype(ID_DTYPE)
+            with open(self.ids_path, 'ab') as f:
+                f.write(keys.tobytes())
+            self.count += len(keys)
+            self.max_ids[code] = max(self.max_ids.get(code, 0), int(ids[fresh].max()))
+            self._invalidate()
+        return int(fresh.sum())
+
+    def compact(self, keep: np.ndarray) -> int:
+        """Rewrite both files with only the rows in the ``keep`` mask; returns rows removed (file lock held)"""
+        removed = int(self.count - keep.sum())
+        if removed == 0:
+            return 0
+
+        matrix, keys = self.matrix(), self.keys()
+        rows = np.flatnonzero(keep)
+        vectors_tmp = self.vectors_path.with_suffix('.f32.tmp')
+        ids_tmp = self.ids_path.with_suffix('.ids.tmp')
+        with open(vectors_tmp, 'wb') as f:
+            for start in range(0, len(rows), 65536):
+                f.write(np.asarray(matrix[rows[start:start + 65536]]).tobytes())
+        with open(ids_tmp, 'wb') as f:
+            f.write(np.asarray(keys[rows]).tobytes())
+
+        self._invalidate()
+        os.replace(vectors_tmp, self.vectors_path)
+        os.replace(ids_tmp, self.ids_path)
+        self._load()
+        return removed
+
+class VectorIndex:
+    """Contiguous per-agent embedding matrices on disk, opened with ``np.memmap``
+
+    Each agent has a float32 matrix file with one row per memory and an id map
+    of (memory type code, memory id) rows. New memories are appended to both
+    files; an updated memory overwrites its row in place; ``retain`` rewrites
+    the files without rows whose memories are gone. Writers in any process
+    serialize on the agent's file lock, and every call first picks up changes
+    other processes have made. Search is exact cosine
+    similarity: one matrix-vector product over the mapped file and an
+    ``argpartition`` for the top k, so the vectors never become Python objects.
+    """
+
+    def __init__(self, directory: str, dimension: int):
+        self.directory = Path(directory)
+        self.dimension = dimension
+        self._agents: Dict[str, _AgentMatrix] = {}
+        self._lock = threading.RLock()
+
+    def _base_path(self, agent_id: str) -> Path:
+        return self.directory / agent_file_stem(agent_id)
+
+    def _agent(self, agent_id: str) -> _AgentMatrix:
+        agent = self._agents.get(agent_id)
+        if agent is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            agent = _AgentMatrix(self._base_path(agent_id), self.dimension)
+            self._agents[agent_id] = agent
+        else:
+            agent.refresh()
+        return agent
+
+    def is_loaded(self, agent_id: str) -> bool:
+        """Whether this process has opened the agent's matrix yet"""
+        return agent_id in self._agents
+
+    def count(self, agent_id: str) -> int:
+        """Number of vectors indexed for an agent"""
+        with self._lock:
+            return self._agent(agent_id).count
+
+    def upsert(self, agent_id: str, code: int, ids: Iterable[int], vectors: np.ndarray) -> int:
+        """Add or replace vectors for memories of one type; returns rows appended"""
+        ids = np.asarray(list(ids), dtype=ID_DTYPE)
+        if len(ids) == 0:
+            return 0
+        with self._lock:
+            with self._agent(agent_id).locked() as agent:
+                return agent.upsert(code, ids, vectors.reshape(len(ids), self.dimension))
+
+    def indexed_ids(self, agent_id: str, code: int) -> np.ndarray:
+        """Ids of one memory type currently in an agent's matrix"""
+        with self._lock:
+            keys = self._agent(agent_id).keys()
+            return np.array(keys[keys[:, 0] == code, 1])
+
+    def retain(
+        self,
+        agent_id: str,
+        live: Dict[int, np.ndarray],
+        horizons: Optional[Dict[int, int]] = None
+    ) -> int:
+        """Compact an agent's matrix to the memories still live; returns rows removed
+
+        ``live`` maps type codes to the ids that exist. Rows with an id above
+        the type's horizon (the largest id handed out when ``live`` was read)
+        were written since and are kept.
+        """
+        horizons = horizons or {}
+        with self._lock, self._agent(agent_id).locked() as agent:
+            keys = agent.keys()
+            keep = np.zeros(agent.count, dtype=bool)
+            for code, ids in live.items():
+                rows = keys[:, 0] == code
+                keep[rows] = np.isin(keys[rows, 1], ids)
+                if code in horizons:
+                    keep[rows] |= keys[rows, 1] > horizons[code]
+            removed = agent.compact(keep)
+        if removed:
+            logger.info(f"Compacted embedding matrix for agent {agent_id}: {removed} rows removed")
+        return removed
+
+    def search(
+        self,
+        agent_id: str,
+        query: np.ndarray,
+        k: int,
+        codes: Optional[List[int]] = None
+    ) -> List[Tuple[int, int, float]]:
+        """Return the k most similar (type code, memory id, cosine similarity) triples"""
+        with self._lock:
+            agent = self._agent(agent_id)
+            matrix, keys = agent.matrix(), agent.keys()
+        if len(matrix) == 0 or k <= 0:
+            return []
+
+        query = np.asarray(query, dtype=EMBEDDING_DTYPE).ravel()
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = matrix @ query
+
+        if codes is not None:
+            scores = np.where(np.isin(keys[:, 0], codes), scores, -np.inf)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [
+            (int(keys[row, 0]), int(keys[row, 1]), float(scores[row]))
+            for row in top if np.isfinite(scores[row])
+        ]
+
+    def drop(self, agent_id: str):
+        """Delete an agent's matrix files, with any other index files under its name"""
+        with self._lock:
+            agent = self._agents.pop(agent_id, None)
+            if agent is not None:
+                agent._invalidate()
+            # The matrix files and any other index files kept for the agent
+            for path in self.directory.glob(f"{agent_file_stem(agent_id)}.*"):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def close(self, remove: bool = False):
+        """Release mapped files, deleting the directory with ``remove``"""
+        with self._lock:
+            for agent in self._agents.values():
+                agent._invalidate()
+            self._agents.clear()
+        if remove:
+            shutil.rmtree(self.directory, ignore_errors=True)
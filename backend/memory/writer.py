@@ -0,0 +1,178 @@
+
+"""
+Group-Commit Write Queue for the LexOS Memory System
+Funnels memory writes from many threads through a single writer thread
+"""
+
+import queue
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Any, Callable, Tuple
+
+from memory.pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class WriteQueue:
+    """Single-writer thread that coalesces queued writes into shared transactions
+
+    Callers submit a callable and receive a ``Future``. The writer collects
+    operations until ``batch_size`` are waiting or ``flush_interval_ms`` has
+    elapsed since the first one arrived, runs them inside one transaction (each
+    isolated by a savepoint so a failing operation does not abort its
+    neighbours) and resolves every future only after the commit succeeds.
+    """
+
+    def __init__(self, pool: ConnectionPool, batch_size: int = 64, flush_interval_ms: float = 5.0):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'operations': 0,
+            'failed_operations': 0,
+            'batches': 0,
+            'largest_batch': 0,
+            'failed_commits': 0
+        }
+
+    def start(self):
+        """Start the writer thread"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._thread = threading.Thread(
+            target=self._writer_loop,
+            name="memory-writer",
+            daemon=True
+        )
+        self._thread.start()
+        logger.info("Memory write queue started")
+
+    def stop(self, timeout: float = 5.0):
+        """Flush pending writes and stop the writer thread"""
+        if not self._thread:
+            return
+
+        self._queue.put(_STOP)
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        logger.info("Memory write queue stopped")
+
+    def is_running(self) -> bool:
+        """Check whether the writer thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def owns_current_thread(self) -> bool:
+        """Check whether the caller is the writer thread itself"""
+        return self._thread is threading.current_thread()
+
+    def submit(self, operation: Callable[..., Any], *args, **kwargs) -> Future:
+        """Queue a write operation and return a future for its result"""
+        if not self.is_running():
+            raise RuntimeError("Memory write queue is not running")
+
+        future: Future = Future()
+        self._queue.put((future, operation, args, kwargs))
+        return future
+
+    def _writer_loop(self):
+        """Collect operations into batches and commit them"""
+        stopping = False
+
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._commit_batch(batch)
+
+        # Drain anything submitted before stop() was called
+        pending = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                pending.append(item)
+        if pending:
+            self._commit_batch(pending)
+
+    def _commit_batch(self, batch: List[Tuple[Future, Callable, tuple, dict]]):
+        """Run a batch of operations in one transaction"""
+        results = []
+
+        try:
+            with self.pool.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+
+                for future, operation, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+
+                    conn.execute("SAVEPOINT queued_write")
+                    mark = self.pool.after_commit_mark()
+                    try:
+                        result = operation(*args, **kwargs)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO queued_write")
+                        conn.execute("RELEASE queued_write")
+                        self.pool.discard_after_commit(mark)
+                        future.set_exception(e)
+                        with self._stats_lock:
+                            self._stats['failed_operations'] += 1
+                        continue
+
+                    conn.execute("RELEASE queued_write")
+                    results.append((future, result))
+
+        except Exception as e:
+            logger.error(f"Failed to commit batch of {len(batch)} memory writes: {e}")
+            with self._stats_lock:
+                self._stats['failed_commits'] += 1
+            for future, _, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future, result in results:
+            future.set_result(result)
+
+        with self._stats_lock:
+            self._stats['batches'] += 1
+            self._stats['operations'] += len(batch)
+            self._stats['largest_batch'] = max(self._stats['largest_batch'], len(batch))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get write queue statistics"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['pending'] = self._queue.qsize()
+        stats['running'] = self.is_running()
+        stats['avg_batch_size'] = (
+            stats['operations'] / stats['batches'] if stats['batches'] else 0.0
+        )
+        return stats
@@ -0,0 +1,45 @@
+
+-- Composite Index Migration
+-- Replaces single-column agent_id indexes with composite indexes that match the
+-- filter and sort shape of the hot memory queries, so SQLite can seek on
+-- agent_id and read rows already in ORDER BY order instead of sorting them
+
+-- Episodic memory: retrieval/search order, temporal lookups, session pairing, decay
+CREATE INDEX IF NOT EXISTS idx_episodic_agent_importance ON episodic_memory(agent_id, importance DESC, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_episodic_agent_created ON episodic_memory(agent_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_episodic_agent_session ON episodic_memory(agent_id, session_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_episodic_agent_accessed ON episodic_memory(agent_id, accessed_at);
+
+-- Semantic memory: concept lookups and retrieval/search order
+CREATE INDEX IF NOT EXISTS idx_semantic_agent_concept ON semantic_memory(agent_id, concept);
+CREATE INDEX IF NOT EXISTS idx_semantic_agent_importance ON semantic_memory(agent_id, importance DESC, confidence DESC);
+
+-- Procedural memory: skill lookups and search order
+CREATE INDEX IF NOT EXISTS idx_procedural_agent_skill ON procedural_memory(agent_id, skill_name);
+CREATE INDEX IF NOT EXISTS idx_procedural_agent_proficiency ON procedural_memory(agent_id, proficiency_level DESC, usage_frequency DESC);
+
+-- Emotional memory: pattern retrieval with and without an emotion filter
+CREATE INDEX IF NOT EXISTS idx_emotional_agent_intensity ON emotional_memory(agent_id, intensity DESC, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_emotional_agent_type ON emotional_memory(agent_id, emotion_type, intensity DESC);
+
+-- Working memory: capacity checks and expiry cleanup per session
+CREATE INDEX IF NOT EXISTS idx_working_agent_session_expires ON working_memory(agent_id, session_id, expires_at);
+
+-- Associations: exact pair lookups and both sides of find_associated_memories
+CREATE INDEX IF NOT EXISTS idx_associations_agent_memory1 ON memory_associations(agent_id, memory1_id, memory1_type, memory2_id, memory2_type);
+CREATE INDEX IF NOT EXISTS idx_associations_agent_memory2 ON memory_associations(agent_id, memory2_id, memory2_type);
+
+-- Consolidation history per agent
+CREATE INDEX IF NOT EXISTS idx_consolidation_agent_started ON memory_consolidation(agent_id, started_at DESC);
+
+-- Superseded by the composite indexes above
+DROP INDEX IF EXISTS idx_episodic_agent_id;
+DROP INDEX IF EXISTS idx_semantic_agent_id;
+DROP INDEX IF EXISTS idx_procedural_agent_id;
+DROP INDEX IF EXISTS idx_emotional_agent_id;
+DROP INDEX IF EXISTS idx_working_agent_session;
+DROP INDEX IF EXISTS idx_associations_agent_id;
+DROP INDEX IF EXISTS idx_consolidation_agent_id;
+
+-- Give the planner statistics for the new indexes
+ANALYZE;
@@ -0,0 +1,12 @@
+
+-- Plan Regression Index Migration
+-- Fixes the temp B-tree sorts reported by tests/test_query_plans.py
+
+-- Emotion-filtered pattern retrieval orders by intensity, then recency
+DROP INDEX IF EXISTS idx_emotional_agent_type;
+CREATE INDEX IF NOT EXISTS idx_emotional_agent_type ON emotional_memory(agent_id, emotion_type, intensity DESC, created_at DESC);
+
+-- Latest completed consolidation per agent (memory statistics)
+CREATE INDEX IF NOT EXISTS idx_consolidation_agent_status ON memory_consolidation(agent_id, status, completed_at DESC);
+
+ANALYZE;
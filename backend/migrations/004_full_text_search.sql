@@ -0,0 +1,95 @@
+
+-- Full-Text Search Migration
+-- FTS5 indexes over the columns search_memories matches, kept in sync by triggers
+
+-- Episodic memory: content, summary, event_type
+CREATE VIRTUAL TABLE IF NOT EXISTS episodic_memory_fts USING fts5(
+    content, summary, event_type,
+    content='episodic_memory', content_rowid='id', tokenize='unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS episodic_memory_fts_insert AFTER INSERT ON episodic_memory BEGIN
+    INSERT INTO episodic_memory_fts(rowid, content, summary, event_type) VALUES (new.id, new.content, new.summary, new.event_type);
+END;
+
+CREATE TRIGGER IF NOT EXISTS episodic_memory_fts_delete AFTER DELETE ON episodic_memory BEGIN
+    INSERT INTO episodic_memory_fts(episodic_memory_fts, rowid, content, summary, event_type) VALUES ('delete', old.id, old.content, old.summary, old.event_type);
+END;
+
+-- Only text edits touch the index; access tracking updates do not
+CREATE TRIGGER IF NOT EXISTS episodic_memory_fts_update AFTER UPDATE OF content, summary, event_type ON episodic_memory BEGIN
+    INSERT INTO episodic_memory_fts(episodic_memory_fts, rowid, content, summary, event_type) VALUES ('delete', old.id, old.content, old.summary, old.event_type);
+    INSERT INTO episodic_memory_fts(rowid, content, summary, event_type) VALUES (new.id, new.content, new.summary, new.event_type);
+END;
+
+-- Index rows written before this migration
+INSERT INTO episodic_memory_fts(episodic_memory_fts) VALUES ('rebuild');
+
+-- Semantic memory: concept, definition, category
+CREATE VIRTUAL TABLE IF NOT EXISTS semantic_memory_fts USING fts5(
+    concept, definition, category,
+    content='semantic_memory', content_rowid='id', tokenize='unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS semantic_memory_fts_insert AFTER INSERT ON semantic_memory BEGIN
+    INSERT INTO semantic_memory_fts(rowid, concept, definition, category) VALUES (new.id, new.concept, new.definition, new.category);
+END;
+
+CREATE TRIGGER IF NOT EXISTS semantic_memory_fts_delete AFTER DELETE ON semantic_memory BEGIN
+    INSERT INTO semantic_memory_fts(semantic_memory_fts, rowid, concept, definition, category) VALUES ('delete', old.id, old.concept, old.definition, old.category);
+END;
+
+-- Only text edits touch the index; access tracking updates do not
+CREATE TRIGGER IF NOT EXISTS semantic_memory_fts_update AFTER UPDATE OF concept, definition, category ON semantic_memory BEGIN
+    INSERT INTO semantic_memory_fts(semantic_memory_fts, rowid, concept, definition, category) VALUES ('delete', old.id, old.concept, old.definition, old.category);
+    INSERT INTO semantic_memory_fts(rowid, concept, definition, category) VALUES (new.id, new.concept, new.definition, new.category);
+END;
+
+-- Index rows written before this migration
+INSERT INTO semantic_memory_fts(semantic_memory_fts) VALUES ('rebuild');
+
+-- Procedural memory: skill_name, skill_type, procedure_steps
+CREATE VIRTUAL TABLE IF NOT EXISTS procedural_memory_fts USING fts5(
+    skill_name, skill_type, procedure_steps,
+    content='procedural_memory', content_rowid='id', tokenize='unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS procedural_memory_fts_insert AFTER INSERT ON procedural_memory BEGIN
+    INSERT INTO procedural_memory_fts(rowid, skill_name, skill_type, procedure_steps) VALUES (new.id, new.skill_name, new.skill_type, new.procedure_steps);
+END;
+
+CREATE TRIGGER IF NOT EXISTS procedural_memory_fts_delete AFTER DELETE ON procedural_memory BEGIN
+    INSERT INTO procedural_memory_fts(procedural_memory_fts, rowid, skill_name, skill_type, procedure_steps) VALUES ('delete', old.id, old.skill_name, old.skill_type, old.procedure_steps);
+END;
+
+-- Only text edits touch the index; access tracking updates do not
+CREATE TRIGGER IF NOT EXISTS procedural_memory_fts_update AFTER UPDATE OF skill_name, skill_type, procedure_steps ON procedural_memory BEGIN
+    INSERT INTO procedural_memory_fts(procedural_memory_fts, rowid, skill_name, skill_type, procedure_steps) VALUES ('delete', old.id, old.skill_name, old.skill_type, old.procedure_steps);
+    INSERT INTO procedural_memory_fts(rowid, skill_name, skill_type, procedure_steps) VALUES (new.id, new.skill_name, new.skill_type, new.procedure_steps);
+END;
+
+-- Index rows written before this migration
+INSERT INTO procedural_memory_fts(procedural_memory_fts) VALUES ('rebuild');
+
+-- Emotional memory: trigger_stimulus, emotion_type, context
+CREATE VIRTUAL TABLE IF NOT EXISTS emotional_memory_fts USING fts5(
+    trigger_stimulus, emotion_type, context,
+    content='emotional_memory', content_rowid='id', tokenize='unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS emotional_memory_fts_insert AFTER INSERT ON emotional_memory BEGIN
+    INSERT INTO emotional_memory_fts(rowid, trigger_stimulus, emotion_type, context) VALUES (new.id, new.trigger_stimulus, new.emotion_type, new.context);
+END;
+
+CREATE TRIGGER IF NOT EXISTS emotional_memory_fts_delete AFTER DELETE ON emotional_memory BEGIN
+    INSERT INTO emotional_memory_fts(emotional_memory_fts, rowid, trigger_stimulus, emotion_type, context) VALUES ('delete', old.id, old.trigger_stimulus, old.emotion_type, old.context);
+END;
+
+-- Only text edits touch the index; access tracking updates do not
+CREATE TRIGGER IF NOT EXISTS emotional_memory_fts_update AFTER UPDATE OF trigger_stimulus, emotion_type, context ON emotional_memory BEGIN
+    INSERT INTO emotional_memory_fts(emotional_memory_fts, rowid, trigger_stimulus, emotion_type, context) VALUES ('delete', old.id, old.trigger_stimulus, old.emotion_type, old.context);
+    INSERT INTO emotional_memory_fts(rowid, trigger_stimulus, emotion_type, context) VALUES (new.id, new.trigger_stimulus, new.emotion_type, new.context);
+END;
+
+-- Index rows written before this migration
+INSERT INTO emotional_memory_fts(emotional_memory_fts) VALUES ('rebuild');
@@ -0,0 +1,71 @@
+
+-- Epoch Timestamp Migration
+-- Integer epoch-millisecond copies of the DATETIME columns, written alongside them by each
+-- INSERT/UPDATE (memory/timestamps.py), so time windows are index range scans and recency
+-- is integer arithmetic
+
+-- Columns
+ALTER TABLE episodic_memory ADD COLUMN created_at_ms INTEGER;
+ALTER TABLE episodic_memory ADD COLUMN accessed_at_ms INTEGER;
+ALTER TABLE semantic_memory ADD COLUMN created_at_ms INTEGER;
+ALTER TABLE semantic_memory ADD COLUMN updated_at_ms INTEGER;
+ALTER TABLE semantic_memory ADD COLUMN accessed_at_ms INTEGER;
+ALTER TABLE procedural_memory ADD COLUMN created_at_ms INTEGER;
+ALTER TABLE procedural_memory ADD COLUMN updated_at_ms INTEGER;
+ALTER TABLE procedural_memory ADD COLUMN accessed_at_ms INTEGER;
+ALTER TABLE procedural_memory ADD COLUMN last_used_ms INTEGER;
+ALTER TABLE emotional_memory ADD COLUMN created_at_ms INTEGER;
+ALTER TABLE emotional_memory ADD COLUMN accessed_at_ms INTEGER;
+ALTER TABLE working_memory ADD COLUMN created_at_ms INTEGER;
+ALTER TABLE working_memory ADD COLUMN expires_at_ms INTEGER;
+ALTER TABLE memory_associations ADD COLUMN created_at_ms INTEGER;
+ALTER TABLE memory_associations ADD COLUMN last_reinforced_ms INTEGER;
+
+-- Existing rows (new writes set the *_ms columns themselves)
+
+-- episodic_memory: created_at, accessed_at
+UPDATE episodic_memory SET
+    created_at_ms = CAST(ROUND((julianday(created_at) - 2440587.5) * 86400000) AS INTEGER),
+    accessed_at_ms = CAST(ROUND((julianday(accessed_at) - 2440587.5) * 86400000) AS INTEGER);
+
+-- semantic_memory: created_at, updated_at, accessed_at
+UPDATE semantic_memory SET
+    created_at_ms = CAST(ROUND((julianday(created_at) - 2440587.5) * 86400000) AS INTEGER),
+    updated_at_ms = CAST(ROUND((julianday(updated_at) - 2440587.5) * 86400000) AS INTEGER),
+    accessed_at_ms = CAST(ROUND((julianday(accessed_at) - 2440587.5) * 86400000) AS INTEGER);
+
+-- procedural_memory: created_at, updated_at, accessed_at, last_used
+UPDATE procedural_memory SET
+    created_at_ms = CAST(ROUND((julianday(created_at) - 2440587.5) * 86400000) AS INTEGER),
+    updated_at_ms = CAST(ROUND((julianday(updated_at) - 2440587.5) * 86400000) AS INTEGER),
+    accessed_at_ms = CAST(ROUND((julianday(accessed_at) - 2440587.5) * 86400000) AS INTEGER),
+    last_used_ms = CAST(ROUND((julianday(last_used) - 2440587.5) * 86400000) AS INTEGER);
+
+-- emotional_memory: created_at, accessed_at
+UPDATE emotional_memory SET
+    created_at_ms = CAST(ROUND((julianday(created_at) - 2440587.5) * 86400000) AS INTEGER),
+    accessed_at_ms = CAST(ROUND((julianday(accessed_at) - 2440587.5) * 86400000) AS INTEGER);
+
+-- working_memory: created_at, expires_at
+UPDATE working_memory SET
+    created_at_ms = CAST(ROUND((julianday(created_at) - 2440587.5) * 86400000) AS INTEGER),
+    expires_at_ms = CAST(ROUND((julianday(expires_at) - 2440587.5) * 86400000) AS INTEGER);
+
+-- memory_associations: created_at, last_reinforced
+UPDATE memory_associations SET
+    created_at_ms = CAST(ROUND((julianday(created_at) - 2440587.5) * 86400000) AS INTEGER),
+    last_reinforced_ms = CAST(ROUND((julianday(last_reinforced) - 2440587.5) * 86400000) AS INTEGER);
+
+-- Time-window indexes
+DROP INDEX IF EXISTS idx_episodic_agent_accessed;
+CREATE INDEX IF NOT EXISTS idx_episodic_agent_accessed_ms ON episodic_memory(agent_id, accessed_at_ms);
+CREATE INDEX IF NOT EXISTS idx_episodic_agent_created_ms ON episodic_memory(agent_id, created_at_ms);
+CREATE INDEX IF NOT EXISTS idx_episodic_agent_session_created_ms ON episodic_memory(agent_id, session_id, created_at_ms);
+CREATE INDEX IF NOT EXISTS idx_emotional_agent_accessed_ms ON emotional_memory(agent_id, accessed_at_ms);
+CREATE INDEX IF NOT EXISTS idx_emotional_agent_created_ms ON emotional_memory(agent_id, created_at_ms);
+CREATE INDEX IF NOT EXISTS idx_procedural_agent_last_used_ms ON procedural_memory(agent_id, last_used_ms);
+DROP INDEX IF EXISTS idx_working_agent_session_expires;
+CREATE INDEX IF NOT EXISTS idx_working_agent_session_expires_ms ON working_memory(agent_id, session_id, expires_at_ms);
+CREATE INDEX IF NOT EXISTS idx_associations_agent_reinforced_ms ON memory_associations(agent_id, last_reinforced_ms);
+
+ANALYZE;
@@ -0,0 +1,11 @@
+-- Embedding Storage Migration
+-- Vector embeddings are packed little-endian float32 BLOBs; the TEXT columns were never populated
+
+ALTER TABLE episodic_memory DROP COLUMN embedding;
+ALTER TABLE episodic_memory ADD COLUMN embedding BLOB;
+ALTER TABLE semantic_memory DROP COLUMN embedding;
+ALTER TABLE semantic_memory ADD COLUMN embedding BLOB;
+ALTER TABLE procedural_memory DROP COLUMN embedding;
+ALTER TABLE procedural_memory ADD COLUMN embedding BLOB;
+ALTER TABLE emotional_memory DROP COLUMN embedding;
+ALTER TABLE emotional_memory ADD COLUMN embedding BLOB;
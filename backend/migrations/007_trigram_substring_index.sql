@@ -0,0 +1,70 @@
+
+-- Trigram Substring Index Migration
+-- FTS5 trigram indexes over the columns matched with LIKE '%text%', kept in sync by triggers
+
+-- Semantic memory: concept
+CREATE VIRTUAL TABLE IF NOT EXISTS semantic_memory_trigram USING fts5(
+    concept,
+    content='semantic_memory', content_rowid='id', tokenize='trigram case_sensitive 0'
+);
+
+CREATE TRIGGER IF NOT EXISTS semantic_memory_trigram_insert AFTER INSERT ON semantic_memory BEGIN
+    INSERT INTO semantic_memory_trigram(rowid, concept) VALUES (new.id, new.concept);
+END;
+
+CREATE TRIGGER IF NOT EXISTS semantic_memory_trigram_delete AFTER DELETE ON semantic_memory BEGIN
+    INSERT INTO semantic_memory_trigram(semantic_memory_trigram, rowid, concept) VALUES ('delete', old.id, old.concept);
+END;
+
+CREATE TRIGGER IF NOT EXISTS semantic_memory_trigram_update AFTER UPDATE OF concept ON semantic_memory BEGIN
+    INSERT INTO semantic_memory_trigram(semantic_memory_trigram, rowid, concept) VALUES ('delete', old.id, old.concept);
+    INSERT INTO semantic_memory_trigram(rowid, concept) VALUES (new.id, new.concept);
+END;
+
+-- Index rows written before this migration
+INSERT INTO semantic_memory_trigram(semantic_memory_trigram) VALUES ('rebuild');
+
+-- Procedural memory: skill_name, skill_type, procedure_steps
+CREATE VIRTUAL TABLE IF NOT EXISTS procedural_memory_trigram USING fts5(
+    skill_name, skill_type, procedure_steps,
+    content='procedural_memory', content_rowid='id', tokenize='trigram case_sensitive 0'
+);
+
+CREATE TRIGGER IF NOT EXISTS procedural_memory_trigram_insert AFTER INSERT ON procedural_memory BEGIN
+    INSERT INTO procedural_memory_trigram(rowid, skill_name, skill_type, procedure_steps) VALUES (new.id, new.skill_name, new.skill_type, new.procedure_steps);
+END;
+
+CREATE TRIGGER IF NOT EXISTS procedural_memory_trigram_delete AFTER DELETE ON procedural_memory BEGIN
+    INSERT INTO procedural_memory_trigram(procedural_memory_trigram, rowid, skill_name, skill_type, procedure_steps) VALUES ('delete', old.id, old.skill_name, old.skill_type, old.procedure_steps);
+END;
+
+-- Only text edits touch the index; proficiency updates do not
+CREATE TRIGGER IF NOT EXISTS procedural_memory_trigram_update AFTER UPDATE OF skill_name, skill_type, procedure_steps ON procedural_memory BEGIN
+    INSERT INTO procedural_memory_trigram(procedural_memory_trigram, rowid, skill_name, skill_type, procedure_steps) VALUES ('delete', old.id, old.skill_name, old.skill_type, old.procedure_steps);
+    INSERT INTO procedural_memory_trigram(rowid, skill_name, skill_type, procedure_steps) VALUES (new.id, new.skill_name, new.skill_type, new.procedure_steps);
+END;
+
+-- Index rows written before this migration
+INSERT INTO procedural_memory_trigram(procedural_memory_trigram) VALUES ('rebuild');
+
+-- Emotional memory: trigger_stimulus
+CREATE VIRTUAL TABLE IF NOT EXISTS emotional_memory_trigram USING fts5(
+    trigger_stimulus,
+    content='emotional_memory', content_rowid='id', tokenize='trigram case_sensitive 0'
+);
+
+CREATE TRIGGER IF NOT EXISTS emotional_memory_trigram_insert AFTER INSERT ON emotional_memory BEGIN
+    INSERT INTO emotional_memory_trigram(rowid, trigger_stimulus) VALUES (new.id, new.trigger_stimulus);
+END;
+
+CREATE TRIGGER IF NOT EXISTS emotional_memory_trigram_delete AFTER DELETE ON emotional_memory BEGIN
+    INSERT INTO emotional_memory_trigram(emotional_memory_trigram, rowid, trigger_stimulus) VALUES ('delete', old.id, old.trigger_stimulus);
+END;
+
+CREATE TRIGGER IF NOT EXISTS emotional_memory_trigram_update AFTER UPDATE OF trigger_stimulus ON emotional_memory BEGIN
+    INSERT INTO emotional_memory_trigram(emotional_memory_trigram, rowid, trigger_stimulus) VALUES ('delete', old.id, old.trigger_stimulus);
+    INSERT INTO emotional_memory_trigram(rowid, trigger_stimulus) VALUES (new.id, new.trigger_stimulus);
+END;
+
+-- Index rows written before this migration
+INSERT INTO emotional_memory_trigram(emotional_memory_trigram) VALUES ('rebuild');
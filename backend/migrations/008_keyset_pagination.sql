@@ -0,0 +1,11 @@
+
+-- Keyset Pagination Index Migration
+-- Indexes matching the (rank, created_at_ms, id) page order of page_memories and
+-- iter_memories, scanned backwards, so every page seeks straight to its cursor
+
+CREATE INDEX IF NOT EXISTS idx_episodic_agent_importance_ms ON episodic_memory(agent_id, importance, created_at_ms);
+CREATE INDEX IF NOT EXISTS idx_semantic_agent_importance_ms ON semantic_memory(agent_id, importance, created_at_ms);
+CREATE INDEX IF NOT EXISTS idx_procedural_agent_proficiency_ms ON procedural_memory(agent_id, proficiency_level, created_at_ms);
+CREATE INDEX IF NOT EXISTS idx_emotional_agent_intensity_ms ON emotional_memory(agent_id, intensity, created_at_ms);
+
+ANALYZE;
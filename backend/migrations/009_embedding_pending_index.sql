@@ -0,0 +1,8 @@
+-- Pending Embedding Index Migration
+-- Partial indexes over memories whose embedding has not been computed yet, so the
+-- background embedding worker and its lag metric read only the pending rows, oldest first
+
+CREATE INDEX IF NOT EXISTS idx_episodic_embedding_pending ON episodic_memory(created_at_ms) WHERE embedding IS NULL;
+CREATE INDEX IF NOT EXISTS idx_semantic_embedding_pending ON semantic_memory(created_at_ms) WHERE embedding IS NULL;
+CREATE INDEX IF NOT EXISTS idx_procedural_embedding_pending ON procedural_memory(created_at_ms) WHERE embedding IS NULL;
+CREATE INDEX IF NOT EXISTS idx_emotional_embedding_pending ON emotional_memory(created_at_ms) WHERE embedding IS NULL;
@@ -81,10 +81,12 @@ class MemorySchema:
                 sensory_details TEXT, -- JSON object for sensory information
                 outcome TEXT,
                 lessons_learned TEXT,
-                embedding TEXT, -- Vector embedding for similarity search
+                embedding BLOB, -- Packed float32 vector for similarity search
                 tags TEXT, -- JSON array of tags
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                created_at_ms INTEGER, -- Epoch milliseconds of created_at
                 accessed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                accessed_at_ms INTEGER, -- Epoch milliseconds of accessed_at
                 access_count INTEGER DEFAULT 0,
                 decay_factor REAL DEFAULT 1.0,
                 consolidation_level INTEGER DEFAULT 0,
@@ -107,11 +109,14 @@ class MemorySchema:
                 source TEXT,
                 evidence TEXT, -- Supporting evidence or examples
                 importance REAL DEFAULT 0.5,
-                embedding TEXT,
+                embedding BLOB,
                 tags TEXT, -- JSON array
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                created_at_ms INTEGER, -- Epoch milliseconds of created_at
                 updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at_ms INTEGER, -- Epoch milliseconds of updated_at
                 accessed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                accessed_at_ms INTEGER, -- Epoch milliseconds of accessed_at
                 access_count INTEGER DEFAULT 0,
                 verification_status TEXT DEFAULT 'unverified',
                 metadata TEXT,
@@ -134,12 +139,16 @@ class MemorySchema:
                 usage_frequency INTEGER DEFAULT 0,
                 success_rate REAL DEFAULT 0.0,
                 last_used DATETIME,
+                last_used_ms INTEGER, -- Epoch milliseconds of last_used
                 improvement_notes TEXT,
-                embedding TEXT,
+                embedding BLOB,
                 tags TEXT,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                created_at_ms INTEGER, -- Epoch milliseconds of created_at
                 updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at_ms INTEGER, -- Epoch milliseconds of updated_at
                 accessed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                accessed_at_ms INTEGER, -- Epoch milliseconds of accessed_at
                 access_count INTEGER DEFAULT 0,
                 metadata TEXT,
                 FOREIGN KEY (agent_id) REFERENCES agents(agent_id)
@@ -162,10 +171,12 @@ class MemorySchema:
                 behavioral_tendency TEXT,
                 coping_strategy TEXT,
                 resolution_outcome TEXT,
-                embedding TEXT,
+                embedding BLOB,
                 tags TEXT,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                created_at_ms INTEGER, -- Epoch milliseconds of created_at
                 accessed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                accessed_at_ms INTEGER, -- Epoch milliseconds of accessed_at
                 access_count INTEGER DEFAULT 0,
                 decay_factor REAL DEFAULT 1.0,
                 metadata TEXT,
@@ -187,7 +198,9 @@ class MemorySchema:
                 source_memory_id INTEGER, -- Reference to long-term memory
                 source_memory_type TEXT, -- Type of source memory
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                created_at_ms INTEGER, -- Epoch milliseconds of created_at
                 expires_at DATETIME, -- When this should be removed from working memory
+                expires_at_ms INTEGER, -- Epoch milliseconds of expires_at
                 last_accessed DATETIME DEFAULT CURRENT_TIMESTAMP,
                 metadata TEXT,
                 FOREIGN KEY (agent_id) REFERENCES agents(agent_id)
@@ -208,8 +221,10 @@ class MemorySchema:
                 direction TEXT DEFAULT 'bidirectional', -- 'forward', 'backward', 'bidirectional'
                 context TEXT,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                created_at_ms INTEGER, -- Epoch milliseconds of created_at
                 reinforcement_count INTEGER DEFAULT 1,
                 last_reinforced DATETIME DEFAULT CURRENT_TIMESTAMP,
+                last_reinforced_ms INTEGER, -- Epoch milliseconds of last_reinforced
                 metadata TEXT,
                 FOREIGN KEY (agent_id) REFERENCES agents(agent_id)
             )
@@ -255,10 +270,20 @@ class MemorySchema:
     
     @staticmethod
     def get_create_indexes_sql() -> List[str]:
-        """Returns SQL statements to create performance indexes"""
+        """Returns SQL statements to create performance indexes
+
+        Matches the indexes the migrations in backend/migrations leave behind.
+        """
         return [
             # Episodic memory indexes
-            "CREATE INDEX IF NOT EXISTS idx_episodic_agent_id ON episodic_memory(agent_id)",
+            "CREATE INDEX IF NOT EXISTS idx_episodic_agent_importance ON episodic_memory(agent_id, importance DESC, created_at DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_episodic_agent_created ON episodic_memory(agent_id, created_at DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_episodic_agent_session ON episodic_memory(agent_id, session_id, created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_episodic_agent_accessed_ms ON episodic_memory(agent_id, accessed_at_ms)",
+            "CREATE INDEX IF NOT EXISTS idx_episodic_agent_created_ms ON episodic_memory(agent_id, created_at_ms)",
+            "CREATE INDEX IF NOT EXISTS idx_episodic_agent_session_created_ms ON episodic_memory(agent_id, session_id, created_at_ms)",
+            "CREATE INDEX IF NOT EXISTS idx_episodic_agent_importance_ms ON episodic_memory(agent_id, importance, created_at_ms)",
+            "CREATE INDEX IF NOT EXISTS idx_episodic_embedding_pending ON episodic_memory(created_at_ms) WHERE embedding IS NULL",
             "CREATE INDEX IF NOT EXISTS idx_episodic_session_id ON episodic_memory(session_id)",
             "CREATE INDEX IF NOT EXISTS idx_episodic_event_type ON episodic_memory(event_type)",
             "CREATE INDEX IF NOT EXISTS idx_episodic_importance ON episodic_memory(importance DESC)",
@@ -268,45 +293,60 @@ class MemorySchema:
             "CREATE INDEX IF NOT EXISTS idx_episodic_consolidation ON episodic_memory(consolidation_level)",
             
             # Semantic memory indexes
-            "CREATE INDEX IF NOT EXISTS idx_semantic_agent_id ON semantic_memory(agent_id)",
+            "CREATE INDEX IF NOT EXISTS idx_semantic_agent_concept ON semantic_memory(agent_id, concept)",
+            "CREATE INDEX IF NOT EXISTS idx_semantic_agent_importance ON semantic_memory(agent_id, importance DESC, confidence DESC)",
             "CREATE INDEX IF NOT EXISTS idx_semantic_concept ON semantic_memory(concept)",
             "CREATE INDEX IF NOT EXISTS idx_semantic_category ON semantic_memory(category, subcategory)",
             "CREATE INDEX IF NOT EXISTS idx_semantic_importance ON semantic_memory(importance DESC)",
             "CREATE INDEX IF NOT EXISTS idx_semantic_confidence ON semantic_memory(confidence DESC)",
             "CREATE INDEX IF NOT EXISTS idx_semantic_accessed_at ON semantic_memory(accessed_at DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_semantic_agent_importance_ms ON semantic_memory(agent_id, importance, created_at_ms)",
+            "CREATE INDEX IF NOT EXISTS idx_semantic_embedding_pending ON semantic_memory(created_at_ms) WHERE embedding IS NULL",
             
             # Procedural memory indexes
-            "CREATE INDEX IF NOT EXISTS idx_procedural_agent_id ON procedural_memory(agent_id)",
+            "CREATE INDEX IF NOT EXISTS idx_procedural_agent_skill ON procedural_memory(agent_id, skill_name)",
+            "CREATE INDEX IF NOT EXISTS idx_procedural_agent_proficiency ON procedural_memory(agent_id, proficiency_level DESC, usage_frequency DESC)",
             "CREATE INDEX IF NOT EXISTS idx_procedural_skill_name ON procedural_memory(skill_name)",
             "CREATE INDEX IF NOT EXISTS idx_procedural_skill_type ON procedural_memory(skill_type)",
             "CREATE INDEX IF NOT EXISTS idx_procedural_proficiency ON procedural_memory(proficiency_level DESC)",
             "CREATE INDEX IF NOT EXISTS idx_procedural_usage ON procedural_memory(usage_frequency DESC)",
             "CREATE INDEX IF NOT EXISTS idx_procedural_success_rate ON procedural_memory(success_rate DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_procedural_agent_last_used_ms ON procedural_memory(agent_id, last_used_ms)",
+            "CREATE INDEX IF NOT EXISTS idx_procedural_agent_proficiency_ms ON procedural_memory(agent_id, proficiency_level, created_at_ms)",
+            "CREATE INDEX IF NOT EXISTS idx_procedural_embedding_pending ON procedural_memory(created_at_ms) WHERE embedding IS NULL",
             
             # Emotional memory indexes
-            "CREATE INDEX IF NOT EXISTS idx_emotional_agent_id ON emotional_memory(agent_id)",
+            "CREATE INDEX IF NOT EXISTS idx_emotional_agent_intensity ON emotional_memory(agent_id, intensity DESC, created_at DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_emotional_agent_type ON emotional_memory(agent_id, emotion_type, intensity DESC, created_at DESC)",
             "CREATE INDEX IF NOT EXISTS idx_emotional_trigger ON emotional_memory(trigger_stimulus)",
             "CREATE INDEX IF NOT EXISTS idx_emotional_type ON emotional_memory(emotion_type)",
             "CREATE INDEX IF NOT EXISTS idx_emotional_valence ON emotional_memory(valence)",
             "CREATE INDEX IF NOT EXISTS idx_emotional_intensity ON emotional_memory(intensity DESC)",
             "CREATE INDEX IF NOT EXISTS idx_emotional_accessed_at ON emotional_memory(accessed_at DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_emotional_agent_accessed_ms ON emotional_memory(agent_id, accessed_at_ms)",
+            "CREATE INDEX IF NOT EXISTS idx_emotional_agent_created_ms ON emotional_memory(agent_id, created_at_ms)",
+            "CREATE INDEX IF NOT EXISTS idx_emotional_agent_intensity_ms ON emotional_memory(agent_id, intensity, created_at_ms)",
+            "CREATE INDEX IF NOT EXISTS idx_emotional_embedding_pending ON emotional_memory(created_at_ms) WHERE embedding IS NULL",
             
             # Working memory indexes
-            "CREATE INDEX IF NOT EXISTS idx_working_agent_session ON working_memory(agent_id, session_id)",
+            "CREATE INDEX IF NOT EXISTS idx_working_agent_session_expires_ms ON working_memory(agent_id, session_id, expires_at_ms)",
             "CREATE INDEX IF NOT EXISTS idx_working_content_type ON working_memory(content_type)",
             "CREATE INDEX IF NOT EXISTS idx_working_priority ON working_memory(priority DESC)",
             "CREATE INDEX IF NOT EXISTS idx_working_activation ON working_memory(activation_level DESC)",
             "CREATE INDEX IF NOT EXISTS idx_working_expires_at ON working_memory(expires_at)",
             
             # Association indexes
-            "CREATE INDEX IF NOT EXISTS idx_associations_agent_id ON memory_associations(agent_id)",
+            "CREATE INDEX IF NOT EXISTS idx_associations_agent_memory1 ON memory_associations(agent_id, memory1_id, memory1_type, memory2_id, memory2_type)",
+            "CREATE INDEX IF NOT EXISTS idx_associations_agent_memory2 ON memory_associations(agent_id, memory2_id, memory2_type)",
             "CREATE INDEX IF NOT EXISTS idx_associations_memory1 ON memory_associations(memory1_id, memory1_type)",
             "CREATE INDEX IF NOT EXISTS idx_associations_memory2 ON memory_associations(memory2_id, memory2_type)",
             "CREATE INDEX IF NOT EXISTS idx_associations_type ON memory_associations(association_type)",
             "CREATE INDEX IF NOT EXISTS idx_associations_strength ON memory_associations(strength DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_associations_agent_reinforced_ms ON memory_associations(agent_id, last_reinforced_ms)",
             
             # Consolidation indexes
-            "CREATE INDEX IF NOT EXISTS idx_consolidation_agent_id ON memory_consolidation(agent_id)",
+            "CREATE INDEX IF NOT EXISTS idx_consolidation_agent_started ON memory_consolidation(agent_id, started_at DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_consolidation_agent_status ON memory_consolidation(agent_id, status, completed_at DESC)",
             "CREATE INDEX IF NOT EXISTS idx_consolidation_type ON memory_consolidation(consolidation_type)",
             "CREATE INDEX IF NOT EXISTS idx_consolidation_status ON memory_consolidation(status)",
             "CREATE INDEX IF NOT EXISTS idx_consolidation_started_at ON memory_consolidation(started_at DESC)",
@@ -345,3 +385,55 @@ class MemoryConfig:
     FORGOTTEN_MEMORY_THRESHOLD = 0.1
     CLEANUP_INTERVAL_DAYS = 7
     ARCHIVE_THRESHOLD_DAYS = 90
+    
+    # Database connection parameters
+    CONNECTION_TIMEOUT_SECONDS = 5.0
+    READ_POOL_SIZE = 4  # Read-only connections shared by retrieval paths
+    
+    # Sharding parameters
+    SHARD_PARALLELISM = 4  # Shards processed concurrently by map_shards
+    
+    # Asyncio facade parameters
+    ASYNC_MAX_WORKERS = 4  # Executor threads; keep <= READ_POOL_SIZE so reads never queue
+    
+    # Search parameters
+    SEARCH_PARALLEL = False  # Search memory types concurrently on the read pool and heap-merge
+    SEARCH_CACHE_SIZE = 256  # Cached search_memories results; 0 disables the cache
+    SEARCH_CACHE_TTL_SECONDS = 30.0  # Bounds staleness from writes made outside MemoryAPI
+    SEARCH_CONFIDENCE_WEIGHT = 0.0  # Exponent on confidence/proficiency in the relevance blend
+    SEARCH_INTENSITY_WEIGHT = 0.0  # Exponent on emotional intensity in the relevance blend
+    SEARCH_ACCESS_WEIGHT = 0.0  # Exponent on 1 + log(1 + access_count) in the relevance blend
+    SEARCH_HYBRID = False  # Fuse keyword and embedding-similarity rankings in search_memories
+    SEARCH_HYBRID_DEPTH = 100  # Candidates each hybrid path contributes to the fusion
+    SEARCH_RRF_K = 60  # Reciprocal rank fusion damping: score = sum(1 / (k + rank))
+    SEARCH_DEADLINE_MS = None  # Default latency budget of search_memories; None searches every tier
+    SEARCH_PRIORITY = ('episodic', 'semantic', 'procedural', 'emotional')  # Order budgeted searches visit memory types
+    PAGE_CHUNK_SIZE = 500  # Rows per keyset query when streaming with iter_memories
+    
+    # Embedding parameters
+    EMBEDDING_DIMENSION = 256  # Hashed n-gram buckets per float32 embedding
+    VECTOR_INDEX_DIR = None  # Embedding matrix directory; None puts it beside the database as <name>.vectors
+    EMBEDDING_QUANTIZATION = {  # Stored embedding format per memory type: float32, int8 or binary
+        'episodic': 'float32', 'semantic': 'float32', 'procedural': 'float32', 'emotional': 'float32'
+    }
+    EMBEDDING_RERANK_FACTOR = 4  # Quantized candidates per requested result, re-ranked with exact vectors
+    EMBEDDING_CACHE_SIZE = 4096  # Embeddings memoized by content hash of the embedded text
+    EMBEDDING_BACKGROUND = False  # Store memories without embeddings and fill them from a background worker
+    EMBEDDING_BATCH_SIZE = 64  # Rows the background worker embeds and writes per transaction
+    EMBEDDING_POLL_INTERVAL_SECONDS = 0.5  # Background worker rescan interval when not notified of new rows
+    
+    # Approximate nearest-neighbour (IVF) index parameters
+    ANN_NPROBE = 8  # Inverted lists scanned per search; higher raises recall@k and latency
+    ANN_TRAIN_THRESHOLD = 2048  # Vectors per agent and type before clustering; smaller indexes are searched exactly
+    ANN_RETRIEVAL = False  # AgentMemoryInterface.retrieve_relevant_memories ranks by ANN similarity
+    
+    # Group-commit write queue parameters
+    WRITE_QUEUE_BATCH_SIZE = 64
+    WRITE_QUEUE_FLUSH_INTERVAL_MS = 5.0
+    
+    # Buffered access tracking parameters
+    ACCESS_FLUSH_INTERVAL_SECONDS = 2.0
+    ACCESS_BUFFER_MAX_PENDING = 1000
+    
+    # Query planner statistics refresh (ANALYZE / PRAGMA optimize)
+    OPTIMIZE_INTERVAL_HOURS = 6
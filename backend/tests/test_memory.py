@@ -9,15 +9,26 @@ import sqlite3
 import json
 import tempfile
 import os
+import asyncio
 import logging
+import time
 from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock
 
+import numpy as np
+
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from memory.api import MemoryAPI
+from memory.api import MemoryAPI, SEARCH_TYPE_CODES, substring_source
+from memory import ranking
+from memory.embeddings import HashingEmbedder
+from memory.embedding_worker import EmbeddingWorker
+from memory.ann import IVFIndex
+from memory.integration import AgentMemoryInterface
 from memory.consolidator import MemoryConsolidator
+from memory.sharding import ShardedMemoryAPI, ShardRouter, migrate_to_shards
+from memory.async_api import AsyncMemoryAPI, AsyncAgentMemoryInterface
 from schemas.memory_models import MemoryType, MemoryConfig
 
 class TestMemoryAPI(unittest.TestCase):
@@ -58,7 +69,12 @@ class TestMemoryAPI(unittest.TestCase):
     
     def tearDown(self):
         """Clean up test database"""
-        os.unlink(self.test_db.name)
+        import shutil
+        self.memory_api.close()
+        for path in (self.test_db.name, self.test_db.name + '-wal', self.test_db.name + '-shm'):
+            if os.path.exists(path):
+                os.unlink(path)
+        shutil.rmtree(self.memory_api.vector_index.directory, ignore_errors=True)
     
     def test_store_episodic_memory(self):
         """Test storing episodic memories"""
@@ -269,6 +285,845 @@ class TestMemoryAPI(unittest.TestCase):
         self.assertIn('episodic', memory_types)
         self.assertIn('semantic', memory_types)
 
+    def test_search_index_follows_edits(self):
+        """Test that the full-text index tracks updates and deletes"""
+        memory_id = self.memory_api.store_episodic_memory(
+            "test_agent", "session_1", "conversation", "Talked about telescopes"
+        )
+        
+        with self.memory_api.get_connection() as conn:
+            conn.execute("UPDATE episodic_memory SET content = 'Talked about microscopes' WHERE id = ?", (memory_id,))
+        self.memory_api.invalidate_search_cache("test_agent")
+        
+        search = lambda q: self.memory_api.search_memories("test_agent", q, memory_types=["episodic"], importance_threshold=0.0)
+        self.assertEqual(search("telescopes"), [])
+        self.assertEqual([m['id'] for m in search("micro")], [memory_id])
+        
+        with self.memory_api.get_connection() as conn:
+            conn.execute("DELETE FROM episodic_memory WHERE id = ?", (memory_id,))
+        self.memory_api.invalidate_search_cache("test_agent")
+        self.assertEqual(search("microscopes"), [])
+    
+    def test_search_query_syntax_is_literal(self):
+        """Test that FTS5 operators in a query are treated as plain words"""
+        self.memory_api.store_semantic_memory("test_agent", "c_plus_plus", "A language: fast OR slow")
+        
+        results = self.memory_api.search_memories("test_agent", 'c++ "NOT" -- OR*')
+        
+        self.assertEqual(results, [])
+        self.assertEqual(len(self.memory_api.search_memories("test_agent", "c++")), 1)
+    
+    def test_search_ranks_globally(self):
+        """Test that search returns exactly limit results ranked across types"""
+        for i in range(6):
+            self.memory_api.store_semantic_memory(
+                "test_agent", f"orbit_{i}", "Path around a star", importance=0.9
+            )
+        self.memory_api.store_episodic_memory(
+            "test_agent", "session_1", "observation", "Watched an orbit", importance=0.3
+        )
+        
+        self.assertEqual(len(self.memory_api.search_memories("test_agent", "orbit", limit=1)), 1)
+        
+        results = self.memory_api.search_memories("test_agent", "orbit", limit=6)
+        self.assertEqual(len(results), 6)
+        self.assertEqual({r['memory_type'] for r in results}, {'semantic'})
+        scores = [r['relevance_score'] for r in results]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        
+        self.assertEqual(len(self.memory_api.search_memories("test_agent", "orbit", limit=50)), 7)
+    
+    def test_parallel_search_matches_single_statement(self):
+        """Test that the fan-out search mode returns the same ranking"""
+        for i in range(4):
+            self.memory_api.store_episodic_memory(
+                "test_agent", "session_1", "observation", f"Comet sighting {i}", importance=0.2 * (i + 1)
+            )
+            self.memory_api.store_semantic_memory(
+                "test_agent", f"comet_{i}", "Icy body", importance=0.9 - 0.2 * i
+            )
+        self.memory_api.store_emotional_memory("test_agent", "comet flyby", "awe", 0.8, 0.7, 0.9)
+        
+        for limit in [1, 3, 9, 50]:
+            single = self.memory_api.search_memories("test_agent", "comet", limit=limit)
+            fanned = self.memory_api.search_memories("test_agent", "comet", limit=limit, parallel=True)
+            self.assertEqual(
+                [(r['memory_type'], r['id']) for r in fanned],
+                [(r['memory_type'], r['id']) for r in single]
+            )
+    
+    def test_search_blend_weights(self):
+        """Test that the relevance blend weights reorder search results"""
+        strong = self.memory_api.store_emotional_memory("test_agent", "thunder clap", "fear", -0.6, 0.8, 0.9)
+        faint = self.memory_api.store_emotional_memory("test_agent", "distant thunder", "fear", -0.2, 0.3, 0.2)
+        
+        ranked = self.memory_api.search_memories("test_agent", "thunder")
+        self.assertEqual([r['id'] for r in ranked], [faint, strong])
+        
+        self.memory_api.config.SEARCH_INTENSITY_WEIGHT = 1.0
+        self.memory_api.invalidate_search_cache("test_agent")
+        ranked = self.memory_api.search_memories("test_agent", "thunder")
+        self.assertEqual([r['id'] for r in ranked], [strong, faint])
+        self.assertGreater(ranked[0]['relevance_score'], ranked[1]['relevance_score'])
+    
+    def test_vectorized_ranking_matches_full_sort(self):
+        """Test that argpartition top-k matches a full sort, ties included"""
+        rng = np.random.default_rng(7)
+        count = 100_000
+        now = 1_700_000_000_000
+        candidates = np.column_stack([
+            rng.integers(0, 4, count),
+            np.arange(count),
+            rng.choice([0.25, 0.5, 0.75], count),  # Coarse importance forces ties
+            np.full(count, float(now)),
+            rng.random(count),
+            rng.random(count),
+            rng.integers(0, 50, count)
+        ]).astype(np.float64)
+        
+        for k in [1, 10, 1000, count + 5]:
+            winners, scores = ranking.rank_candidates(candidates, k, now)
+            expected = np.lexsort((candidates[:, ranking.TYPE], -candidates[:, ranking.ID], -scores))[:k]
+            np.testing.assert_array_equal(winners, expected)
+    
+    def test_search_cache_invalidated_by_writes(self):
+        """Test that cached searches are reused until the agent writes"""
+        self.memory_api.store_semantic_memory("test_agent", "nebula", "Cloud of gas")
+        
+        first = self.memory_api.search_memories("test_agent", "nebula")
+        first[0]['annotated'] = True
+        second = self.memory_api.search_memories("test_agent", "nebula")
+        
+        self.assertEqual(len(second), 1)
+        self.assertNotIn('annotated', second[0])
+        self.assertEqual(self.memory_api.get_search_cache_stats()['hits'], 1)
+        
+        self.memory_api.store_episodic_memory("test_agent", "session_1", "observation", "Saw a nebula")
+        self.assertEqual(len(self.memory_api.search_memories("test_agent", "nebula")), 2)
+    
+    def test_concurrent_identical_searches_coalesce(self):
+        """Test that identical in-flight searches share one query"""
+        import threading
+        
+        release = threading.Event()
+        calls = []
+        search = self.memory_api._search_uncached
+        
+        def slow_search(*args):
+            calls.append(args)
+            release.wait(5)
+            return search(*args)
+        
+        self.memory_api._search_uncached = slow_search
+        threads = [
+            threading.Thread(target=self.memory_api.search_memories, args=("test_agent", "quasar"))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for _ in range(500):
+            if self.memory_api.get_search_cache_stats()['coalesced'] == 3:
+                break
+            threading.Event().wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(calls), 1)
+    
+    def test_episodic_memory_batch(self):
+        """Test bulk storage of episodic memories"""
+        memory_ids = self.memory_api.store_episodic_memory_batch("test_agent", [
+            {
+                'session_id': "session_1",
+                'event_type': "conversation",
+                'content': f"Batch message {i}",
+                'importance': 0.5 + i * 0.1,
+                'tags': ["batch"]
+            }
+            for i in range(4)
+        ])
+
+        self.assertEqual(len(memory_ids), 4)
+        self.assertEqual(memory_ids, sorted(memory_ids))
+
+        memories = {m['id']: m for m in self.memory_api.retrieve_episodic_memories("test_agent")}
+        self.assertEqual([memories[i]['content'] for i in memory_ids],
+                         [f"Batch message {i}" for i in range(4)])
+        self.assertEqual(memories[memory_ids[0]]['tags'], ["batch"])
+
+        # Each memory links back to up to three earlier ones
+        associated = self.memory_api.find_associated_memories(
+            "test_agent", memory_ids[3], "episodic", min_strength=0.0
+        )
+        self.assertEqual(
+            sorted(a['related_memory_id'] for a in associated),
+            memory_ids[:3]
+        )
+
+    def test_semantic_memory_batch(self):
+        """Test bulk storage of semantic memories with relationships"""
+        existing_id = self.memory_api.store_semantic_memory(
+            agent_id="test_agent",
+            concept="weather",
+            definition="Old definition"
+        )
+
+        memory_ids = self.memory_api.store_semantic_memory_batch("test_agent", [
+            {'concept': "weather", 'definition': "Atmospheric conditions",
+             'relationships': {"related_to": ["humidity"]}},
+            {'concept': "humidity", 'definition': "Water vapour in the air"},
+        ])
+
+        self.assertEqual(memory_ids[0], existing_id)
+
+        weather = self.memory_api.retrieve_semantic_memory("test_agent", concept="weather")
+        self.assertEqual(weather[0]['definition'], "Atmospheric conditions")
+
+        associated = self.memory_api.find_associated_memories(
+            "test_agent", existing_id, "semantic"
+        )
+        self.assertEqual([a['related_memory_id'] for a in associated], [memory_ids[1]])
+
+    def test_procedural_and_emotional_memory_batch(self):
+        """Test bulk storage of procedural and emotional memories"""
+        procedural_ids = self.memory_api.store_procedural_memory_batch("test_agent", [
+            {'skill_name': f"skill_{i}", 'skill_type': "cognitive", 'procedure_steps': ["step"]}
+            for i in range(3)
+        ])
+        self.assertEqual(len(set(procedural_ids)), 3)
+
+        emotional_ids = self.memory_api.store_emotional_memory_batch("test_agent", [
+            {'trigger_stimulus': f"praise {i}", 'emotion_type': "joy",
+             'valence': 0.8, 'arousal': 0.5, 'intensity': 0.9}
+            for i in range(3)
+        ])
+
+        patterns = self.memory_api.retrieve_emotional_patterns("test_agent", emotion_type="joy")
+        self.assertEqual(sorted(p['id'] for p in patterns), emotional_ids)
+
+        associated = self.memory_api.find_associated_memories(
+            "test_agent", emotional_ids[0], "emotional"
+        )
+        self.assertEqual(len(associated), 2)
+
+        self.assertEqual(self.memory_api.store_procedural_memory_batch("test_agent", []), [])
+
+    def test_keyset_pagination_and_streaming(self):
+        """Test that cursor pages and streamed chunks cover every row once, in keyset order"""
+        # Importance ties force the (created_at_ms, id) tie-breaks
+        self.memory_api.store_episodic_memory_batch("test_agent", [
+            {'session_id': "s", 'event_type': "note", 'content': f"Event {i}",
+             'importance': (i % 4) / 4.0, 'tags': [f"t{i}"]}
+            for i in range(23)
+        ])
+        with self.memory_api.get_connection() as conn:
+            expected = [row['id'] for row in conn.execute("""
+                SELECT id FROM episodic_memory WHERE agent_id = 'test_agent'
+                ORDER BY importance DESC, created_at_ms DESC, id DESC
+            """)]
+
+        paged, cursor = [], None
+        while True:
+            page = self.memory_api.page_memories("test_agent", "episodic", page_size=5, cursor=cursor)
+            paged.extend(page['memories'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual([m['id'] for m in paged], expected)
+        self.assertTrue(all(isinstance(m['tags'], list) and 'embedding' not in m for m in paged))
+
+        streamed = self.memory_api.iter_memories("test_agent", "episodic", chunk_size=4)
+        self.assertEqual([m['id'] for m in streamed], expected)
+
+        episodic_cursor = self.memory_api.page_memories("test_agent", "episodic", page_size=1)['next_cursor']
+        with self.assertRaises(ValueError):
+            self.memory_api.page_memories("test_agent", "semantic", cursor=episodic_cursor)
+        with self.assertRaises(ValueError):
+            self.memory_api.page_memories("test_agent", "episodic", cursor="not a cursor")
+
+    def test_access_tracking_is_buffered(self):
+        """Test that repeated reads coalesce into one access update"""
+        memory_id = self.memory_api.store_episodic_memory(
+            agent_id="test_agent",
+            session_id="session_1",
+            event_type="conversation",
+            content="Frequently recalled"
+        )
+
+        for _ in range(3):
+            self.memory_api.retrieve_episodic_memories("test_agent")
+
+        stats = self.memory_api.get_access_tracking_stats()
+        self.assertEqual(stats['recorded'], 3)
+        self.assertEqual(stats['coalesced'], 2)
+        self.assertEqual(stats['pending'], 1)
+
+        self.assertEqual(self.memory_api.flush_access_tracking(), 1)
+
+        with self.memory_api.get_connection() as conn:
+            row = conn.execute(
+                "SELECT access_count FROM episodic_memory WHERE id = ?", (memory_id,)
+            ).fetchone()
+        self.assertEqual(row['access_count'], 3)
+
+    def test_migrations_applied_once(self):
+        """Test that startup migrations are recorded and not re-applied"""
+        with self.memory_api.get_connection() as conn:
+            versions = [row['version'] for row in conn.execute(
+                "SELECT version FROM schema_version ORDER BY version"
+            )]
+            indexes = {row['name'] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+            )}
+
+        self.assertEqual(versions[:2], [1, 2])
+        self.assertIn('idx_episodic_agent_importance', indexes)
+        self.assertNotIn('idx_episodic_agent_id', indexes)
+        self.assertEqual(self.memory_api.apply_migrations(), [])
+
+    def test_retrieval_uses_composite_index(self):
+        """Test that importance-ordered retrieval avoids a temp sort"""
+        self.memory_api.optimize_database(full_analyze=True)
+
+        with self.memory_api.get_connection() as conn:
+            plan = " ".join(row['detail'] for row in conn.execute("""
+                EXPLAIN QUERY PLAN
+                SELECT * FROM episodic_memory
+                WHERE agent_id = ? AND importance >= ?
+                ORDER BY importance DESC, created_at DESC
+                LIMIT 10
+            """, ("test_agent", 0.5)))
+
+        self.assertIn('idx_episodic_agent_importance', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_epoch_columns_follow_timestamps(self):
+        """Test that writes set the *_ms columns with their timestamps, without triggers"""
+        from memory.api import epoch_ms
+        
+        def assert_stamped(table, memory_id, columns):
+            with self.memory_api.get_connection() as conn:
+                row = conn.execute(f"SELECT * FROM {table} WHERE id = ?", (memory_id,)).fetchone()
+            for column in columns:
+                self.assertIsNotNone(row[f'{column}_ms'], column)
+                self.assertEqual(row[f'{column}_ms'], epoch_ms(datetime.fromisoformat(row[column])), column)
+        
+        episodic_id = self.memory_api.store_episodic_memory("test_agent", "s", "note", "Stamped")
+        semantic_id = self.memory_api.store_semantic_memory("test_agent", "Stamp", "A mark")
+        skill_id = self.memory_api.store_procedural_memory("test_agent", "stamping", "craft", ["press"])
+        assert_stamped('episodic_memory', episodic_id, ('created_at', 'accessed_at'))
+        assert_stamped('semantic_memory', semantic_id, ('created_at', 'updated_at', 'accessed_at'))
+        
+        self.memory_api.store_semantic_memory("test_agent", "Stamp", "A revised mark")
+        self.memory_api.update_skill_proficiency("test_agent", "stamping", success=True)
+        self.memory_api.retrieve_semantic_memory("test_agent", concept="Stamp")
+        self.memory_api.flush_access_tracking()
+        assert_stamped('semantic_memory', semantic_id, ('created_at', 'updated_at', 'accessed_at'))
+        assert_stamped('procedural_memory', skill_id, ('created_at', 'updated_at', 'accessed_at', 'last_used'))
+        
+        association_id = self.memory_api.create_memory_association(
+            "test_agent", episodic_id, "episodic", semantic_id, "semantic", "related"
+        )
+        self.memory_api.create_memory_association(
+            "test_agent", episodic_id, "episodic", semantic_id, "semantic", "related"
+        )
+        assert_stamped('memory_associations', association_id, ('created_at', 'last_reinforced'))
+        
+        with self.memory_api.get_connection() as conn:
+            triggers = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%_epoch_%'"
+            ).fetchall()
+        self.assertEqual(triggers, [])
+        
+        self.memory_api.add_to_working_memory("test_agent", "s", "goal", "Expired", expires_in_minutes=-1)
+        self.assertEqual(self.memory_api.get_working_memory("test_agent", "s"), [])
+    
+    def test_schema_helpers_match_migrations(self):
+        """Test that MemorySchema builds the same memory tables and indexes as the migrations"""
+        from memory.migrations import MigrationRunner
+        from schemas.memory_models import MemorySchema
+        
+        def schema(conn):
+            tables = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE '%FOREIGN KEY%'"
+            )]
+            columns = {table: {(row[1], row[2]) for row in conn.execute(f"PRAGMA table_info({table})")} for table in tables}
+            indexes = {
+                name: " ".join(sql.replace("IF NOT EXISTS ", "").split())
+                for name, sql in conn.execute(
+                    "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+                )
+            }
+            return columns, indexes
+        
+        migrated = sqlite3.connect(":memory:")
+        MigrationRunner().apply(migrated)
+        helper = sqlite3.connect(":memory:")
+        for sql in MemorySchema.get_create_tables_sql() + MemorySchema.get_create_indexes_sql():
+            helper.execute(sql)
+        self.assertEqual(schema(helper), schema(migrated))
+    
+    def test_time_window_uses_epoch_index(self):
+        """Test that recent-memory windows are index range scans"""
+        with self.memory_api.get_connection() as conn:
+            plan = " ".join(row['detail'] for row in conn.execute("""
+                EXPLAIN QUERY PLAN
+                SELECT COUNT(*) FROM episodic_memory
+                WHERE agent_id = ? AND created_at_ms > ?
+            """, ("test_agent", 0)))
+        
+        self.assertIn('idx_episodic_agent_created_ms', plan)
+        self.assertIn('created_at_ms>?', plan)
+
+    def test_substring_lookups_match_like_scan(self):
+        """Test that trigram-backed substring lookups return the LIKE '%x%' rows"""
+        concepts = ["Neural Network", "neural pathways", "Network effects", "Ünïcode", "ab", "a_b network"]
+        for concept in concepts:
+            self.memory_api.store_semantic_memory("test_agent", concept, f"About {concept}")
+            self.memory_api.store_emotional_memory("test_agent", f"saw {concept}", "curiosity", 0.5, 0.5, 0.5)
+        with self.memory_api.get_connection() as conn:
+            conn.execute("UPDATE semantic_memory SET concept = 'Renamed layer' WHERE concept = 'neural pathways'")
+
+        for text in ["neural", "NETWORK", "work eff", "ünï", "ab", "a_b", "n%k", "layer", "pathways", "missing"]:
+            with self.memory_api.get_connection() as conn:
+                semantic = {row['id'] for row in conn.execute(
+                    "SELECT id FROM semantic_memory WHERE agent_id = ? AND concept LIKE ?", ("test_agent", f"%{text}%")
+                )}
+                emotional = {row['id'] for row in conn.execute(
+                    "SELECT id FROM emotional_memory WHERE agent_id = ? AND trigger_stimulus LIKE ?", ("test_agent", f"%{text}%")
+                )}
+            found = self.memory_api.retrieve_semantic_memory("test_agent", concept=text)
+            self.assertEqual({m['id'] for m in found}, semantic, text)
+            found = self.memory_api.retrieve_emotional_patterns("test_agent", trigger_pattern=text, intensity_threshold=0.0)
+            self.assertEqual({m['id'] for m in found}, emotional, text)
+
+        source, params = substring_source("semantic_memory", [("concept", "neural")])
+        with self.memory_api.get_connection() as conn:
+            plan = " ".join(row['detail'] for row in conn.execute(
+                f"EXPLAIN QUERY PLAN SELECT m.* FROM {source} WHERE m.agent_id = ?", params + ["test_agent"]
+            ))
+        self.assertIn('semantic_memory_trigram VIRTUAL TABLE', plan)
+        self.assertNotIn('SCAN m', plan)
+
+    def test_embeddings_stored_as_float32_blobs(self):
+        """Test that stored memories carry a float32 BLOB embedding of their text"""
+        memory_id = self.memory_api.store_episodic_memory(
+            "test_agent", "session_1", "observation", "The telescope tracked a comet"
+        )
+        batch_ids = self.memory_api.store_semantic_memory_batch("test_agent", [
+            {'concept': 'comet', 'definition': 'An icy body with a tail', 'category': 'astronomy'}
+        ])
+        
+        with self.memory_api.get_read_connection() as conn:
+            blob = conn.execute(
+                "SELECT embedding FROM episodic_memory WHERE id = ?", (memory_id,)
+            ).fetchone()['embedding']
+        self.assertIsInstance(blob, bytes)
+        self.assertEqual(len(blob), 4 * self.memory_api.config.EMBEDDING_DIMENSION)
+        
+        vector = self.memory_api.get_embedding("episodic", memory_id)
+        self.assertEqual(vector.dtype, np.float32)
+        self.assertFalse(vector.flags.writeable)  # A view of the BLOB, not a copy
+        self.assertAlmostEqual(float(np.linalg.norm(vector)), 1.0, places=5)
+        np.testing.assert_array_equal(
+            vector, self.memory_api.embed_text("observation The telescope tracked a comet")
+        )
+        
+        semantic = self.memory_api.get_embedding("semantic", batch_ids[0])
+        np.testing.assert_array_equal(semantic, self.memory_api.embed_text("comet An icy body with a tail astronomy"))
+        self.assertIsNone(self.memory_api.get_embedding("semantic", 999999))
+        
+        # Search results leave the BLOB out
+        self.assertNotIn('embedding', self.memory_api.search_memories("test_agent", "comet")[0])
+    
+    def test_local_embedder_is_deterministic(self):
+        """Test that the hashed n-gram embedder is stable and similarity-preserving"""
+        embedder = HashingEmbedder(dimension=256)
+        again = HashingEmbedder(dimension=256)
+        
+        text = "Calibrate the spectrometer before each observation"
+        np.testing.assert_array_equal(embedder.embed(text), again.embed(text))
+        
+        query = embedder.embed("spectrometer calibration")
+        related = embedder.embed(text)
+        unrelated = embedder.embed("Bake bread with sourdough starter")
+        self.assertGreater(float(query @ related), float(query @ unrelated))
+        
+        self.assertFalse(embedder.embed("").any())
+        matrix = embedder.embed_batch([text, "", "spectrometer calibration"])
+        self.assertEqual(matrix.shape, (3, 256))
+        np.testing.assert_array_equal(matrix[2], query)
+    
+    def test_similar_memories_over_embedding_matrix(self):
+        """Test similarity search over the memory-mapped embedding matrix"""
+        comet_id = self.memory_api.store_episodic_memory(
+            "test_agent", "s", "observation", "The telescope tracked a bright comet"
+        )
+        self.memory_api.store_episodic_memory("test_agent", "s", "cooking", "Baked sourdough bread")
+        concept_id = self.memory_api.store_semantic_memory("test_agent", "comet", "An icy body with a tail")
+        self.memory_api.store_episodic_memory("other_agent", "s", "observation", "A comet overhead")
+        
+        results = self.memory_api.similar_memories("test_agent", "comet telescope", k=2)
+        self.assertEqual(
+            [(r['memory_type'], r['id']) for r in results],
+            [("episodic", comet_id), ("semantic", concept_id)]
+        )
+        self.assertGreaterEqual(results[0]['similarity'], results[1]['similarity'])
+        self.assertNotIn('embedding', results[0])
+        
+        vector = self.memory_api.embed_text("comet")
+        semantic_only = self.memory_api.similar_memories("test_agent", vector, k=5, memory_types=["semantic"])
+        self.assertEqual([r['id'] for r in semantic_only], [concept_id])
+        
+        # Updating a concept overwrites its row instead of appending one
+        self.assertEqual(self.memory_api.vector_index.count("test_agent"), 3)
+        self.memory_api.store_semantic_memory("test_agent", "comet", "A frozen wanderer of the outer system")
+        self.assertEqual(self.memory_api.vector_index.count("test_agent"), 3)
+        top = self.memory_api.similar_memories("test_agent", "frozen wanderer", k=1)[0]
+        self.assertEqual((top['memory_type'], top['id']), ("semantic", concept_id))
+        
+        # Rows deleted behind the API's back drop out of results and are compacted on sync
+        with self.memory_api.get_connection() as conn:
+            conn.execute("DELETE FROM episodic_memory WHERE id = ?", (comet_id,))
+        self.assertNotIn(comet_id, [r['id'] for r in self.memory_api.similar_memories("test_agent", "comet", k=5)
+                                    if r['memory_type'] == "episodic"])
+        self.assertEqual(self.memory_api.sync_vector_index("test_agent"), {'removed': 1, 'added': 0})
+        self.assertEqual(self.memory_api.vector_index.count("test_agent"), 2)
+    
+    def test_embedding_matrix_persists_on_disk(self):
+        """Test that an on-disk matrix is reopened, and rebuilt from BLOBs when lost"""
+        import shutil
+        data_dir = tempfile.mkdtemp()
+        db_path = os.path.join(data_dir, "memories.db")
+        try:
+            disk_api = MemoryAPI(db_path)
+            ids = disk_api.store_procedural_memory_batch("agent_a", [
+                {'skill_name': f"skill {i}", 'skill_type': "craft", 'procedure_steps': [f"step {i}"]}
+                for i in range(5)
+            ])
+            disk_api.close()
+            self.assertTrue(os.path.isdir(os.path.join(data_dir, "memories.vectors")))
+            
+            disk_api = MemoryAPI(db_path)
+            self.assertEqual(disk_api.vector_index.count("agent_a"), 5)
+            self.assertEqual(disk_api.similar_memories("agent_a", "skill 3", k=1)[0]['id'], ids[3])
+            disk_api.close()
+            
+            shutil.rmtree(os.path.join(data_dir, "memories.vectors"))
+            disk_api = MemoryAPI(db_path)
+            self.assertEqual(disk_api.similar_memories("agent_a", "skill 3", k=1)[0]['id'], ids[3])
+            self.assertEqual(disk_api.rebuild_vector_index("agent_a"), {'removed': 0, 'added': 5})
+            disk_api.close()
+        finally:
+            shutil.rmtree(data_dir)
+    
+    def test_embedding_matrix_shared_between_processes(self):
+        """Test that matrix writers share a file lock, see each other's writes and skip rolled-back rows"""
+        import fcntl
+        import shutil
+        from memory.vectors import VectorIndex
+        index_dir = tempfile.mkdtemp()
+        try:
+            first, second = VectorIndex(index_dir, 8), VectorIndex(index_dir, 8)
+            vectors = np.eye(8, dtype=np.float32)
+            self.assertEqual(second.count("agent_a"), 0)
+            first.upsert("agent_a", 1, [1, 2], vectors[:2])
+            self.assertEqual(second.count("agent_a"), 2)
+            second.upsert("agent_a", 1, [3], vectors[2:3])
+            self.assertEqual(first.count("agent_a"), 3)
+            first.retain("agent_a", {1: np.array([2, 3])})
+            self.assertEqual(second.count("agent_a"), 2)
+            self.assertEqual(second.search("agent_a", vectors[2], 1), [(1, 3, 1.0)])
+            
+            # Writers hold an exclusive lock on the agent's lock file
+            with first._agent("agent_a").locked() as agent, open(agent.lock_path, 'a+b') as handle:
+                with self.assertRaises(BlockingIOError):
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            first.close()
+            second.close()
+        finally:
+            shutil.rmtree(index_dir)
+        
+        # Vectors are indexed only once the store's transaction commits
+        count = self.memory_api.vector_index.count("test_agent")
+        with self.assertRaises(RuntimeError):
+            with self.memory_api.get_connection():
+                self.memory_api.store_episodic_memory("test_agent", "s", "note", "Never committed")
+                raise RuntimeError("rolled back")
+        self.assertEqual(self.memory_api.vector_index.count("test_agent"), count)
+        self.memory_api.store_episodic_memory("test_agent", "s", "note", "Committed")
+        self.assertEqual(self.memory_api.vector_index.count("test_agent"), count + 1)
+    
+    def test_hybrid_search_fuses_keyword_and_vector(self):
+        """Test reciprocal rank fusion of the keyword and similarity paths"""
+        both_id = self.memory_api.store_episodic_memory("test_agent", "s", "observation", "An icy comet observed", importance=0.8)
+        vector_id = self.memory_api.store_episodic_memory("test_agent", "s", "observation", "Comet sighting", importance=0.8)
+        faint_id = self.memory_api.store_episodic_memory("test_agent", "s", "observation", "Icy comet fragments", importance=0.05)
+        self.memory_api.store_episodic_memory("test_agent", "s", "cooking", "Baked sourdough bread", importance=0.8)
+        
+        keyword = self.memory_api.search_memories("test_agent", "icy comet", memory_types=["episodic"])
+        self.assertEqual([r['id'] for r in keyword], [both_id])
+        
+        hybrid = self.memory_api.search_memories("test_agent", "icy comet", memory_types=["episodic"], hybrid=True)
+        ids = [r['id'] for r in hybrid]
+        self.assertEqual(ids[:2], [both_id, vector_id])
+        self.assertNotIn(faint_id, ids)  # Below the importance threshold on either path
+        self.assertGreater(hybrid[0]['fusion_score'], hybrid[1]['fusion_score'])
+        scores = [r['relevance_score'] for r in hybrid]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        
+        timings = self.memory_api.get_search_timing_stats()
+        for stage in ('keyword', 'vector', 'fusion', 'total'):
+            self.assertEqual(timings[stage]['count'], 1)
+        self.assertGreaterEqual(timings['total']['last_ms'], timings['fusion']['last_ms'])
+    
+    def test_search_deadline_returns_flagged_partial_results(self):
+        """Test latency-budgeted search: priority order, partial flag and budget stats"""
+        for i in range(3):
+            self.memory_api.store_episodic_memory("test_agent", "s", "observation", f"Comet sighting {i}", importance=0.6)
+            self.memory_api.store_semantic_memory("test_agent", f"comet_{i}", "Icy comet body", importance=0.9)
+        self.memory_api.store_emotional_memory("test_agent", "comet flyby", "awe", 0.8, 0.7, 0.9)
+        
+        full = self.memory_api.search_memories("test_agent", "comet", limit=10)
+        budgeted = self.memory_api.search_memories("test_agent", "comet", limit=10, deadline_ms=60000)
+        self.assertFalse(budgeted.partial)
+        self.assertEqual(budgeted.searched, ('episodic', 'semantic', 'procedural', 'emotional'))
+        self.assertEqual([(r['memory_type'], r['id']) for r in budgeted], [(r['memory_type'], r['id']) for r in full])
+        
+        # A complete cached result answers in full whatever the budget
+        self.assertFalse(self.memory_api.search_memories("test_agent", "comet", limit=10, deadline_ms=0).partial)
+        
+        # An exhausted budget still searches the top-priority type, and is not cached
+        self.memory_api.config.SEARCH_PRIORITY = ('semantic', 'episodic', 'procedural', 'emotional')
+        for _ in range(2):
+            partial = self.memory_api.search_memories("test_agent", "comet", limit=5, deadline_ms=0)
+            self.assertTrue(partial.partial)
+            self.assertEqual(partial.searched, ('semantic',))
+            self.assertEqual({r['memory_type'] for r in partial}, {'semantic'})
+            self.assertEqual(len(partial), 3)
+        
+        hybrid = self.memory_api.search_memories("test_agent", "comet", limit=10, hybrid=True, deadline_ms=0)
+        self.assertTrue(hybrid.partial)
+        self.assertEqual(hybrid.searched, ('keyword:semantic',))
+        
+        # The budget reaches retrieval through the agent interface
+        interface = AgentMemoryInterface("test_agent", self.memory_api)
+        retrieved = interface.retrieve_relevant_memories("comet", deadline_ms=0)
+        self.assertTrue(retrieved.partial)
+        
+        stats = self.memory_api.get_search_budget_stats("test_agent")
+        self.assertEqual(stats['searches'], 6)
+        self.assertEqual(stats['budget_hits'], 4)
+        self.assertEqual(self.memory_api.get_search_budget_stats("other_agent")['searches'], 0)
+    
+    def test_budgeted_searches_do_not_wait_on_each_other(self):
+        """Test that concurrent searches with different budgets each answer on their own budget"""
+        import threading
+        
+        for i in range(3):
+            self.memory_api.store_episodic_memory("test_agent", "s", "observation", f"Comet sighting {i}")
+            self.memory_api.store_semantic_memory("test_agent", f"comet_{i}", "Icy comet body")
+        
+        started = threading.Event()
+        release = threading.Event()
+        search = self.memory_api._search_uncached
+        
+        def slow_search(*args):
+            if args[-1] is not None and args[-1] - time.perf_counter() > 1:  # The long budget
+                started.set()
+                release.wait(5)
+            return search(*args)
+        
+        self.memory_api._search_uncached = slow_search
+        long_results = []
+        thread = threading.Thread(target=lambda: long_results.append(
+            self.memory_api.search_memories("test_agent", "comet", limit=5, deadline_ms=60000)
+        ))
+        thread.start()
+        self.assertTrue(started.wait(5))
+        
+        # The short budget neither waits for the long search nor receives its result
+        short = self.memory_api.search_memories("test_agent", "comet", limit=5, deadline_ms=0)
+        self.assertTrue(short.partial)
+        self.assertTrue(thread.is_alive())
+        
+        release.set()
+        thread.join()
+        self.assertFalse(long_results[0].partial)
+        self.assertEqual(self.memory_api.get_search_cache_stats()['coalesced'], 0)
+    
+    def test_ivf_index_recall_tunable(self):
+        """Test IVF recall against brute force, tombstones, prefilter and persistence"""
+        rng = np.random.default_rng(7)
+        vectors = rng.normal(size=(4000, 32)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        importance = rng.random(4000)
+        
+        index = IVFIndex(32, train_threshold=1000)
+        index.add(range(1, 1001), vectors[:1000], importance[:1000])
+        self.assertTrue(index.needs_training)  # Inserts never cluster on their own
+        self.assertEqual(index.nlist, 0)
+        index.train()
+        for start in range(1000, 4000, 500):  # Later inserts go to their nearest list
+            index.add(range(start + 1, start + 501), vectors[start:start + 500], importance[start:start + 500])
+        self.assertFalse(index.needs_training)
+        self.assertEqual(index.nlist, 31)
+        
+        queries = rng.normal(size=(20, 32)).astype(np.float32)
+        exact = [set((np.argsort(-(vectors @ q))[:10] + 1).tolist()) for q in queries]
+        def recall(nprobe):
+            return np.mean([len(set(index.search(q, 10, nprobe)[0].tolist()) & e) / 10 for q, e in zip(queries, exact)])
+        self.assertLess(recall(1), recall(8))
+        self.assertEqual(recall(index.nlist), 1.0)
+        
+        # Tombstoned and low-importance rows are never returned
+        index.remove(range(1, 2001))
+        ids, scores = index.search(queries[0], 50, index.nlist, min_importance=0.5)
+        self.assertTrue((ids > 2000).all())
+        self.assertTrue((importance[ids - 1] >= 0.5).all())
+        self.assertTrue((np.diff(scores) <= 0).all())
+        
+        import shutil
+        index_dir = tempfile.mkdtemp()
+        path = os.path.join(index_dir, "index.ivf.npz")
+        try:
+            index.save(path)
+            loaded = IVFIndex.load(path, 32)
+            self.assertEqual(len(loaded), 2000)
+            np.testing.assert_array_equal(loaded.search(queries[0], 10, 4)[0], index.search(queries[0], 10, 4)[0])
+            self.assertEqual(len(IVFIndex.load(path, 64)), 0)  # Dimension change starts over
+        finally:
+            shutil.rmtree(index_dir)
+    
+    def test_approximate_similar_memories(self):
+        """Test ANN similarity search through the API and AgentMemoryInterface"""
+        comet_id = self.memory_api.store_episodic_memory(
+            "test_agent", "s", "observation", "The telescope tracked a bright comet", importance=0.9
+        )
+        faint_id = self.memory_api.store_episodic_memory(
+            "test_agent", "s", "observation", "A faint comet near the horizon", importance=0.1
+        )
+        self.memory_api.store_semantic_memory("test_agent", "comet", "An icy body with a tail", importance=0.8)
+        
+        results = self.memory_api.approximate_similar_memories("test_agent", "comet", k=5, importance_threshold=0.5)
+        self.assertEqual({(r['memory_type'], r['id']) for r in results} & {("episodic", faint_id)}, set())
+        self.assertIn(("episodic", comet_id), [(r['memory_type'], r['id']) for r in results])
+        self.assertEqual(
+            [r['id'] for r in results],
+            [r['id'] for r in sorted(results, key=lambda r: r['similarity'], reverse=True)]
+        )
+        
+        # Loaded indexes follow later writes and forgotten rows
+        later_id = self.memory_api.store_episodic_memory("test_agent", "s", "observation", "Comet tail glowing")
+        with self.memory_api.get_connection() as conn:
+            conn.execute("DELETE FROM episodic_memory WHERE id = ?", (comet_id,))
+        self.memory_api.sync_vector_index("test_agent")
+        ids = [r['id'] for r in self.memory_api.approximate_similar_memories(
+            "test_agent", "comet", k=5, memory_types=["episodic"]
+        )]
+        self.assertIn(later_id, ids)
+        self.assertNotIn(comet_id, ids)
+        
+        interface = AgentMemoryInterface("test_agent", self.memory_api)
+        retrieved = interface.retrieve_relevant_memories("icy tail", memory_types=["semantic"], approximate=True)
+        self.assertEqual(retrieved[0]['concept'], "comet")
+        self.assertIn('similarity', retrieved[0])
+        
+        # Writes past the threshold leave clustering to the next sync, after commit
+        ann_index = self.memory_api._ann_index("test_agent", "episodic")
+        ann_index.train_threshold = 4
+        indexed = len(ann_index)
+        with self.memory_api.get_connection():
+            self.memory_api.store_episodic_memory_batch("test_agent", [
+                {'session_id': "s", 'event_type': "observation", 'content': f"Comet sighting {i}"} for i in range(4)
+            ])
+            self.memory_api.sync_vector_index("test_agent")
+            self.assertEqual(len(ann_index), indexed)  # Indexed once the rows commit
+        self.assertTrue(ann_index.needs_training)
+        self.assertEqual(ann_index.nlist, 0)
+        self.memory_api.sync_vector_index("test_agent")
+        self.assertFalse(ann_index.needs_training)
+        self.assertGreater(ann_index.nlist, 0)
+
+    def test_quantized_embeddings_rerank_exactly(self):
+        """Test int8/binary embedding storage with exact re-ranking of quantized candidates"""
+        config = self.memory_api.config
+        config.EMBEDDING_QUANTIZATION = {**config.EMBEDDING_QUANTIZATION, 'episodic': 'int8', 'semantic': 'binary'}
+        dimension = config.EMBEDDING_DIMENSION
+        topics = ["comet", "telescope", "garden", "recipe", "harbor", "violin"]
+        texts = [f"{topics[i % 6]} note {i} about the {topics[(i * 5) % 6]} and {topics[(i * 7 + 1) % 6]}" for i in range(60)]
+        episodic_ids = self.memory_api.store_episodic_memory_batch("test_agent", [
+            {'session_id': "s", 'event_type': "note", 'content': text} for text in texts
+        ])
+        semantic_id = self.memory_api.store_semantic_memory("test_agent", "comet", "An icy body with a tail")
+
+        stats = self.memory_api.get_embedding_storage_stats()
+        self.assertEqual(stats['episodic']['bytes'], 60 * (dimension + 4))
+        self.assertEqual(stats['semantic']['bytes'], dimension // 8)
+        self.assertEqual(stats['episodic']['float32_bytes'], 60 * dimension * 4)
+
+        # Re-ranked similarities are the exact float cosine similarities
+        query = self.memory_api.embed_text("telescope comet")
+        exact = self.memory_api.embedder.embed_batch(f"note {text}" for text in texts) @ query
+        expected = [episodic_ids[i] for i in np.argsort(-exact, kind='stable')[:5]]
+        results = self.memory_api.similar_memories("test_agent", "telescope comet", k=5, memory_types=["episodic"])
+        self.assertEqual([r['id'] for r in results], expected)
+        self.assertAlmostEqual(results[0]['similarity'], float(exact.max()), places=5)
+
+        binary = self.memory_api.similar_memories("test_agent", "comet icy body tail", k=1, memory_types=["semantic"])
+        self.assertEqual(binary[0]['id'], semantic_id)
+
+        decoded = self.memory_api.get_embedding("episodic", episodic_ids[0])
+        original = self.memory_api.embed_text(f"note {texts[0]}")
+        self.assertGreater(float(decoded @ original) / np.linalg.norm(decoded), 0.99)
+
+        # The code index follows forgotten rows and keeps quantized types out of the float matrix
+        with self.memory_api.get_connection() as conn:
+            conn.execute("DELETE FROM episodic_memory WHERE id = ?", (expected[0],))
+        self.memory_api.sync_vector_index("test_agent")
+        ids = [r['id'] for r in self.memory_api.similar_memories("test_agent", "telescope comet", k=5)]
+        self.assertNotIn(expected[0], ids)
+        self.assertEqual(self.memory_api.vector_index.indexed_ids("test_agent", SEARCH_TYPE_CODES["episodic"]).size, 0)
+
+    def test_background_embedding_pipeline(self):
+        """Test backfilling NULL embeddings and the background worker with its content-hash cache"""
+        # Rows written before embeddings existed are filled by a backfill
+        with self.memory_api.get_connection() as conn:
+            legacy_id = conn.execute("""
+                INSERT INTO semantic_memory (agent_id, concept, definition) VALUES (?, ?, ?)
+            """, ("test_agent", "lighthouse", "A tower guiding ships")).lastrowid
+        self.assertEqual(self.memory_api.get_embedding_pipeline_stats()['pending'], 1)
+        self.assertEqual(self.memory_api.backfill_embeddings(), 1)
+        self.assertIsNotNone(self.memory_api.get_embedding("semantic", legacy_id))
+
+        # In background mode stores skip embedding and the worker fills them in
+        self.memory_api.config.EMBEDDING_BACKGROUND = True
+        memory_ids = self.memory_api.store_episodic_memory_batch("test_agent", [
+            {'session_id': "s", 'event_type': "interaction", 'content': "Response: ok"}
+            for _ in range(3)
+        ])
+        memory_ids.append(self.memory_api.store_episodic_memory(
+            "test_agent", "s", "interaction", "Response: the harbor is calm"
+        ))
+        self.memory_api.backfill_embeddings()
+
+        stats = self.memory_api.get_embedding_pipeline_stats()
+        self.assertEqual(stats['pending'], 0)
+        self.assertEqual(stats['lag_ms'], 0)
+        self.assertEqual(stats['embedded'], 5)
+        self.assertGreaterEqual(stats['cache']['hits'], 2)
+        for memory_id in memory_ids:
+            self.assertIsNotNone(self.memory_api.get_embedding("episodic", memory_id))
+        results = self.memory_api.similar_memories("test_agent", "harbor calm", k=1, memory_types=["episodic"])
+        self.assertEqual(results[0]['id'], memory_ids[-1])
+
+        # A batch whose rows were all edited meanwhile writes nothing but does not end the drain
+        batches = iter([(3, 0), (2, 2), (0, 0)])
+        worker = EmbeddingWorker(lambda: next(batches))
+        self.assertEqual(worker.drain(), 2)
+        self.assertEqual(worker.get_stats()['skipped'], 3)
+
 class TestMemoryConsolidator(unittest.TestCase):
     """Test cases for Memory Consolidator functionality"""
     
@@ -307,8 +1162,13 @@ class TestMemoryConsolidator(unittest.TestCase):
     
     def tearDown(self):
         """Clean up"""
+        import shutil
         self.consolidator.stop_scheduler()
-        os.unlink(self.test_db.name)
+        self.memory_api.close()
+        for path in (self.test_db.name, self.test_db.name + '-wal', self.test_db.name + '-shm'):
+            if os.path.exists(path):
+                os.unlink(path)
+        shutil.rmtree(self.memory_api.vector_index.directory, ignore_errors=True)
     
     def test_reflection_consolidation(self):
         """Test reflection-based consolidation"""
@@ -374,6 +1234,22 @@ class TestMemoryConsolidator(unittest.TestCase):
         self.assertIn('archived', cleanup_stats)
         self.assertIn('deleted', cleanup_stats)
     
+    def test_cleanup_compacts_embedding_matrix(self):
+        """Test that forgotten memories leave the embedding matrix"""
+        kept_id = self.memory_api.store_episodic_memory("test_agent", "s", "test", "Kept memory", importance=0.9)
+        forgotten_id = self.memory_api.store_episodic_memory("test_agent", "s", "test", "Faded memory", importance=0.01)
+        with self.memory_api.get_connection() as conn:
+            conn.execute(
+                "UPDATE episodic_memory SET created_at_ms = 0 WHERE id = ?", (forgotten_id,)
+            )
+        self.assertEqual(self.memory_api.vector_index.count("test_agent"), 2)
+        
+        self.consolidator.cleanup_agent_memories("test_agent")
+        
+        self.assertEqual(self.memory_api.vector_index.count("test_agent"), 1)
+        results = self.memory_api.similar_memories("test_agent", "memory", k=5)
+        self.assertEqual([r['id'] for r in results], [kept_id])
+    
     def test_memory_statistics(self):
         """Test memory statistics generation"""
         # Create some test data
@@ -414,6 +1290,588 @@ class TestMemoryConsolidator(unittest.TestCase):
         self.consolidator.stop_scheduler()
         self.assertFalse(self.consolidator.is_running)
 
+class TestConnectionPool(unittest.TestCase):
+    """Test cases for pooled database connections"""
+
+    def setUp(self):
+        """Set up test database and API"""
+        self.test_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        self.test_db.close()
+
+        self.memory_api = MemoryAPI(self.test_db.name)
+
+        with self.memory_api.get_connection() as conn:
+            conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, value TEXT)")
+
+    def tearDown(self):
+        """Clean up"""
+        self.memory_api.close()
+        os.unlink(self.test_db.name)
+
+    def test_connection_reused_within_thread(self):
+        """Test that a thread keeps one initialized connection"""
+        with self.memory_api.get_connection() as first:
+            pass
+        with self.memory_api.get_connection() as second:
+            pass
+
+        self.assertIs(first, second)
+        stats = self.memory_api.get_pool_stats()
+        self.assertEqual(stats['connections_created'], 1)
+        self.assertGreaterEqual(stats['acquisitions'], 3)
+
+    def test_connection_per_thread(self):
+        """Test that each thread gets its own connection"""
+        import threading
+
+        def worker():
+            with self.memory_api.get_connection() as conn:
+                conn.execute("INSERT INTO items (value) VALUES ('thread')")
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with self.memory_api.get_connection() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+        self.assertEqual(count, 3)
+        self.assertEqual(self.memory_api.get_pool_stats()['connections_created'], 4)
+
+    def test_nested_blocks_share_transaction(self):
+        """Test that only the outermost block commits or rolls back"""
+        with self.assertRaises(RuntimeError):
+            with self.memory_api.get_connection() as outer:
+                outer.execute("INSERT INTO items (value) VALUES ('outer')")
+                with self.memory_api.get_connection() as inner:
+                    inner.execute("INSERT INTO items (value) VALUES ('inner')")
+                raise RuntimeError("abort")
+
+        with self.memory_api.get_connection() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+        self.assertEqual(count, 0)
+
+    def test_fork_resets_connections(self):
+        """Test that a changed process id discards inherited connections"""
+        with self.memory_api.get_connection() as before:
+            pass
+
+        # Simulate running in a forked child
+        self.memory_api.pool._pid = -1
+
+        with self.memory_api.get_connection() as after:
+            after.execute("INSERT INTO items (value) VALUES ('child')")
+
+        self.assertIsNot(before, after)
+        self.assertEqual(self.memory_api.get_pool_stats()['fork_resets'], 1)
+
+        # Not actually forked, so the parked connection is safe to close here
+        before.close()
+
+    def test_read_lane_is_read_only(self):
+        """Test that read connections reject writes"""
+        with self.memory_api.get_read_connection() as conn:
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO items (value) VALUES ('read')")
+
+    def test_read_lane_does_not_wait_on_writer(self):
+        """Test that reads see the last commit while another thread holds the write lock"""
+        import threading
+
+        with self.memory_api.get_connection() as conn:
+            conn.execute("INSERT INTO items (value) VALUES ('committed')")
+
+        locked = threading.Event()
+        release = threading.Event()
+
+        def writer():
+            with self.memory_api.get_connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("INSERT INTO items (value) VALUES ('pending')")
+                locked.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        locked.wait(5)
+        try:
+            with self.memory_api.get_read_connection() as conn:
+                values = [row['value'] for row in conn.execute("SELECT value FROM items")]
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(values, ['committed'])
+
+    def test_read_inside_write_block_sees_uncommitted_rows(self):
+        """Test that reads nested in a write block use the write connection"""
+        with self.memory_api.get_connection() as writer:
+            writer.execute("INSERT INTO items (value) VALUES ('uncommitted')")
+            with self.memory_api.get_read_connection() as reader:
+                self.assertIs(reader, writer)
+                count = reader.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+        self.assertEqual(count, 1)
+        self.assertEqual(self.memory_api.get_read_pool_stats()['checkouts'], 0)
+
+    def test_read_pool_is_bounded(self):
+        """Test that concurrent readers share at most READ_POOL_SIZE connections"""
+        import threading
+
+        barrier = threading.Barrier(8)
+
+        def reader():
+            barrier.wait()
+            for _ in range(20):
+                with self.memory_api.get_read_connection() as conn:
+                    conn.execute("SELECT COUNT(*) FROM items").fetchone()
+
+        threads = [threading.Thread(target=reader) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = self.memory_api.get_read_pool_stats()
+        self.assertLessEqual(stats['connections_created'], MemoryConfig.READ_POOL_SIZE)
+        self.assertEqual(stats['checkouts'], 160)
+
+class TestWriteQueue(unittest.TestCase):
+    """Test cases for the group-commit write queue"""
+
+    def setUp(self):
+        """Set up test database and queued API"""
+        self.test_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        self.test_db.close()
+
+        self.memory_api = MemoryAPI(self.test_db.name, use_write_queue=True)
+
+        with self.memory_api.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE agents (
+                    agent_id TEXT PRIMARY KEY,
+                    name TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            from schemas.memory_models import MemorySchema
+            for sql in MemorySchema.get_create_tables_sql():
+                cursor.execute(sql)
+
+            cursor.execute("""
+                INSERT INTO agents (agent_id, name) VALUES ('test_agent', 'Test Agent')
+            """)
+
+    def tearDown(self):
+        """Clean up"""
+        self.memory_api.close()
+        os.unlink(self.test_db.name)
+
+    def test_concurrent_writes_are_batched(self):
+        """Test that writes from many threads share commits and keep their ids"""
+        import threading
+
+        ids = []
+        ids_lock = threading.Lock()
+
+        def worker(worker_id):
+            for i in range(10):
+                memory_id = self.memory_api.add_to_working_memory(
+                    agent_id="test_agent",
+                    session_id=f"session_{worker_id}",
+                    content_type="perception",
+                    content=f"Worker {worker_id} item {i}",
+                    capacity_weight=0.1
+                )
+                with ids_lock:
+                    ids.append(memory_id)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(ids), 80)
+        self.assertEqual(len(set(ids)), 80)
+
+        with self.memory_api.get_connection() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM working_memory").fetchone()[0]
+        self.assertEqual(count, 80)
+
+        stats = self.memory_api.get_write_queue_stats()
+        self.assertEqual(stats['operations'], 80)
+        self.assertLess(stats['batches'], 80)
+
+    def test_failed_write_does_not_abort_batch(self):
+        """Test that one failing write only fails its own caller"""
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.memory_api.store_semantic_memory(
+                agent_id="test_agent",
+                concept="broken",
+                definition=None
+            )
+
+        memory_id = self.memory_api.store_semantic_memory(
+            agent_id="test_agent",
+            concept="working",
+            definition="Stored after a failed write"
+        )
+
+        memories = self.memory_api.retrieve_semantic_memory("test_agent")
+        self.assertEqual([m['id'] for m in memories], [memory_id])
+        self.assertEqual(self.memory_api.get_write_queue_stats()['failed_operations'], 1)
+
+    def test_stop_flushes_pending_writes(self):
+        """Test that stopping the queue commits already submitted writes"""
+        write_queue = self.memory_api.write_queue
+        futures = [
+            write_queue.submit(
+                self.memory_api.store_procedural_memory,
+                agent_id="test_agent",
+                skill_name=f"skill_{i}",
+                skill_type="cognitive",
+                procedure_steps=["step"]
+            )
+            for i in range(5)
+        ]
+
+        write_queue.stop()
+
+        self.assertTrue(all(f.done() for f in futures))
+        self.assertEqual(len({f.result() for f in futures}), 5)
+
+class TestInMemoryStorage(unittest.TestCase):
+    """Test cases for the in-memory storage backend"""
+
+    def setUp(self):
+        """Set up an in-memory database"""
+        self.memory_api = MemoryAPI(self.id(), storage="memory")
+
+    def tearDown(self):
+        """Clean up"""
+        self.memory_api.close()
+
+    def test_connections_share_database(self):
+        """Test that pooled and read-only connections on other threads see the same data"""
+        import threading
+
+        memory_id = self.memory_api.store_episodic_memory("agent_a", "s", "conversation", "In RAM")
+        results = []
+
+        thread = threading.Thread(
+            target=lambda: results.append(self.memory_api.retrieve_episodic_memories("agent_a"))
+        )
+        thread.start()
+        thread.join()
+
+        self.assertEqual([m['id'] for m in results[0]], [memory_id])
+        with self.memory_api.get_read_connection() as conn:
+            self.assertRaises(sqlite3.OperationalError, conn.execute,
+                              "DELETE FROM episodic_memory")
+
+    def test_store_search_and_consolidate(self):
+        """Test the core store, search and consolidation paths on the memdb backend"""
+        for i in range(5):
+            self.memory_api.store_episodic_memory("agent_a", "s", "conversation", f"Comet talk {i}", importance=0.6)
+        self.memory_api.store_semantic_memory("agent_a", "comet", "An icy body with a tail")
+        
+        results = self.memory_api.search_memories("agent_a", "comet", limit=10)
+        self.assertEqual(len(results), 6)
+        self.assertEqual(self.memory_api.similar_memories("agent_a", "icy body tail", k=1)[0]['concept'], "comet")
+        
+        consolidator = MemoryConsolidator(self.memory_api)
+        try:
+            stats = consolidator.consolidate_agent_memories("agent_a", "reflection")
+        finally:
+            consolidator.stop_scheduler()
+        self.assertGreater(stats.memories_processed, 0)
+    
+    def test_database_freed_on_close(self):
+        """Test that closing the API discards an in-memory database"""
+        self.memory_api.store_episodic_memory("agent_a", "s", "conversation", "Gone")
+        self.memory_api.close()
+
+        self.memory_api = MemoryAPI(self.id(), storage="memory")
+        self.assertEqual(self.memory_api.retrieve_episodic_memories("agent_a"), [])
+
+    def test_spill_to_disk(self):
+        """Test that spilling writes a usable on-disk copy"""
+        self.memory_api.store_semantic_memory("agent_a", "gravity", "Things fall", "physics")
+        target_dir = tempfile.mkdtemp()
+        target = os.path.join(target_dir, "spilled.db")
+
+        self.memory_api.spill_to_disk(target)
+
+        disk_api = MemoryAPI(target)
+        try:
+            memories = disk_api.retrieve_semantic_memory("agent_a", concept="gravity")
+            self.assertEqual(len(memories), 1)
+        finally:
+            disk_api.close()
+            import shutil
+            shutil.rmtree(target_dir)
+
+    def test_unknown_storage_rejected(self):
+        """Test that an unsupported backend name fails fast"""
+        with self.assertRaises(ValueError):
+            MemoryAPI(self.id(), storage="redis")
+
+class TestShardedMemoryAPI(unittest.TestCase):
+    """Test cases for per-agent database sharding"""
+
+    def setUp(self):
+        """Set up a shard directory"""
+        self.shard_dir = tempfile.mkdtemp()
+        self.sharded = ShardedMemoryAPI(self.shard_dir)
+
+    def tearDown(self):
+        """Clean up"""
+        import shutil
+        self.sharded.close()
+        shutil.rmtree(self.shard_dir)
+
+    def test_agents_routed_to_separate_files(self):
+        """Test that each agent's memories land in its own shard"""
+        for agent_id in ["agent_a", "agent_b"]:
+            self.sharded.store_episodic_memory(
+                agent_id, "session_1", "conversation", f"Memory of {agent_id}"
+            )
+
+        self.assertNotEqual(
+            self.sharded.for_agent("agent_a").db_path,
+            self.sharded.for_agent("agent_b").db_path
+        )
+        self.assertEqual(len(self.sharded.router.list_shards()), 2)
+
+        memories = self.sharded.retrieve_episodic_memories("agent_a")
+        self.assertEqual([m['content'] for m in memories], ["Memory of agent_a"])
+
+    def test_drop_agent_removes_shard(self):
+        """Test that deleting an agent drops its file and leaves others intact"""
+        self.sharded.store_episodic_memory("agent_a", "s", "conversation", "A")
+        self.sharded.store_episodic_memory("agent_b", "s", "conversation", "B")
+        shard_path = self.sharded.for_agent("agent_a").db_path
+
+        vector_dir = self.sharded.for_agent("agent_a").vector_index.directory
+        self.assertTrue(vector_dir.exists())
+
+        self.assertTrue(self.sharded.drop_agent("agent_a"))
+        self.assertFalse(os.path.exists(shard_path))
+        self.assertFalse(vector_dir.exists())
+        self.assertEqual(len(self.sharded.retrieve_episodic_memories("agent_b")), 1)
+        self.assertFalse(self.sharded.drop_agent("agent_a"))
+
+    def test_drop_agent_from_bucket_retires_cached_results(self):
+        """Test that dropping a bucketed agent clears its cached searches and vectors"""
+        self.sharded.close()
+        self.sharded = ShardedMemoryAPI(self.shard_dir, buckets=2)
+        self.sharded.store_episodic_memory("agent_a", "s", "conversation", "Sailing at dawn")
+        self.assertEqual(len(self.sharded.search_memories("agent_a", "sailing")), 1)
+        self.assertEqual(len(self.sharded.similar_memories("agent_a", "sailing at dawn")), 1)
+
+        self.assertTrue(self.sharded.drop_agent("agent_a"))
+        self.assertEqual(self.sharded.search_memories("agent_a", "sailing"), [])
+        self.assertEqual(self.sharded.similar_memories("agent_a", "sailing at dawn"), [])
+
+    def test_hash_buckets_are_stable(self):
+        """Test that bucketed routing is deterministic and bounded"""
+        router = ShardRouter(self.shard_dir, buckets=4)
+        paths = {router.shard_for(f"agent_{i}") for i in range(50)}
+
+        self.assertLessEqual(len(paths), 4)
+        self.assertEqual(router.shard_for("agent_7"), ShardRouter(self.shard_dir, buckets=4).shard_for("agent_7"))
+
+    def test_map_shards_runs_per_shard(self):
+        """Test that an operation runs once against every shard"""
+        for agent_id in ["agent_a", "agent_b", "agent_c"]:
+            self.sharded.store_semantic_memory(agent_id, "concept", "definition", "general")
+
+        def count_semantic(memory_api):
+            with memory_api.get_read_connection() as conn:
+                return conn.execute("SELECT COUNT(*) FROM semantic_memory").fetchone()[0]
+
+        counts = self.sharded.map_shards(count_semantic)
+
+        self.assertEqual(sorted(counts.values()), [1, 1, 1])
+
+    def test_migrate_single_file_to_shards(self):
+        """Test that the migration tool splits a shared database by agent"""
+        source_db = os.path.join(self.shard_dir, "lexos.db")
+        source_api = MemoryAPI(source_db)
+        first = source_api.store_episodic_memory("agent_a", "s", "conversation", "First")
+        second = source_api.store_episodic_memory("agent_a", "s", "conversation", "Second")
+        source_api.store_episodic_memory("agent_b", "s", "conversation", "Other")
+        source_api.create_memory_association("agent_a", first, "episodic", second, "episodic", "causal")
+        source_api.close()
+
+        copied = migrate_to_shards(source_db, os.path.join(self.shard_dir, "shards"))
+
+        self.assertEqual(set(copied), {"agent_a", "agent_b"})
+        sharded = ShardedMemoryAPI(os.path.join(self.shard_dir, "shards"))
+        try:
+            associated = sharded.find_associated_memories("agent_a", first, "episodic")
+            self.assertIn(second, [a['related_memory_id'] for a in associated])
+            self.assertEqual(len(sharded.retrieve_episodic_memories("agent_b")), 1)
+        finally:
+            sharded.close()
+
+    def test_ephemeral_agent_stays_in_memory(self):
+        """Test that ephemeral agents never create a shard file"""
+        self.sharded.ephemeral_agents.add("scratch")
+        self.sharded.store_episodic_memory("scratch", "s", "conversation", "Temporary")
+        self.sharded.store_episodic_memory("agent_a", "s", "conversation", "Durable")
+
+        self.assertEqual(self.sharded.for_agent("scratch").storage, "memory")
+        self.assertEqual(len(self.sharded.router.list_shards()), 1)
+        self.assertEqual(len(self.sharded.retrieve_episodic_memories("scratch")), 1)
+        self.assertEqual(len(self.sharded.map_shards(lambda memory_api: None)), 2)
+
+        self.assertTrue(self.sharded.drop_agent("scratch"))
+        self.assertEqual(self.sharded.retrieve_episodic_memories("scratch"), [])
+
+    def test_spill_ephemeral_agent(self):
+        """Test that spilling moves an ephemeral agent's memories to its shard"""
+        sharded = ShardedMemoryAPI(self.shard_dir, ephemeral_agents=["scratch"])
+        try:
+            first = sharded.store_episodic_memory("scratch", "s", "conversation", "First")
+            second = sharded.store_episodic_memory("scratch", "s", "conversation", "Second")
+            sharded.create_memory_association("scratch", first, "episodic", second, "episodic", "causal")
+
+            self.assertGreaterEqual(sharded.spill_agent("scratch"), 3)
+
+            self.assertNotIn("scratch", sharded.ephemeral_agents)
+            self.assertTrue(os.path.exists(sharded.for_agent("scratch").db_path))
+            self.assertEqual(len(sharded.retrieve_episodic_memories("scratch")), 2)
+            associated = sharded.find_associated_memories("scratch", first, "episodic")
+            self.assertIn(second, [a['related_memory_id'] for a in associated])
+            self.assertRaises(ValueError, sharded.spill_agent, "scratch")
+        finally:
+            sharded.close()
+
+class TestAsyncMemoryAPI(unittest.TestCase):
+    """Test cases for the asyncio facade"""
+
+    def setUp(self):
+        """Set up test database and async API"""
+        self.test_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        self.test_db.close()
+        self.memory_api = MemoryAPI(self.test_db.name)
+
+    def tearDown(self):
+        """Clean up"""
+        self.memory_api.close()
+        os.unlink(self.test_db.name)
+
+    def test_awaitable_store_and_search(self):
+        """Test that async methods match the synchronous API"""
+        async def scenario():
+            async with AsyncMemoryAPI(self.memory_api) as async_api:
+                await async_api.store_episodic_memory(
+                    "test_agent", "session_1", "conversation", "Async memory about tides", importance=0.8
+                )
+                await async_api.store_semantic_memory(
+                    "test_agent", "tides", "Rise and fall of sea levels about tides", "science", importance=0.8
+                )
+                return await async_api.search_memories("test_agent", "tides")
+
+        results = asyncio.run(scenario())
+        expected = self.memory_api.search_memories("test_agent", "tides")
+
+        self.assertEqual(
+            [(r['memory_type'], r['id']) for r in results],
+            [(r['memory_type'], r['id']) for r in expected]
+        )
+
+    def test_async_budgeted_search(self):
+        """Test that latency-budgeted searches pass through the async facade"""
+        async def scenario():
+            async with AsyncMemoryAPI(self.memory_api) as async_api:
+                await async_api.store_semantic_memory("test_agent", "tides", "Sea levels rise and fall with tides")
+                full = await async_api.search_memories("test_agent", "tides", deadline_ms=60000)
+                cut = await async_api.search_memories(
+                    "test_agent", "tides", limit=5, parallel=False, deadline_ms=0
+                )
+                return full, cut
+
+        full, cut = asyncio.run(scenario())
+        self.assertFalse(full.partial)
+        self.assertEqual(full.searched, ('episodic', 'semantic', 'procedural', 'emotional'))
+        self.assertTrue(cut.partial)
+        self.assertEqual(cut.searched, ('episodic',))
+
+    def test_async_decision(self):
+        """Test that the async interface gathers decision context and records the decision"""
+        async def scenario():
+            async with AsyncMemoryAPI(self.memory_api) as async_api:
+                interface = AsyncAgentMemoryInterface("test_agent", async_api)
+                await interface.start_session("session_1")
+                decision = await interface.make_decision("weather", ["stay", "go"])
+                await interface.end_session()
+                return decision
+
+        decision = asyncio.run(scenario())
+
+        self.assertIn(decision['selected_option'], ["stay", "go"])
+        memories = self.memory_api.retrieve_episodic_memories("test_agent", event_type="decision")
+        self.assertEqual(len(memories), 1)
+
+    def test_sub_searches_run_concurrently(self):
+        """Test that the four per-type searches overlap"""
+        import threading
+
+        barrier = threading.Barrier(4, timeout=5)
+
+        def slow(search):
+            def wrapper(*args, **kwargs):
+                barrier.wait()  # Raises if the searches were run one at a time
+                return search(*args, **kwargs)
+            return wrapper
+
+        self.memory_api._ranked_search = slow(self.memory_api._ranked_search)
+
+        async def scenario():
+            async with AsyncMemoryAPI(self.memory_api) as async_api:
+                return await async_api.search_memories("test_agent", "anything")
+
+        self.assertEqual(asyncio.run(scenario()), [])
+
+    def test_timeout_and_cancellation(self):
+        """Test that timed-out calls raise and queued cancelled calls never run"""
+        import threading
+
+        release = threading.Event()
+        ran = []
+
+        def blocking():
+            release.wait(5)
+            ran.append("blocking")
+
+        def queued():
+            ran.append("queued")
+
+        async def scenario():
+            async_api = AsyncMemoryAPI(self.memory_api, max_workers=1, timeout=0.05)
+            with self.assertRaises(asyncio.TimeoutError):
+                await async_api.run(blocking)
+
+            async_api.timeout = None
+            task = asyncio.ensure_future(async_api.run(queued))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            release.set()
+            await async_api.close()
+
+        asyncio.run(scenario())
+        self.assertEqual(ran, ["blocking"])
+
 class TestMemoryIntegration(unittest.TestCase):
     """Integration tests for the complete memory system"""
     
@@ -455,6 +1913,7 @@ class TestMemoryIntegration(unittest.TestCase):
     
     def tearDown(self):
         """Clean up"""
+        self.memory_api.close()
         os.unlink(self.test_db.name)
     
     def test_complete_memory_lifecycle(self):
@@ -542,6 +2001,7 @@ class TestMemoryIntegration(unittest.TestCase):
         new_memory_api = MemoryAPI(self.test_db.name)
         retrieved_memories = new_memory_api.retrieve_episodic_memories(agent_id)
         self.assertGreater(len(retrieved_memories), 0)
+        new_memory_api.close()
         
         print(f"Integration test completed successfully:")
         print(f"- Created {len(retrieved_memories)} episodic memories")
@@ -0,0 +1,384 @@
+
+"""
+Query Plan Regression Tests for LexOS Memory System
+Checks EXPLAIN QUERY PLAN for every statement issued by the memory layer
+"""
+
+import re
+import os
+import itertools
+import tempfile
+import unittest
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from memory.api import MemoryAPI
+from memory.consolidator import MemoryConsolidator
+from memory.integration import AgentMemoryInterface
+from schemas.memory_models import MemorySchema
+
+# Tables that are expected to be reached through an index
+INDEXED_TABLES = {
+    'episodic_memory', 'semantic_memory', 'procedural_memory', 'emotional_memory',
+    'working_memory', 'memory_associations', 'memory_consolidation'
+}
+
+# Plans that are accepted despite a scan or temp B-tree, keyed by a regex over
+# the normalized statement, with the reason the cost is bounded
+ALLOWED_PLANS = {
+    r"^SELECT DISTINCT agent_id FROM agents": (
+        "agents is the small registry table, read once per scheduler run"
+    ),
+    r"FROM memory_associations ma WHERE ma\.agent_id = .* ORDER BY ma\.strength DESC": (
+        "sorts only the associations of a single memory, found through the "
+        "memory1/memory2 indexes"
+    ),
+    r"^SELECT id, importance, confidence FROM semantic_memory WHERE id IN": (
+        "sorts the two rows of a merge candidate pair"
+    ),
+    r"^SELECT s1\.id as parent_id, s2\.id as child_id": (
+        "joins one agent's semantic memories on category = concept"
+    ),
+    r"SELECT DISTINCT memory1_id FROM memory_associations": (
+        "DISTINCT/UNION over one agent's strong associations"
+    ),
+    r"FROM working_memory WHERE agent_id = .* AND session_id = .* ORDER BY priority": (
+        "a session's working memory is capped at WORKING_MEMORY_CAPACITY items"
+    ),
+    r"^SELECT \* FROM procedural_memory WHERE agent_id = .* ORDER BY proficiency_level DESC, success_rate DESC": (
+        "proficiency order comes from the index; only ties are sorted by success rate"
+    ),
+    r"^SELECT emotion_type, coping_strategy, COUNT\(\*\)": (
+        "sleep consolidation aggregate over one agent's resolved emotional memories"
+    ),
+    r"^SELECT m\.\* FROM \w+_memory_fts f CROSS JOIN": (
+        "sorts only the rows the full-text index matched"
+    ),
+    r"FROM \(SELECT rowid AS id FROM \w+_memory_trigram WHERE": (
+        "sorts only the rows the trigram index matched for a substring lookup"
+    ),
+}
+
+SCAN_PATTERN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+TEMP_BTREE_PATTERN = re.compile(r"USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT|RIGHT PART OF ORDER BY)")
+
+AGENTS = ["agent_alpha", "agent_beta", "agent_gamma"]
+SESSIONS = [f"session_{i}" for i in range(6)]
+EVENT_TYPES = ["conversation", "task", "observation", "learning"]
+CATEGORIES = ["science", "language", "tools", "people"]
+EMOTIONS = ["joy", "curiosity", "anxiety", "frustration", "contentment"]
+
+class QueryRecorder:
+    """Collects the statements a connection executes, tagged with a label"""
+
+    def __init__(self):
+        self.statements: Dict[str, str] = {}
+        self._label = "setup"
+
+    @contextmanager
+    def label(self, label: str):
+        previous, self._label = self._label, label
+        try:
+            yield
+        finally:
+            self._label = previous
+
+    def __call__(self, statement: str):
+        sql = " ".join(statement.split())
+        # Statements run by triggers are reported with a leading comment
+        if sql.startswith("--"):
+            return
+        if re.match(r"^(SELECT|UPDATE|DELETE|INSERT|WITH)\b", sql, re.IGNORECASE):
+            self.statements.setdefault(sql, self._label)
+
+class TestQueryPlans(unittest.TestCase):
+    """Fails when a memory query falls back to a full scan or temp sort"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Seed a multi-agent database and record every statement the memory layer runs"""
+        cls.test_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        cls.test_db.close()
+
+        cls.memory_api = MemoryAPI(cls.test_db.name)
+        cls.consolidator = MemoryConsolidator(cls.memory_api)
+
+        with cls.memory_api.get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE agents (
+                    agent_id TEXT PRIMARY KEY,
+                    name TEXT,
+                    status TEXT DEFAULT 'active',
+                    last_active DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            for sql in MemorySchema.get_create_tables_sql():
+                conn.execute(sql)
+            conn.executemany(
+                "INSERT INTO agents (agent_id, name) VALUES (?, ?)",
+                [(agent_id, agent_id.title()) for agent_id in AGENTS]
+            )
+
+        for agent_id in AGENTS:
+            cls._seed_agent(agent_id)
+
+        cls.memory_api.flush_access_tracking()
+        cls.memory_api.optimize_database(full_analyze=True)
+
+        # The workload runs on this thread, which only ever holds one write
+        # connection and reuses the same idle read-only connection
+        cls.recorder = QueryRecorder()
+        connections = []
+        with cls.memory_api.get_connection() as conn:
+            connections.append(conn)
+        with cls.memory_api.get_read_connection() as conn:
+            connections.append(conn)
+
+        for conn in connections:
+            conn.set_trace_callback(cls.recorder)
+        try:
+            cls._run_workload(AGENTS[0])
+        finally:
+            for conn in connections:
+                conn.set_trace_callback(None)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up"""
+        cls.memory_api.close()
+        os.unlink(cls.test_db.name)
+
+    @classmethod
+    def _seed_agent(cls, agent_id: str):
+        """Store a realistic spread of memories for one agent"""
+        api = cls.memory_api
+
+        episodic_ids = api.store_episodic_memory_batch(agent_id, [
+            {
+                'session_id': SESSIONS[i % len(SESSIONS)],
+                'event_type': EVENT_TYPES[i % len(EVENT_TYPES)],
+                'content': f"Event {i} about topic {i % 17} for {agent_id}",
+                'importance': (i % 10) / 10.0,
+                'emotional_valence': ((i % 7) - 3) / 3.0,
+                'emotional_intensity': (i % 5) / 5.0
+            }
+            for i in range(400)
+        ])
+
+        api.store_semantic_memory_batch(agent_id, [
+            {
+                'concept': f"concept_{i}",
+                'definition': f"Definition of concept {i} in {CATEGORIES[i % len(CATEGORIES)]}",
+                'category': CATEGORIES[i % len(CATEGORIES)],
+                'subcategory': f"sub_{i % 3}",
+                'confidence': (i % 10) / 10.0,
+                'importance': ((i * 7) % 10) / 10.0
+            }
+            for i in range(120)
+        ])
+
+        api.store_procedural_memory_batch(agent_id, [
+            {
+                'skill_name': f"skill_{i}",
+                'skill_type': ["analysis", "communication", "planning"][i % 3],
+                'procedure_steps': [f"step {j} of skill {i}" for j in range(3)],
+                'proficiency_level': (i % 10) / 10.0
+            }
+            for i in range(40)
+        ])
+
+        emotional_ids = api.store_emotional_memory_batch(agent_id, [
+            {
+                'trigger_stimulus': f"stimulus {i % 23}",
+                'emotion_type': EMOTIONS[i % len(EMOTIONS)],
+                'valence': ((i % 9) - 4) / 4.0,
+                'arousal': (i % 4) / 4.0,
+                'intensity': (i % 10) / 10.0
+            }
+            for i in range(150)
+        ])
+
+        for i in range(0, 200, 5):
+            api.create_memory_association(
+                agent_id, episodic_ids[i], 'episodic',
+                emotional_ids[i % len(emotional_ids)], 'emotional',
+                'emotional', strength=0.4 + (i % 6) / 10.0
+            )
+
+        for i in range(5):
+            api.add_to_working_memory(
+                agent_id, SESSIONS[0], "context", f"Working item {i}", priority=i / 5.0
+            )
+
+        for consolidation_type in ["reflection", "sleep"]:
+            api.start_memory_consolidation(agent_id, consolidation_type)
+
+    @classmethod
+    def _run_workload(cls, agent_id: str):
+        """Call every public query path, covering each dynamic filter combination"""
+        api = cls.memory_api
+        record = cls.recorder.label
+
+        for session_id, event_type, include_emotional, threshold in itertools.product(
+            [None, SESSIONS[1]], [None, "task"], [False, True], [0.0, 0.7]
+        ):
+            with record(f"retrieve_episodic_memories({session_id}, {event_type}, {include_emotional})"):
+                api.retrieve_episodic_memories(
+                    agent_id, session_id=session_id, event_type=event_type,
+                    importance_threshold=threshold, include_emotional=include_emotional
+                )
+
+        for concept, category, threshold in itertools.product(
+            [None, "concept_1"], [None, "science"], [0.0, 0.5]
+        ):
+            with record(f"retrieve_semantic_memory({concept}, {category})"):
+                api.retrieve_semantic_memory(
+                    agent_id, concept=concept, category=category, confidence_threshold=threshold
+                )
+
+        for emotion_type, trigger_pattern in itertools.product([None, "joy"], [None, "stimulus 1"]):
+            with record(f"retrieve_emotional_patterns({emotion_type}, {trigger_pattern})"):
+                api.retrieve_emotional_patterns(
+                    agent_id, emotion_type=emotion_type, trigger_pattern=trigger_pattern
+                )
+
+        for memory_type in ["episodic", "semantic", "procedural", "emotional"]:
+            with record(f"page_memories({memory_type})"):
+                page = api.page_memories(agent_id, memory_type, page_size=25)
+                api.page_memories(agent_id, memory_type, page_size=25, cursor=page['next_cursor'])
+                sum(1 for _ in api.iter_memories(agent_id, memory_type, chunk_size=50))
+
+        with record("embedding pipeline"):
+            api.backfill_embeddings()
+            api.get_embedding_pipeline_stats()
+
+        episodic = api.retrieve_episodic_memories(agent_id, limit=1)[0]
+        for association_types, min_strength in itertools.product(
+            [None, ["emotional"], ["emotional", "temporal"]], [0.0, 0.5]
+        ):
+            with record(f"find_associated_memories({association_types})"):
+                api.find_associated_memories(
+                    agent_id, episodic['id'], 'episodic',
+                    association_types=association_types, min_strength=min_strength
+                )
+
+        for memory_types in [None, ["episodic"], ["semantic"], ["procedural"], ["emotional"]]:
+            with record(f"search_memories({memory_types})"):
+                api.search_memories(agent_id, "topic 3", memory_types=memory_types)
+
+        for memory_types in [None, ["semantic"]]:
+            with record(f"search_memories({memory_types}, hybrid)"):
+                api.search_memories(agent_id, "topic 3", memory_types=memory_types, hybrid=True)
+
+        with record("similar_memories"):
+            api.similar_memories(agent_id, "topic 3")
+            api.approximate_similar_memories(agent_id, "topic 3", importance_threshold=0.3)
+
+        with record("store_*"):
+            memory_id = api.store_episodic_memory(
+                agent_id, SESSIONS[2], "task", "Plan query review", importance=0.8
+            )
+            api.store_semantic_memory(
+                agent_id, "concept_1", "Updated definition", "science",
+                relationships={'related_to': ["concept_2"]}
+            )
+            api.store_semantic_memory(agent_id, "query_plans", "How SQLite runs a statement", "tools")
+            api.store_procedural_memory(agent_id, "review_plans", "analysis", ["read plan", "add index"])
+            api.store_emotional_memory(agent_id, "slow query", "frustration", -0.6, 0.8, 0.9)
+            api.update_skill_proficiency(agent_id, "review_plans", success=True)
+
+        with record("associations"):
+            api.create_memory_association(
+                agent_id, memory_id, 'episodic', episodic['id'], 'episodic', 'causal'
+            )
+            api.create_memory_association(
+                agent_id, memory_id, 'episodic', episodic['id'], 'episodic', 'causal'
+            )
+
+        with record("working_memory"):
+            for i in range(9):
+                api.add_to_working_memory(
+                    agent_id, SESSIONS[3], "note", f"Note {i}",
+                    priority=i / 10.0, expires_in_minutes=30
+                )
+            api.get_working_memory(agent_id, SESSIONS[3])
+            api.get_working_memory(agent_id, SESSIONS[3], content_type="note")
+
+        with record("access_tracking"):
+            api.flush_access_tracking()
+
+        for consolidation_type in ["reflection", "sleep", "rehearsal"]:
+            with record(f"consolidate_agent_memories({consolidation_type})"):
+                cls.consolidator.consolidate_agent_memories(agent_id, consolidation_type)
+
+        with record("consolidator"):
+            cls.consolidator._optimize_memory_structure(agent_id)
+            cls.consolidator.cleanup_agent_memories(agent_id)
+            cls.consolidator.get_consolidation_history(agent_id)
+            cls.consolidator.get_consolidation_history()
+            cls.consolidator.get_memory_statistics(agent_id)
+            cls.consolidator._get_active_agents()
+            cls.consolidator._get_all_agents()
+
+        interface = AgentMemoryInterface(agent_id, api)
+        with record("agent_interface"):
+            interface.start_session(SESSIONS[4])
+            interface.process_perception(
+                "User asked about topic 3", importance=0.8,
+                emotional_context={'valence': 0.5, 'arousal': 0.7, 'intensity': 0.6}
+            )
+            interface.retrieve_relevant_memories("topic 3")
+            interface.make_decision("topic 3", ["step 1", "step 2"], decision_type="analysis")
+            interface.learn_from_outcome("skill_1", "worked", success=True, feedback="good")
+            interface.get_personality_context()
+            interface.update_importance_scores("topic 3")
+            interface.end_session()
+
+    def _plan(self, sql: str) -> List[Tuple[int, str]]:
+        """Get the (depth, detail) rows of a statement's query plan"""
+        with self.memory_api.get_connection() as conn:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        return [(row['parent'], row['detail']) for row in rows]
+
+    def _allowed(self, sql: str) -> bool:
+        return any(re.search(pattern, sql) for pattern in ALLOWED_PLANS)
+
+    def test_workload_was_recorded(self):
+        """Test that the harness saw every component's statements"""
+        labels = set(self.recorder.statements.values())
+        for expected in ["store_*", "consolidate_agent_memories(sleep)", "consolidator", "agent_interface"]:
+            self.assertIn(expected, labels)
+        self.assertTrue(any(label.startswith("retrieve_") for label in labels))
+        self.assertGreater(len(self.recorder.statements), 50)
+
+    def test_no_full_table_scans(self):
+        """Test that no statement scans a memory table without an index"""
+        failures = []
+        for sql, label in self.recorder.statements.items():
+            if self._allowed(sql):
+                continue
+            for _, detail in self._plan(sql):
+                match = SCAN_PATTERN.match(detail)
+                if match and match.group(1) in INDEXED_TABLES:
+                    failures.append(f"[{label}] {detail}\n    {sql}")
+
+        self.assertFalse(failures, "Full table scans:\n" + "\n".join(failures))
+
+    def test_no_temp_btree_sorts(self):
+        """Test that ORDER BY/GROUP BY on memory tables is served by an index"""
+        failures = []
+        for sql, label in self.recorder.statements.items():
+            if self._allowed(sql):
+                continue
+            for _, detail in self._plan(sql):
+                if TEMP_BTREE_PATTERN.search(detail):
+                    failures.append(f"[{label}] {detail}\n    {sql}")
+
+        self.assertFalse(failures, "Temp B-tree sorts:\n" + "\n".join(failures))
+
+if __name__ == '__main__':
+    unittest.main()